@@ -0,0 +1,562 @@
+# app/align_mgmt/docom_align.py
+
+import bisect
+import hashlib
+import os
+from app.config_mgmt.docom_config import load_config
+from app.worker_mgmt.docom_preload import lazy_import
+from app.workspace_mgmt.docom_workspace import atomic_write
+
+# Heavy libraries are imported on first use
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+# Configuration section for sheet alignment
+ALIGN_SECTION = "Align"
+
+# Multiplier folding the cell hashes of a row into one row hash, the 64 bit FNV prime
+ROW_HASH_PRIME = 0x100000001B3
+
+# Largest gap, in row pairs, whose rows are paired by their cells rather than by position
+GAP_PAIRING_CELLS = 10000
+
+class AlignSettings:
+    def __init__(self, column_matching: str = "", header_row: int = None, row_matching: str = "", config=None) -> None:
+        """
+        How the columns and rows of two sheets are paired before their cells are compared.
+
+        'position' pairs columns by position, as before. 'match' pairs them by
+        header name when the sheets have a header row, then by the similarity
+        of their contents, so an inserted, removed or moved column does not
+        shift every column after it. Rows are paired the same way by a diff
+        of their hashes, so inserted and deleted rows do not shift the rows
+        after them.
+
+        Args:
+            column_matching (str): Matching requested by the client, empty for [Align] columns
+            header_row (int): 1 based row holding the column names, 0 for none, None for [Align] header_row
+            row_matching (str): Row matching requested by the client, empty for [Align] rows
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        self.column_matching = (column_matching or config.get(ALIGN_SECTION, "columns", "position") or "position").lower()
+        self.header_row = config.getint(ALIGN_SECTION, "header_row", 0) if header_row is None else header_row
+        # Smallest content similarity, between 0 and 1, for two columns to be paired
+        self.min_similarity = config.getfloat(ALIGN_SECTION, "min_similarity", 0.5)
+        # Rows the content similarity is computed on, 0 uses every row
+        self.sample_rows = config.getint(ALIGN_SECTION, "sample_rows", 10000)
+        self.row_matching = (row_matching or config.get(ALIGN_SECTION, "rows", "position") or "position").lower()
+        # Edits the row diff searches for between two anchors before it pairs the rows there by position
+        self.max_edits = config.getint(ALIGN_SECTION, "max_edits", 2000)
+        # Keep the cell hashes of every compared sheet next to its document
+        self.hash_cache = config.getboolean(ALIGN_SECTION, "hash_cache", False)
+
+    @property
+    def match_columns(self) -> bool:
+        return self.column_matching == "match"
+
+    @property
+    def match_rows(self) -> bool:
+        return self.row_matching == "match"
+
+class ColumnAlignment:
+    def __init__(self, pairs: list, removed: list, inserted: list) -> None:
+        """
+        Pairing of the columns of two sheets.
+
+        Args:
+            pairs (list): (column of the first sheet, column of the second sheet) of every matched pair
+            removed (list): Columns only the first sheet has
+            inserted (list): Columns only the second sheet has
+        """
+        self.pairs = pairs
+        self.removed = removed
+        self.inserted = inserted
+
+    @property
+    def moved(self) -> list:
+        return [(column_1, column_2) for column_1, column_2 in self.pairs if column_1 != column_2]
+
+    @property
+    def removed_labels(self) -> list:
+        # Labels relabel gives the removed columns, the second sheet never uses them
+        return [f"removed:{column}" for column in self.removed]
+
+    def relabel(self, frame_1, frame_2):
+        """
+        Label the columns of the first sheet like their partners in the second.
+
+        Args:
+            frame_1: First sheet
+            frame_2: Second sheet
+
+        Returns:
+            DataFrame: The first sheet with matched columns renamed, removed columns get labels the second sheet does not use
+        """
+        mapping = dict(self.pairs)
+        mapping.update(zip(self.removed, self.removed_labels))
+        return frame_1.rename(columns=mapping)
+
+def _header_names(frame, header_row: int) -> list:
+    # Normalized column names, None for columns without a name
+    if header_row <= 0 or header_row > len(frame):
+        return [None] * len(frame.columns)
+    names = []
+    for value in frame.iloc[header_row - 1].tolist():
+        name = "" if pd.isna(value) else str(value).strip().casefold()
+        names.append(name or None)
+    return names
+
+def cell_hashes(frame):
+    """
+    Hash every cell of a sheet, one vectorized pass per column.
+
+    Integer columns are hashed as floats, so a column read as float because
+    one of its cells is empty hashes its numbers the same.
+
+    Args:
+        frame: The sheet
+
+    Returns:
+        numpy.ndarray: (rows, columns) uint64 array
+    """
+    if not len(frame.columns):
+        return np.empty((len(frame), 0), dtype=np.uint64)
+    columns = [frame[column].astype(np.float64) if frame[column].dtype.kind in "iu" else frame[column] for column in frame.columns]
+    return np.column_stack([pd.util.hash_pandas_object(column, index=False).to_numpy() for column in columns])
+
+def row_hashes(hashes, positions: list):
+    """
+    Fold the cell hashes of the given columns into one hash per row.
+
+    Args:
+        hashes: (rows, columns) cell hashes from cell_hashes
+        positions (list): Columns to fold, in the order they are paired
+
+    Returns:
+        numpy.ndarray: uint64 hash of every row
+    """
+    folded = np.zeros(len(hashes), dtype=np.uint64)
+    for position in positions:
+        # uint64 arithmetic wraps around, as the hash needs
+        folded = (folded * np.uint64(ROW_HASH_PRIME)) ^ hashes[:, position]
+    return folded
+
+class CellHashCache:
+    def __init__(self, settings: AlignSettings) -> None:
+        """
+        Cell hashes of compared sheets, kept in a sidecar file next to the document.
+
+        Cell hashes rather than row hashes are kept, because the row hashes
+        depend on which columns are paired with the other sheet. A sidecar
+        is used while the document's size and modification time are those
+        it was written for.
+
+        Args:
+            settings (AlignSettings): hash_cache enables the sidecar files
+        """
+        self.enabled = settings.hash_cache
+
+    def sidecar_path(self, file_path: str, sheet_name: str) -> str:
+        sheet_digest = hashlib.sha1(str(sheet_name).encode("utf-8")).hexdigest()[:12]
+        return os.path.join(os.path.dirname(file_path), f"{os.path.basename(file_path)}.{sheet_digest}.hashes.npz")
+
+    def hashes(self, file_path: str, sheet_name: str, frame):
+        """
+        Cell hashes of a sheet, from its sidecar when it is current.
+
+        Args:
+            file_path (str): The Excel document the sheet was read from
+            sheet_name (str): The worksheet
+            frame: The sheet as read
+
+        Returns:
+            numpy.ndarray: (rows, columns) uint64 array
+        """
+        if not self.enabled:
+            return cell_hashes(frame)
+        stat = os.stat(file_path)
+        stamp = np.array([stat.st_size, stat.st_mtime_ns, len(frame), len(frame.columns)], dtype=np.int64)
+        sidecar = self.sidecar_path(file_path, sheet_name)
+        try:
+            with np.load(sidecar) as cached:
+                if np.array_equal(cached["stamp"], stamp):
+                    return cached["hashes"]
+        except (OSError, KeyError, ValueError):
+            pass
+        hashes = cell_hashes(frame)
+        try:
+            with atomic_write(sidecar) as sidecar_file:
+                np.savez(sidecar_file, stamp=stamp, hashes=hashes)
+        except OSError:
+            # A read-only document directory only costs the next comparison a rehash
+            pass
+        return hashes
+
+class ColumnAligner:
+    def __init__(self, settings: AlignSettings) -> None:
+        self.settings = settings
+
+    def _similarity(self, hashes_1, hashes_2, columns_1: list, columns_2: list) -> list:
+        """
+        Content similarity of every pair of unmatched columns.
+
+        The mean of the share of rows equal at the same position and the
+        Jaccard similarity of the sets of values, so a column still matches
+        its partner after rows were inserted.
+
+        Returns:
+            list: (similarity, position 1, position 2) of every pair
+        """
+        common_rows = min(len(hashes_1), len(hashes_2))
+        values_2 = {position: np.unique(hashes_2[:, position]) for position in columns_2}
+        scores = []
+        for position_1 in columns_1:
+            column_1 = hashes_1[:, position_1]
+            values_1 = np.unique(column_1)
+            positional = (column_1[:common_rows, None] == hashes_2[:common_rows][:, columns_2]).mean(axis=0) if common_rows else np.zeros(len(columns_2))
+            for index, position_2 in enumerate(columns_2):
+                shared = len(np.intersect1d(values_1, values_2[position_2], assume_unique=True))
+                union = len(values_1) + len(values_2[position_2]) - shared
+                jaccard = shared / union if union else 1.0
+                scores.append(((positional[index] + jaccard) / 2, position_1, position_2))
+        return scores
+
+    def _body(self, hashes):
+        # Rows below the header the similarity is computed on
+        body = hashes[max(self.settings.header_row, 0):]
+        return body[:self.settings.sample_rows] if self.settings.sample_rows else body
+
+    def align(self, frame_1, frame_2, hashes_1=None, hashes_2=None) -> ColumnAlignment:
+        """
+        Pair the columns of two sheets.
+
+        Columns are paired by header name first, in order of occurrence for
+        repeated names, then columns with identical contents, then the most
+        similar remaining columns down to min_similarity. Whatever is left
+        was removed from the first sheet or inserted into the second.
+
+        Args:
+            frame_1: First sheet
+            frame_2: Second sheet
+            hashes_1: Cell hashes of the first sheet, computed when None
+            hashes_2: Cell hashes of the second sheet, computed when None
+
+        Returns:
+            ColumnAlignment: Matched, removed and inserted columns
+        """
+        header_row = self.settings.header_row
+        labels_1, labels_2 = list(frame_1.columns), list(frame_2.columns)
+        unmatched_1, unmatched_2 = list(range(len(labels_1))), list(range(len(labels_2)))
+        pairs = []
+
+        def pair(position_1: int, position_2: int) -> None:
+            pairs.append((position_1, position_2))
+            unmatched_1.remove(position_1)
+            unmatched_2.remove(position_2)
+
+        # Header names
+        names_2 = _header_names(frame_2, header_row)
+        for position_1, name in enumerate(_header_names(frame_1, header_row)):
+            if name is None:
+                continue
+            for position_2 in unmatched_2:
+                if names_2[position_2] == name:
+                    pair(position_1, position_2)
+                    break
+
+        # Identical contents, then the most similar contents
+        hashes_1 = self._body(cell_hashes(frame_1) if hashes_1 is None else hashes_1)
+        hashes_2 = self._body(cell_hashes(frame_2) if hashes_2 is None else hashes_2)
+        if unmatched_1 and unmatched_2 and len(hashes_1) == len(hashes_2):
+            digests_2 = {}
+            for position_2 in unmatched_2:
+                digests_2.setdefault(hashes_2[:, position_2].tobytes(), []).append(position_2)
+            for position_1 in list(unmatched_1):
+                candidates = digests_2.get(hashes_1[:, position_1].tobytes())
+                if candidates:
+                    pair(position_1, candidates.pop(0))
+        if unmatched_1 and unmatched_2:
+            scores = self._similarity(hashes_1, hashes_2, unmatched_1, unmatched_2)
+            # Highest similarity first, ties go to the pair closest in position
+            for similarity, position_1, position_2 in sorted(scores, key=lambda score: (-score[0], abs(score[1] - score[2]))):
+                if similarity < self.settings.min_similarity:
+                    break
+                if position_1 in unmatched_1 and position_2 in unmatched_2:
+                    pair(position_1, position_2)
+
+        return ColumnAlignment(
+            pairs=[(labels_1[position_1], labels_2[position_2]) for position_1, position_2 in sorted(pairs)],
+            removed=[labels_1[position] for position in unmatched_1],
+            inserted=[labels_2[position] for position in unmatched_2],
+        )
+
+def paired_columns(frame_1, frame_2, alignment: ColumnAlignment = None) -> tuple:
+    """
+    Positions of the columns both sheets have, in pairing order.
+
+    Args:
+        frame_1: First sheet
+        frame_2: Second sheet
+        alignment (ColumnAlignment): Column pairing, None pairs columns with the same label
+
+    Returns:
+        tuple: Positions in the first sheet and the matching positions in the second
+    """
+    pairs = alignment.pairs if alignment is not None else [(column, column) for column in frame_1.columns if column in frame_2.columns]
+    return [frame_1.columns.get_loc(column_1) for column_1, _ in pairs], [frame_2.columns.get_loc(column_2) for _, column_2 in pairs]
+
+class RowAlignment:
+    def __init__(self, rows_1, rows_2, identical) -> None:
+        """
+        Pairing of the rows of two sheets, in the order they are reported.
+
+        Args:
+            rows_1: Row of the first sheet of every aligned row, -1 for rows only the second sheet has
+            rows_2: Row of the second sheet of every aligned row, -1 for rows only the first sheet has
+            identical: Aligned rows whose hashes are equal, their cells need no comparison
+        """
+        self.rows_1 = rows_1
+        self.rows_2 = rows_2
+        self.identical = identical
+
+    @property
+    def inserted(self) -> int:
+        return int((self.rows_1 < 0).sum())
+
+    @property
+    def removed(self) -> int:
+        return int((self.rows_2 < 0).sum())
+
+    @property
+    def modified(self) -> int:
+        return int(((self.rows_1 >= 0) & (self.rows_2 >= 0) & ~self.identical).sum())
+
+def _common_ends(sequence_1, sequence_2) -> tuple:
+    # Lengths of the common prefix and, of what is left, the common suffix
+    length = min(len(sequence_1), len(sequence_2))
+    different = np.flatnonzero(sequence_1[:length] != sequence_2[:length])
+    prefix = int(different[0]) if len(different) else length
+    length -= prefix
+    if not length:
+        return prefix, 0
+    different = np.flatnonzero(sequence_1[len(sequence_1) - length:][::-1] != sequence_2[len(sequence_2) - length:][::-1])
+    return prefix, int(different[0]) if len(different) else length
+
+def _unique_anchors(sequence_1, sequence_2) -> tuple:
+    """
+    Patience diff anchors: hashes occurring once in each sequence, paired in
+    the longest run that is increasing in both.
+
+    Returns:
+        tuple: Positions of the anchors in the first and in the second sequence
+    """
+    values_1, first_1, counts_1 = np.unique(sequence_1, return_index=True, return_counts=True)
+    values_2, first_2, counts_2 = np.unique(sequence_2, return_index=True, return_counts=True)
+    _, index_1, index_2 = np.intersect1d(values_1[counts_1 == 1], values_2[counts_2 == 1], assume_unique=True, return_indices=True)
+    positions_1 = first_1[counts_1 == 1][index_1]
+    positions_2 = first_2[counts_2 == 1][index_2]
+    order = np.argsort(positions_1)
+    positions_1, positions_2 = positions_1[order], positions_2[order]
+    if np.all(np.diff(positions_2) > 0):
+        return positions_1, positions_2
+
+    # Longest increasing subsequence of the second positions, by patience sorting
+    tails, tail_indices, previous = [], [], [-1] * len(positions_2)
+    for index, position in enumerate(positions_2.tolist()):
+        pile = bisect.bisect_left(tails, position)
+        if pile == len(tails):
+            tails.append(position)
+            tail_indices.append(index)
+        else:
+            tails[pile] = position
+            tail_indices[pile] = index
+        previous[index] = tail_indices[pile - 1] if pile else -1
+    chain = []
+    index = tail_indices[-1]
+    while index >= 0:
+        chain.append(index)
+        index = previous[index]
+    chain = np.array(chain[::-1], dtype=np.int64)
+    return positions_1[chain], positions_2[chain]
+
+def _myers(sequence_1: list, sequence_2: list, max_edits: int):
+    """
+    Myers' O(ND) diff of two short sequences.
+
+    Returns:
+        list: (position 1, position 2) of every equal pair, or None past max_edits edits
+    """
+    length_1, length_2 = len(sequence_1), len(sequence_2)
+    furthest = {1: 0}
+    trace = []
+    for edits in range(min(length_1 + length_2, max_edits) + 1):
+        trace.append(dict(furthest))
+        for diagonal in range(-edits, edits + 1, 2):
+            if diagonal == -edits or (diagonal != edits and furthest[diagonal - 1] < furthest[diagonal + 1]):
+                position_1 = furthest[diagonal + 1]
+            else:
+                position_1 = furthest[diagonal - 1] + 1
+            position_2 = position_1 - diagonal
+            while position_1 < length_1 and position_2 < length_2 and sequence_1[position_1] == sequence_2[position_2]:
+                position_1 += 1
+                position_2 += 1
+            furthest[diagonal] = position_1
+            if position_1 >= length_1 and position_2 >= length_2:
+                return _myers_pairs(trace, length_1, length_2)
+    return None
+
+def _myers_pairs(trace: list, position_1: int, position_2: int) -> list:
+    # Walk the furthest reaching paths back from the end, collecting the diagonal moves
+    pairs = []
+    for edits in range(len(trace) - 1, -1, -1):
+        furthest = trace[edits]
+        diagonal = position_1 - position_2
+        if diagonal == -edits or (diagonal != edits and furthest[diagonal - 1] < furthest[diagonal + 1]):
+            previous_diagonal = diagonal + 1
+        else:
+            previous_diagonal = diagonal - 1
+        previous_1 = furthest[previous_diagonal]
+        previous_2 = previous_1 - previous_diagonal
+        while position_1 > previous_1 and position_2 > previous_2:
+            position_1 -= 1
+            position_2 -= 1
+            pairs.append((position_1, position_2))
+        position_1, position_2 = previous_1, previous_2
+    return pairs[::-1]
+
+class RowAligner:
+    def __init__(self, settings: AlignSettings) -> None:
+        self.settings = settings
+
+    def _matches(self, hashes_1, hashes_2) -> list:
+        """
+        Runs of rows with equal hashes, in order.
+
+        Common ends are matched first. What is left is diffed with Myers'
+        algorithm when it is short, otherwise patience anchors split it into
+        ranges that are matched the same way.
+
+        Returns:
+            list: (row 1, row 2, length) of every run, increasing in both sheets
+        """
+        runs = []
+        # Ranges of both sheets still to match, popped in sheet order
+        pending = [(0, len(hashes_1), 0, len(hashes_2))]
+        while pending:
+            start_1, end_1, start_2, end_2 = pending.pop()
+            prefix, suffix = _common_ends(hashes_1[start_1:end_1], hashes_2[start_2:end_2])
+            if prefix:
+                runs.append((start_1, start_2, prefix))
+            start_1, start_2 = start_1 + prefix, start_2 + prefix
+            end_1, end_2 = end_1 - suffix, end_2 - suffix
+            if suffix:
+                # Matched entirely once popped, after everything before it
+                pending.append((end_1, end_1 + suffix, end_2, end_2 + suffix))
+            if start_1 == end_1 or start_2 == end_2:
+                continue
+            # Short ranges are diffed exactly, long ones are split at anchors first
+            short = end_1 - start_1 + end_2 - start_2 <= self.settings.max_edits
+            anchors = None if short else _unique_anchors(hashes_1[start_1:end_1], hashes_2[start_2:end_2])
+            if anchors is not None and len(anchors[0]):
+                # Anchors following each other in both sheets form one range, the rows between them another
+                anchors_1, anchors_2 = start_1 + anchors[0], start_2 + anchors[1]
+                breaks = np.flatnonzero((np.diff(anchors_1) != 1) | (np.diff(anchors_2) != 1)) + 1
+                run_starts = np.concatenate([[0], breaks])
+                run_ends = np.concatenate([breaks, [len(anchors_1)]])
+                ranges = []
+                previous_1, previous_2 = start_1, start_2
+                for run_start, run_end in zip(run_starts.tolist(), run_ends.tolist()):
+                    first_1, first_2 = int(anchors_1[run_start]), int(anchors_2[run_start])
+                    length = run_end - run_start
+                    if first_1 > previous_1 or first_2 > previous_2:
+                        ranges.append((previous_1, first_1, previous_2, first_2))
+                    ranges.append((first_1, first_1 + length, first_2, first_2 + length))
+                    previous_1, previous_2 = first_1 + length, first_2 + length
+                if end_1 > previous_1 or end_2 > previous_2:
+                    ranges.append((previous_1, end_1, previous_2, end_2))
+                pending.extend(reversed(ranges))
+                continue
+            pairs = _myers(hashes_1[start_1:end_1].tolist(), hashes_2[start_2:end_2].tolist(), self.settings.max_edits) or []
+            runs.extend((start_1 + pair_1, start_2 + pair_2, 1) for pair_1, pair_2 in pairs)
+        return runs
+
+    def _pair_gap(self, cells_1, cells_2) -> tuple:
+        """
+        Pair the unmatched rows between two runs.
+
+        Small gaps are paired by the most equal cells in order, rows sharing
+        fewer than min_similarity of their cells stay unpaired. Larger gaps,
+        or gaps without cell hashes, are paired by position.
+
+        Returns:
+            tuple: Gap rows of the first and the second sheet in report order, -1 where a row has no partner
+        """
+        count_1, count_2 = len(cells_1), len(cells_2)
+        if cells_1.shape[1] == 0 or count_1 * count_2 > GAP_PAIRING_CELLS:
+            common = min(count_1, count_2)
+            return (np.concatenate([np.arange(count_1), np.full(count_2 - common, -1)]),
+                    np.concatenate([np.arange(common), np.full(count_1 - common, -1), np.arange(common, count_2)]))
+
+        similarity = (cells_1[:, None, :] == cells_2[None, :, :]).mean(axis=2)
+        similarity = np.where(similarity >= self.settings.min_similarity, similarity, -np.inf)
+        # Order preserving pairing with the highest total similarity
+        best = np.zeros((count_1 + 1, count_2 + 1))
+        for row_1 in range(1, count_1 + 1):
+            for row_2 in range(1, count_2 + 1):
+                best[row_1, row_2] = max(best[row_1 - 1, row_2], best[row_1, row_2 - 1], best[row_1 - 1, row_2 - 1] + similarity[row_1 - 1, row_2 - 1])
+        pairs = []
+        row_1, row_2 = count_1, count_2
+        while row_1 and row_2:
+            if best[row_1, row_2] == best[row_1 - 1, row_2]:
+                row_1 -= 1
+            elif best[row_1, row_2] == best[row_1, row_2 - 1]:
+                row_2 -= 1
+            else:
+                row_1, row_2 = row_1 - 1, row_2 - 1
+                pairs.append((row_1, row_2))
+
+        gap_1, gap_2 = [], []
+        previous_1 = previous_2 = 0
+        for row_1, row_2 in pairs[::-1] + [(count_1, count_2)]:
+            # Unpaired rows before a pair, removed then inserted
+            gap_1.extend(list(range(previous_1, row_1)) + [-1] * (row_2 - previous_2))
+            gap_2.extend([-1] * (row_1 - previous_1) + list(range(previous_2, row_2)))
+            if row_1 < count_1:
+                gap_1.append(row_1)
+                gap_2.append(row_2)
+            previous_1, previous_2 = row_1 + 1, row_2 + 1
+        return np.array(gap_1, dtype=np.int64), np.array(gap_2, dtype=np.int64)
+
+    def align(self, hashes_1, hashes_2, cells_1=None, cells_2=None) -> RowAlignment:
+        """
+        Pair the rows of two sheets by a diff of their row hashes.
+
+        Rows with equal hashes are paired in the longest common order. The
+        rows between two such runs are paired by their cells as modified
+        rows, and the rest were removed or inserted.
+
+        Args:
+            hashes_1: Row hashes of the first sheet, from row_hashes
+            hashes_2: Row hashes of the second sheet, from row_hashes
+            cells_1: Cell hashes of the paired columns of the first sheet, None pairs modified rows by position
+            cells_2: Cell hashes of the paired columns of the second sheet, in the same column order
+
+        Returns:
+            RowAlignment: Every row of both sheets, in sheet order
+        """
+        if cells_1 is None or cells_2 is None:
+            cells_1, cells_2 = np.empty((len(hashes_1), 0), dtype=np.uint64), np.empty((len(hashes_2), 0), dtype=np.uint64)
+        rows_1, rows_2, identical = [], [], []
+        previous_1 = previous_2 = 0
+        for row_1, row_2, length in self._matches(hashes_1, hashes_2) + [(len(hashes_1), len(hashes_2), 0)]:
+            if row_1 > previous_1 or row_2 > previous_2:
+                gap_1, gap_2 = self._pair_gap(cells_1[previous_1:row_1], cells_2[previous_2:row_2])
+                rows_1.append(np.where(gap_1 >= 0, gap_1 + previous_1, -1))
+                rows_2.append(np.where(gap_2 >= 0, gap_2 + previous_2, -1))
+                identical.append(np.zeros(len(gap_1), dtype=bool))
+            rows_1.append(np.arange(row_1, row_1 + length))
+            rows_2.append(np.arange(row_2, row_2 + length))
+            identical.append(np.ones(length, dtype=bool))
+            previous_1, previous_2 = row_1 + length, row_2 + length
+        return RowAlignment(np.concatenate(rows_1).astype(np.int64), np.concatenate(rows_2).astype(np.int64), np.concatenate(identical))
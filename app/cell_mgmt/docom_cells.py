@@ -0,0 +1,199 @@
+# app/cell_mgmt/docom_cells.py
+
+import datetime
+from functools import lru_cache
+from app.config_mgmt.docom_config import load_config
+from app.worker_mgmt.docom_preload import lazy_import
+
+# Heavy libraries are imported on first use
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+# Configuration section for cell comparison
+CELLS_SECTION = "Cells"
+
+class CellDiff:
+    def __init__(self, columns: list, changed, added, removed, missing_1, missing_2, rows_1, rows_2) -> None:
+        """
+        Cell by cell result of comparing two sheets.
+
+        Every mask has one row per aligned row, the rows of the longer sheet
+        when rows are paired by position, and one column per column of either
+        sheet, in the order of columns.
+
+        Args:
+            columns (list): Union of the column labels of both sheets
+            changed: Cells that differ
+            added: Cells only the second sheet has
+            removed: Cells only the first sheet has
+            missing_1: Empty or padded cells of the first sheet
+            missing_2: Empty or padded cells of the second sheet
+            rows_1: Row of the first sheet of every aligned row, -1 where it has none
+            rows_2: Row of the second sheet of every aligned row, -1 where it has none
+        """
+        self.columns = columns
+        self.changed = changed
+        self.added = added
+        self.removed = removed
+        self.missing_1 = missing_1
+        self.missing_2 = missing_2
+        self.rows_1 = rows_1
+        self.rows_2 = rows_2
+
+    @property
+    def differing_rows(self):
+        return np.flatnonzero(self.changed.any(axis=1))
+
+    def ignore_columns(self, labels: list) -> None:
+        # Columns reported on their own, e.g. inserted ones, none of their cells count as changed
+        positions = [self.columns.index(label) for label in labels]
+        self.changed[:, positions] = False
+
+def _kind(values) -> str:
+    # 'n' numbers, 'M' datetimes, 'b' booleans, 'O' anything else
+    kind = values.dtype.kind
+    if kind in "iuf":
+        return "n"
+    return kind if kind in "Mb" else "O"
+
+class CellComparator:
+    def __init__(self, config=None) -> None:
+        """
+        Compare worksheet cells in their native dtypes.
+
+        Numeric columns are compared as numbers within an absolute and a
+        relative tolerance, datetime columns after truncation to a
+        granularity, and everything else by value. Empty cells and the padding
+        of the shorter sheet are tracked in masks instead of being filled
+        with a placeholder, so columns keep their dtype and every comparison
+        runs on NumPy arrays.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        # Numbers a and b are equal when |a - b| <= absolute_tolerance + relative_tolerance * |b|
+        self.absolute_tolerance = config.getfloat(CELLS_SECTION, "absolute_tolerance", 0.0)
+        self.relative_tolerance = config.getfloat(CELLS_SECTION, "relative_tolerance", 0.0)
+        # NumPy datetime unit datetimes are truncated to before comparing, e.g. 's' or 'D', empty compares them exactly
+        self.datetime_granularity = config.get(CELLS_SECTION, "datetime_granularity", "") or ""
+        if self.datetime_granularity:
+            try:
+                np.datetime64(0, self.datetime_granularity)
+            except (TypeError, ValueError):
+                raise ValueError(f"[Cells] datetime_granularity is not a NumPy datetime unit: {self.datetime_granularity}")
+
+    @property
+    def exact(self) -> bool:
+        return not self.absolute_tolerance and not self.relative_tolerance
+
+    def _close(self, values_1, values_2):
+        if self.exact:
+            return values_1 == values_2
+        return np.isclose(values_1.astype(np.float64), values_2.astype(np.float64), rtol=self.relative_tolerance, atol=self.absolute_tolerance)
+
+    def _typed(self, values, missing, types: tuple, dtype: str):
+        # Cells of an object column that hold one of types, converted to dtype; booleans are not numbers
+        cell_types = pd.Series(values, dtype=object).map(type).to_numpy()
+        selected = ~missing & np.isin(cell_types, types)
+        converted = np.zeros(len(values), dtype=dtype)
+        converted[selected] = values[selected].astype(dtype)
+        return converted, selected
+
+    def equal(self, values_1, values_2):
+        """
+        Compare two columns of the same length cell by cell.
+
+        Args:
+            values_1: First column as a NumPy array, any dtype
+            values_2: Second column as a NumPy array, any dtype
+
+        Returns:
+            numpy.ndarray: True where the cells are equal, two empty cells are equal
+        """
+        missing_1 = pd.isna(values_1)
+        missing_2 = pd.isna(values_2)
+        kind_1, kind_2 = _kind(values_1), _kind(values_2)
+        if kind_1 == kind_2 == "n":
+            same = self._close(values_1, values_2)
+        elif kind_1 == kind_2 == "M":
+            if self.datetime_granularity:
+                values_1 = values_1.astype(f"datetime64[{self.datetime_granularity}]")
+                values_2 = values_2.astype(f"datetime64[{self.datetime_granularity}]")
+            same = values_1 == values_2
+        elif kind_1 == kind_2 == "b":
+            same = values_1 == values_2
+        else:
+            # Mixed or text columns, empty cells are replaced so missing values never reach ==
+            objects_1 = np.where(missing_1, None, values_1.astype(object))
+            objects_2 = np.where(missing_2, None, values_2.astype(object))
+            same = np.asarray(objects_1 == objects_2, dtype=bool)
+            if not self.exact:
+                numbers_1, numeric_1 = self._typed(objects_1, missing_1, (int, float, np.int64, np.float64), "float64")
+                numbers_2, numeric_2 = self._typed(objects_2, missing_2, (int, float, np.int64, np.float64), "float64")
+                both = numeric_1 & numeric_2
+                same[both] = self._close(numbers_1[both], numbers_2[both])
+            if self.datetime_granularity:
+                unit = f"datetime64[{self.datetime_granularity}]"
+                dates_1, dated_1 = self._typed(objects_1, missing_1, (datetime.datetime, pd.Timestamp), unit)
+                dates_2, dated_2 = self._typed(objects_2, missing_2, (datetime.datetime, pd.Timestamp), unit)
+                both = dated_1 & dated_2
+                same[both] = dates_1[both] == dates_2[both]
+        return (same & ~missing_1 & ~missing_2) | (missing_1 & missing_2)
+
+    def compare(self, frame_1, frame_2, rows=None) -> CellDiff:
+        """
+        Compare two sheets cell by cell.
+
+        Columns are matched by label and rows by position, or as paired by a
+        row alignment. Rows only one sheet has and columns only one sheet has
+        are added or removed, and all of their cells count as changed. Rows
+        the alignment matched as identical are not compared again.
+
+        Args:
+            frame_1: First sheet
+            frame_2: Second sheet
+            rows (RowAlignment): Pairing of the rows, None pairs them by position
+
+        Returns:
+            CellDiff: Changed, added, removed and empty cell masks, one row per aligned row
+        """
+        columns = list(frame_1.columns.union(frame_2.columns, sort=False))
+        if rows is None:
+            # By position, the rows past the end of the shorter sheet are padding
+            row_count = max(len(frame_1), len(frame_2))
+            rows_1 = np.where(np.arange(row_count) < len(frame_1), np.arange(row_count), -1)
+            rows_2 = np.where(np.arange(row_count) < len(frame_2), np.arange(row_count), -1)
+            identical = np.zeros(row_count, dtype=bool)
+        else:
+            rows_1, rows_2, identical = rows.rows_1, rows.rows_2, rows.identical
+        present_1, present_2 = rows_1 >= 0, rows_2 >= 0
+        compared = present_1 & present_2 & ~identical
+        shape = (len(rows_1), len(columns))
+        changed = np.zeros(shape, dtype=bool)
+        missing_1 = np.ones(shape, dtype=bool)
+        missing_2 = np.ones(shape, dtype=bool)
+
+        added = np.broadcast_to(~present_1[:, None], shape).copy()
+        removed = np.broadcast_to(~present_2[:, None], shape).copy()
+        for position, column in enumerate(columns):
+            in_1, in_2 = column in frame_1.columns, column in frame_2.columns
+            if in_1:
+                values_1 = frame_1[column].to_numpy()
+                missing_1[present_1, position] = pd.isna(values_1)[rows_1[present_1]]
+            else:
+                added[:, position] = True
+            if in_2:
+                values_2 = frame_2[column].to_numpy()
+                missing_2[present_2, position] = pd.isna(values_2)[rows_2[present_2]]
+            else:
+                removed[:, position] = True
+            if in_1 and in_2:
+                changed[compared, position] = ~self.equal(values_1[rows_1[compared]], values_2[rows_2[compared]])
+        changed |= added != removed
+        return CellDiff(columns, changed, added, removed, missing_1, missing_2, rows_1, rows_2)
+
+@lru_cache(maxsize=1)
+def get_cell_comparator() -> CellComparator:
+    # Configured once per process
+    return CellComparator()
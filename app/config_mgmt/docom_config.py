@@ -0,0 +1,57 @@
+import configparser
+import os
+from functools import lru_cache
+
+# Location of the service configuration file
+CONFIGURATION_FILE = os.path.abspath(os.path.join("config", "configuration.ini"))
+
+# Prefix of environment variables overriding configuration options,
+# e.g. DOCCOM_RUNTIME_CPU_WORKERS overrides [Runtime] cpu_workers
+ENVIRONMENT_PREFIX = "DOCCOM"
+
+class DOCCOMConfig:
+    def __init__(self, config_file=CONFIGURATION_FILE):
+        self.config_file = config_file
+        self.config = configparser.ConfigParser(allow_no_value=True)
+        # Keep option names as written, mapping entries may be case sensitive
+        self.config.optionxform = str
+        self.config.read(rf"{self.config_file}")
+
+    def _environment_override(self, section: str, option: str):
+        return os.environ.get(f"{ENVIRONMENT_PREFIX}_{section}_{option}".upper())
+
+    def get(self, section: str, option: str, fallback=None):
+        override = self._environment_override(section, option)
+        if override is not None:
+            return override
+        return self.config.get(section, option, fallback=fallback)
+
+    def getint(self, section: str, option: str, fallback=None):
+        value = self.get(section, option)
+        return fallback if value in (None, "") else int(value)
+
+    def getfloat(self, section: str, option: str, fallback=None):
+        value = self.get(section, option)
+        return fallback if value in (None, "") else float(value)
+
+    def getboolean(self, section: str, option: str, fallback=None):
+        value = self.get(section, option)
+        if value in (None, ""):
+            return fallback
+        return value.strip().lower() in ("1", "on", "true", "yes")
+
+    def items(self, section: str) -> dict:
+        # Return the options of a section, or an empty dict if it is missing
+        if not self.config.has_section(section):
+            return {}
+        return dict(self.config.items(section))
+
+@lru_cache(maxsize=1)
+def load_config() -> DOCCOMConfig:
+    """
+    Return the process wide configuration, parsed once on first use.
+
+    Returns:
+        DOCCOMConfig: The parsed service configuration
+    """
+    return DOCCOMConfig()
@@ -0,0 +1,223 @@
+# app/diff_mgmt/docom_diff.py
+
+import importlib
+import importlib.util
+import json
+import os
+from contextlib import ExitStack
+from typing import Literal
+from app.config_mgmt.docom_config import load_config
+from app.workspace_mgmt.docom_workspace import atomic_write
+from app.static_mgmt.docom_static import precompress
+
+# Configuration section for structured diff output
+DIFF_SECTION = "Diff"
+
+# Values of the diff_format request field, empty follows [Diff] default_format
+DiffFormat = Literal["", "none", "json", "parquet", "auto"]
+
+def pyarrow_available() -> bool:
+    # Parquet output is optional, it needs pyarrow installed next to the service
+    return importlib.util.find_spec("pyarrow") is not None
+
+class DiffSettings:
+    def __init__(self, diff_format: str = "", html: bool = True, config=None) -> None:
+        """
+        Which outputs a comparison produces.
+
+        The structured diff is a JSON document with summary statistics and the
+        changes, next to the HTML report. With parquet the changes go to a
+        Parquet file instead of the JSON document, 'auto' picks Parquet once
+        the diff has parquet_min_changes changes. Skipping the HTML report
+        without asking for a format writes the diff in 'auto' format.
+
+        Args:
+            diff_format (str): Format requested by the client, empty for [Diff] default_format
+            html (bool): Render the HTML report
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        self.html = html
+        self.format = (diff_format or config.get(DIFF_SECTION, "default_format", "none") or "none").lower()
+        if not html and self.format == "none":
+            self.format = "auto"
+        self.parquet_min_changes = config.getint(DIFF_SECTION, "parquet_min_changes", 10000)
+        # Changes returned in the response body as well, larger diffs are only linked
+        self.inline_max_changes = config.getint(DIFF_SECTION, "inline_max_changes", 1000)
+
+    @property
+    def enabled(self) -> bool:
+        return self.format != "none"
+
+    def changes_format(self, change_count: int) -> str:
+        """
+        Format the changes of a diff are written in.
+
+        Args:
+            change_count (int): Number of changes in the diff
+
+        Returns:
+            str: 'json' or 'parquet', JSON when pyarrow is not installed
+        """
+        if self.format == "parquet" or (self.format == "auto" and change_count >= self.parquet_min_changes):
+            return "parquet" if pyarrow_available() else "json"
+        return "json"
+
+class StructuredDiff:
+    def __init__(self, doc_type: str, summary: dict, changes: dict) -> None:
+        """
+        Machine-readable result of a comparison.
+
+        Args:
+            doc_type (str): Document type of the comparison
+            summary (dict): Summary statistics, JSON serializable
+            changes (dict): Column name to list of values, one entry per change
+        """
+        self.doc_type = doc_type
+        self.summary = summary
+        self.changes = changes
+
+    @property
+    def change_count(self) -> int:
+        return len(next(iter(self.changes.values()), []))
+
+    def records(self) -> list:
+        # Row oriented view of the columnar changes
+        columns = list(self.changes)
+        return [dict(zip(columns, values)) for values in zip(*self.changes.values())]
+
+    def write(self, settings: DiffSettings, document_path, base_name: str, logger=None) -> dict:
+        """
+        Write the diff to the report folder.
+
+        Args:
+            settings (DiffSettings): Output settings of the request
+            document_path (DocumentPath): First document, names the report folder
+            base_name (str): File name without extension, shared with the HTML report
+            logger (DOCCOMLogging): Logger instance, or None if logging is disabled
+
+        Returns:
+            dict: The diff entry of the response, summary and URLs, with the changes when small enough
+        """
+        report_directory = str(document_path.report_directory)
+        changes_format = settings.changes_format(self.change_count)
+        if changes_format == "json" and settings.format == "parquet" and logger:
+            logger.warning("| pyarrow is not installed, writing the diff changes as JSON")
+
+        document = {"doc_type": self.doc_type, "summary": self.summary}
+        entry = {"format": changes_format, "summary": self.summary}
+        if changes_format == "parquet":
+            changes_name = f"{base_name}.changes.parquet"
+            self._write_parquet(os.path.join(report_directory, changes_name))
+            document["changes_file"] = changes_name
+            entry["changes_url"] = document_path.cvweb_url(changes_name)
+        else:
+            document["changes"] = self.records()
+            if self.change_count <= settings.inline_max_changes:
+                entry["changes"] = document["changes"]
+
+        diff_name = f"{base_name}.diff.json"
+        with atomic_write(os.path.join(report_directory, diff_name), "w") as diff_file:
+            json.dump(document, diff_file)
+        precompress(os.path.join(report_directory, diff_name), logger=logger)
+        entry["url"] = document_path.cvweb_url(diff_name)
+        return entry
+
+    def _write_parquet(self, destination: str) -> None:
+        pyarrow = importlib.import_module("pyarrow")
+        parquet = importlib.import_module("pyarrow.parquet")
+        table = pyarrow.Table.from_pydict(self.changes)
+        with atomic_write(destination) as parquet_file:
+            parquet.write_table(table, parquet_file)
+
+class StreamingDiffWriter:
+    def __init__(self, settings: DiffSettings, document_path, base_name: str, doc_type: str, schema: dict, logger=None) -> None:
+        """
+        Structured diff written while the comparison runs.
+
+        Changes are appended in batches to <base_name>.changes.parquet, one row
+        group per batch, or to <base_name>.changes.jsonl without pyarrow or
+        with the json format. The summary document is written on close, once
+        the totals are known. Only the first inline_max_changes changes stay
+        in memory, for the response.
+
+        Args:
+            settings (DiffSettings): Output settings of the request
+            document_path (DocumentPath): First document, names the report folder
+            base_name (str): File name without extension, shared with the HTML report
+            doc_type (str): Document type of the comparison
+            schema (dict): Column name to Arrow type name of the changes, e.g. 'int64' or 'string'
+            logger (DOCCOMLogging): Logger instance, or None if logging is disabled
+        """
+        self.settings = settings
+        self.document_path = document_path
+        self.base_name = base_name
+        self.doc_type = doc_type
+        self.logger = logger
+        self.change_count = 0
+        self._inline = []
+        self._stack = ExitStack()
+        report_directory = str(document_path.report_directory)
+        self.format = "parquet" if settings.format in ("parquet", "auto") and pyarrow_available() else "jsonl"
+        if self.format == "jsonl" and settings.format == "parquet" and logger:
+            logger.warning("| pyarrow is not installed, writing the diff changes as JSON lines")
+        self.changes_name = f"{base_name}.changes.{self.format}"
+        self._file = self._stack.enter_context(atomic_write(os.path.join(report_directory, self.changes_name), "wb" if self.format == "parquet" else "w"))
+        if self.format == "parquet":
+            pyarrow = importlib.import_module("pyarrow")
+            parquet = importlib.import_module("pyarrow.parquet")
+            self._schema = pyarrow.schema([(name, pyarrow.type_for_alias(type_name)) for name, type_name in schema.items()])
+            self._writer = self._stack.enter_context(parquet.ParquetWriter(self._file, self._schema))
+
+    def append(self, changes: dict) -> None:
+        """
+        Write a batch of changes.
+
+        Args:
+            changes (dict): Column name to list of values, one entry per change
+        """
+        batch = StructuredDiff(self.doc_type, {}, changes)
+        count = batch.change_count
+        if not count:
+            return
+        if self.format == "parquet":
+            pyarrow = importlib.import_module("pyarrow")
+            self._writer.write_table(pyarrow.Table.from_pydict(changes, schema=self._schema))
+            records = batch.records() if self.change_count < self.settings.inline_max_changes else []
+        else:
+            records = batch.records()
+            self._file.write("".join(json.dumps(record) + "\n" for record in records))
+        if self.change_count + count <= self.settings.inline_max_changes:
+            self._inline.extend(records)
+        else:
+            self._inline = None
+        self.change_count += count
+
+    def close(self, summary: dict) -> dict:
+        """
+        Finish the changes file and write the summary document.
+
+        Args:
+            summary (dict): Summary statistics, JSON serializable
+
+        Returns:
+            dict: The diff entry of the response, as StructuredDiff.write returns it
+        """
+        self._stack.close()
+        if self.format == "jsonl":
+            precompress(os.path.join(str(self.document_path.report_directory), self.changes_name), logger=self.logger)
+        document = {"doc_type": self.doc_type, "summary": summary, "changes_file": self.changes_name}
+        entry = {"format": self.format, "summary": summary, "changes_url": self.document_path.cvweb_url(self.changes_name)}
+        if self._inline is not None:
+            entry["changes"] = self._inline
+        diff_name = f"{self.base_name}.diff.json"
+        with atomic_write(os.path.join(str(self.document_path.report_directory), diff_name), "w") as diff_file:
+            json.dump(document, diff_file)
+        precompress(os.path.join(str(self.document_path.report_directory), diff_name), logger=self.logger)
+        entry["url"] = self.document_path.cvweb_url(diff_name)
+        return entry
+
+    def abort(self) -> None:
+        # Closing with an error removes the partial changes file, a previous diff stays in place
+        error = RuntimeError("comparison failed")
+        self._stack.__exit__(type(error), error, None)
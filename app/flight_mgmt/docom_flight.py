@@ -0,0 +1,272 @@
+# app/flight_mgmt/docom_flight.py
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from starlette.concurrency import run_in_threadpool
+from app.config_mgmt.docom_config import load_config
+from app.log_mgmt.docom_log_config import get_logger
+from app.workspace_mgmt.docom_workspace import atomic_write
+
+try:
+    import fcntl
+except ImportError:
+    # Windows locks a byte range of the lock file instead
+    fcntl = None
+    import msvcrt
+
+# Configuration section for single-flight request coordination
+FLIGHT_SECTION = "SingleFlight"
+
+# Request fields that do not change the result, requests differing only in them share one comparison
+IGNORED_FIELDS = {"session_id", "priority"}
+
+class FlightSettings:
+    def __init__(self, config=None) -> None:
+        """
+        How identical concurrent requests are coordinated.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        self.enabled = config.getboolean(FLIGHT_SECTION, "enabled", True)
+        # Lock and result files, shared by every HTTP worker of the host
+        self.directory = os.path.abspath(config.get(FLIGHT_SECTION, "directory", "app/flight") or "app/flight")
+        self.poll_interval = max(1, config.getint(FLIGHT_SECTION, "poll_interval_ms", 100)) / 1000
+        # Seconds a request waits for an identical one in another worker before running on its own
+        self.wait_timeout = config.getfloat(FLIGHT_SECTION, "wait_timeout", 900.0)
+
+class FileLock:
+    def __init__(self, path: str) -> None:
+        """
+        Exclusive lock on a file, held by one process of the host at a time.
+
+        The lock is released by the operating system when the process
+        holding it dies, so a killed worker never blocks the others.
+
+        Args:
+            path (str): The lock file, created when missing
+        """
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        """
+        Take the lock without waiting.
+
+        Returns:
+            bool: True if this process holds the lock now
+        """
+        lock_file = open(self.path, "a+b")
+        try:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        # Lock files in use are never pruned
+        os.utime(self.path)
+        return True
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+def request_key(name: str, request) -> str:
+    """
+    Identity of a comparison request.
+
+    Args:
+        name (str): Endpoint of the request, e.g. 'compare_pdf'
+        request (BaseModel): The request, IGNORED_FIELDS are left out
+
+    Returns:
+        str: Hex digest, equal for requests that produce the same result
+    """
+    fields = request.model_dump(mode="json", exclude=IGNORED_FIELDS)
+    return hashlib.sha256(json.dumps([name, fields], sort_keys=True).encode()).hexdigest()
+
+class Flight:
+    def __init__(self) -> None:
+        # One comparison in progress, the requests of this process waiting for it share its result
+        self.done = asyncio.Event()
+        self.result = None
+        self.succeeded = False
+
+class SingleFlight:
+    def __init__(self, settings: FlightSettings = None, logger=None) -> None:
+        """
+        Run identical concurrent requests once and share the result.
+
+        Within an HTTP worker the first request runs and the others await
+        it. Across the HTTP workers of a host the running request holds a
+        file lock named after the request; a request of another worker waits
+        for the lock and then reads the result the running one left next to
+        it, if that was written after it arrived. A failed comparison is not
+        shared, every waiting request then runs on its own.
+
+        Args:
+            settings (FlightSettings): Coordination settings, defaults to configuration.ini
+            logger (DOCCOMLogging): Logger instance, or None if logging is disabled
+        """
+        self.settings = settings or FlightSettings()
+        self.logger = logger
+        self._flights = {}
+        self.shared = 0
+
+    def _paths(self, key: str) -> tuple:
+        return os.path.join(self.settings.directory, f"{key}.lock"), os.path.join(self.settings.directory, f"{key}.json")
+
+    async def _lock(self, key: str):
+        # Polled without blocking so a cancelled request stops waiting
+        os.makedirs(self.settings.directory, exist_ok=True)
+        lock = FileLock(self._paths(key)[0])
+        deadline = time.monotonic() + self.settings.wait_timeout
+        while not await run_in_threadpool(lock.acquire):
+            if time.monotonic() >= deadline:
+                if self.logger:
+                    self.logger.warning(f"| Identical request still running after {self.settings.wait_timeout}s, running this one on its own: {key}")
+                return None
+            await asyncio.sleep(self.settings.poll_interval)
+        return lock
+
+    def _read_result(self, key: str, arrived: float):
+        # Only a result finished while this request waited is shared, older ones belong to earlier requests
+        result_path = self._paths(key)[1]
+        try:
+            if os.stat(result_path).st_mtime < arrived:
+                return None
+            with open(result_path) as result_file:
+                return json.load(result_file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_result(self, key: str, result) -> None:
+        try:
+            with atomic_write(self._paths(key)[1], "w") as result_file:
+                json.dump(result, result_file)
+        except (OSError, TypeError, ValueError) as e:
+            if self.logger:
+                self.logger.warning(f"| Result of {key} not shared with other workers: {e}")
+
+    async def _run_locked(self, key: str, compute):
+        arrived = time.time()
+        lock = await self._lock(key)
+        try:
+            if lock is not None:
+                result = await run_in_threadpool(self._read_result, key, arrived)
+                if result is not None:
+                    self.shared += 1
+                    return result
+            result = await compute()
+            if lock is not None:
+                await run_in_threadpool(self._write_result, key, result)
+            return result
+        finally:
+            if lock is not None:
+                lock.release()
+
+    async def run(self, key: str, compute):
+        """
+        Run a comparison unless an identical one is running, then wait for it.
+
+        Args:
+            key (str): Identity of the request, from request_key
+            compute: Coroutine function running the comparison, called with no arguments
+
+        Returns:
+            The result of compute, or of the identical comparison it waited for
+        """
+        while key in self._flights:
+            flight = self._flights[key]
+            await flight.done.wait()
+            if flight.succeeded:
+                self.shared += 1
+                return flight.result
+        flight = self._flights[key] = Flight()
+        try:
+            flight.result = await self._run_locked(key, compute)
+            flight.succeeded = True
+            return flight.result
+        finally:
+            del self._flights[key]
+            flight.done.set()
+
+    def prune(self, max_age: float) -> int:
+        """
+        Remove result and lock files no request has used for max_age seconds.
+
+        Args:
+            max_age (float): Seconds since the file was last written or locked
+
+        Returns:
+            int: Files removed
+        """
+        removed = 0
+        cutoff = time.time() - max_age
+        try:
+            entries = list(os.scandir(self.settings.directory))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                if entry.name.endswith(".lock"):
+                    # A lock file is only removed while nobody holds it
+                    lock = FileLock(entry.path)
+                    if not lock.acquire():
+                        continue
+                    try:
+                        os.remove(entry.path)
+                    finally:
+                        lock.release()
+                else:
+                    os.remove(entry.path)
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+_single_flight = None
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight(logger=get_logger())
+    return _single_flight
+
+async def single_flight(name: str, request, compute) -> dict:
+    """
+    Run a comparison request once for all identical concurrent requests.
+
+    Args:
+        name (str): Endpoint of the request, e.g. 'compare_pdf'
+        request (BaseModel): The request
+        compute: Coroutine function running the comparison, called with no arguments
+
+    Returns:
+        dict: The response, with the session_id of this request
+    """
+    flights = get_single_flight()
+    if not flights.settings.enabled:
+        return await compute()
+    result = await flights.run(request_key(name, request), compute)
+    if isinstance(result, dict) and "session_id" in result:
+        # Shared results carry the session of the request that ran them
+        result = {**result, "session_id": request.session_id}
+    return result
@@ -0,0 +1,152 @@
+# app/input_mgmt/docom_input.py
+
+import hashlib
+import mmap
+import os
+from app.config_mgmt.docom_config import load_config
+from app.worker_mgmt.docom_preload import lazy_import
+
+# Heavy libraries are imported on first use
+cv2 = lazy_import("cv2")
+fitz = lazy_import("fitz") # PyMuPDF
+np = lazy_import("numpy")
+
+# Configuration section for input reading
+INPUT_SECTION = "Input"
+
+# Read size used when a file cannot be memory-mapped
+READ_CHUNK_SIZE = 8 * 1024 * 1024
+
+class InputDocument:
+    def __init__(self, path: str, use_mmap: bool = None, hash_algorithm: str = None) -> None:
+        """
+        Read-only view of a source file, memory-mapped where possible.
+
+        The content hash is computed while the file is read, so decoding and
+        hashing share a single pass over the data and the page cache.
+
+        Args:
+            path (str): File to read, usually the request's source path
+            use_mmap (bool): Override of [Input] mmap
+            hash_algorithm (str): Override of [Input] hash_algorithm, 'none' disables hashing
+        """
+        config = load_config()
+        self.path = path
+        self.use_mmap = config.getboolean(INPUT_SECTION, "mmap", True) if use_mmap is None else use_mmap
+        self.hash_algorithm = hash_algorithm or config.get(INPUT_SECTION, "hash_algorithm", "sha256")
+        self.size = 0
+        self.digest = None
+        self.buffer = None
+        self.memory_mapped = False
+        self._file = None
+        self._mmap = None
+
+    def open(self) -> "InputDocument":
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        hasher = None if self.hash_algorithm.lower() == "none" else hashlib.new(self.hash_algorithm)
+
+        if self.use_mmap and self.size:
+            try:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Some network file systems refuse mappings, read the file instead
+                self._mmap = None
+
+        if self._mmap is not None:
+            self.memory_mapped = True
+            self.buffer = memoryview(self._mmap)
+            if hasher:
+                hasher.update(self.buffer)
+        else:
+            # One sequential read into a preallocated buffer, hashed chunk by chunk as it arrives
+            data = bytearray(self.size)
+            view = memoryview(data)
+            offset = 0
+            while offset < self.size:
+                read = self._file.readinto(view[offset:offset + READ_CHUNK_SIZE])
+                if not read:
+                    break
+                if hasher:
+                    hasher.update(view[offset:offset + read])
+                offset += read
+            view.release()
+            self.buffer = memoryview(data)[:offset]
+
+        if hasher:
+            self.digest = hasher.hexdigest()
+        return self
+
+    def close(self) -> None:
+        if self.buffer is not None:
+            self.buffer.release()
+            self.buffer = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "InputDocument":
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+def read_image(path: str, flags: int = None) -> tuple:
+    """
+    Decode an image from a memory-mapped file.
+
+    Args:
+        path (str): Image file
+        flags (int): cv2.imdecode flags, cv2.IMREAD_COLOR by default
+
+    Returns:
+        tuple: The decoded image (or None if it cannot be decoded) and the file's content hash
+    """
+    flags = cv2.IMREAD_COLOR if flags is None else flags
+    with InputDocument(path) as input_document:
+        encoded = np.frombuffer(input_document.buffer, dtype=np.uint8)
+        image = cv2.imdecode(encoded, flags)
+        # The mapping cannot be closed while an array still exports it
+        del encoded
+        return image, input_document.digest
+
+class PDFInput:
+    def __init__(self, path: str) -> None:
+        """
+        PyMuPDF document opened from a memory-mapped source file.
+
+        Args:
+            path (str): PDF file
+        """
+        self.input_document = InputDocument(path)
+        self.document = None
+        self.digest = None
+
+    def open(self) -> "PDFInput":
+        self.input_document.open()
+        self.digest = self.input_document.digest
+        try:
+            # Recent PyMuPDF releases read straight from the mapped buffer
+            self.document = fitz.open(stream=self.input_document.buffer, filetype="pdf")
+        except TypeError:
+            # Older releases only take bytes, hand over one contiguous copy of the buffer
+            self.document = fitz.open(stream=bytes(self.input_document.buffer), filetype="pdf")
+        return self
+
+    def close(self) -> None:
+        if self.document is not None:
+            self.document.close()
+            self.document = None
+        self.input_document.close()
+
+    def __enter__(self) -> "PDFInput":
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+def open_pdf(path: str) -> PDFInput:
+    return PDFInput(path)
@@ -1,5 +1,7 @@
 import logging
 import os
+from functools import lru_cache
+from app.config_mgmt.docom_config import load_config
 
 class DOCCOMLogging:
     def __init__(self, log_file='doccom.log', log_level=logging.INFO):
@@ -24,4 +26,15 @@ class DOCCOMLogging:
             # Create the log file if it doesn't exist
             open(self.log_file, 'a').close()
             return False
-        return any(isinstance(handler, logging.FileHandler) and handler.baseFilename == self.log_file for handler in logger.handlers)
\ No newline at end of file
+        return any(isinstance(handler, logging.FileHandler) and handler.baseFilename == self.log_file for handler in logger.handlers)
+@lru_cache(maxsize=1)
+def get_logger():
+    """
+    Return the process wide logger, configured once on first use.
+
+    Returns:
+        logging.Logger: The configured logger, or None if logging is disabled
+    """
+    if not load_config().getboolean("Logging", "logging_enabled", False):
+        return None
+    return DOCCOMLogging().configure_logger()
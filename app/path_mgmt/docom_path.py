@@ -0,0 +1,165 @@
+# app/path_mgmt/docom_path.py
+
+import os
+import re
+from functools import lru_cache
+from pathlib import Path, PurePosixPath, PureWindowsPath
+from fastapi import HTTPException
+from app.config_mgmt.docom_config import load_config
+
+# Section of configuration.ini holding the UNC/Windows to local mount mappings
+PATH_MAPPING_SECTION = "PathMapping"
+
+# Separator between the source prefix and the local mount in a mapping entry
+MAPPING_SEPARATOR = "->"
+
+# Name of the folder the result URLs are relative to
+CVWEB_FOLDER = "CVWeb"
+
+_WINDOWS_PATH = re.compile(r"^(\\\\|[A-Za-z]:[\\/])")
+
+def is_windows_path(path: str) -> bool:
+    # UNC paths, drive letter paths and anything using backslash separators
+    return bool(_WINDOWS_PATH.match(path)) or "\\" in path
+
+def pure_path(path: str):
+    """
+    Parse a request path with the flavour it was written in.
+
+    Args:
+        path (str): The path as received in the request
+
+    Returns:
+        PureWindowsPath | PurePosixPath: The parsed path
+    """
+    if is_windows_path(path):
+        return PureWindowsPath(path)
+    return PurePosixPath(path)
+
+class PathMapper:
+    def __init__(self, mappings: list) -> None:
+        """
+        Map UNC/Windows request paths onto local mount points.
+
+        Args:
+            mappings (list): (source prefix, local mount) pairs, e.g.
+                (r"\\\\fileserver\\CVShare", "/mnt/cvshare")
+        """
+        # Longest prefix first so nested shares win over their parents
+        parsed = [(pure_path(source), Path(local)) for source, local in mappings]
+        self.mappings = sorted(parsed, key=lambda mapping: len(mapping[0].parts), reverse=True)
+
+    @classmethod
+    def from_config(cls, config=None) -> "PathMapper":
+        # Entries look like: share = \\fileserver\CVShare -> /mnt/cvshare
+        config = config or load_config()
+        mappings = []
+        for value in config.items(PATH_MAPPING_SECTION).values():
+            if value and MAPPING_SEPARATOR in value:
+                source, local = value.split(MAPPING_SEPARATOR, 1)
+                mappings.append((source.strip(), local.strip()))
+        return cls(mappings)
+
+    def _match(self, source, prefix) -> bool:
+        if type(source) is not type(prefix) or len(prefix.parts) > len(source.parts):
+            return False
+        source_parts = source.parts[:len(prefix.parts)]
+        if isinstance(source, PureWindowsPath):
+            # Windows paths are case insensitive
+            return [part.lower() for part in source_parts] == [part.lower() for part in prefix.parts]
+        return list(source_parts) == list(prefix.parts)
+
+    def to_local(self, path: str) -> Path:
+        """
+        Translate a request path to a path usable on this host.
+
+        Args:
+            path (str): The path as received in the request
+
+        Returns:
+            Path: The local path
+
+        Raises:
+            ValueError: If a Windows path has no mapping on a non-Windows host
+        """
+        source = pure_path(path)
+        for prefix, local in self.mappings:
+            if self._match(source, prefix):
+                return local.joinpath(*source.parts[len(prefix.parts):])
+        if isinstance(source, PureWindowsPath) and os.name != "nt":
+            raise ValueError(f"No path mapping configured for {path}")
+        return Path(path)
+
+class DocumentPath:
+    def __init__(self, path: str, mapper: PathMapper = None) -> None:
+        """
+        A source document as addressed by the request and as found locally.
+
+        The file server layout is <...>\\CVWeb\\<...>\\<report folder>\\<version>\\<file>,
+        results are written to the report folder and linked relative to CVWeb.
+
+        Args:
+            path (str): The decoded path from the request
+            mapper (PathMapper): Mapper used to resolve the local path
+        """
+        self.source = path
+        self.source_parts = pure_path(path).parts
+        self.local = (mapper or get_path_mapper()).to_local(path)
+
+    def __str__(self) -> str:
+        return str(self.local)
+
+    @property
+    def name(self) -> str:
+        return self.local.name
+
+    @property
+    def version(self) -> str:
+        # The folder holding the document is named after its version
+        return self.local.parent.name
+
+    @property
+    def directory(self) -> Path:
+        return self.local.parent
+
+    @property
+    def report_directory(self) -> Path:
+        return self.local.parent.parent
+
+    @property
+    def suffix(self) -> str:
+        return self.local.suffix
+
+    def cvweb_url(self, file_name: str) -> str:
+        """
+        Build the CVWeb relative URL of a file in the report folder.
+
+        Args:
+            file_name (str): Name of the file written to the report folder
+
+        Returns:
+            str: The URL, e.g. CVWeb//Documents//Report//comparison_result.html
+        """
+        report_parts = list(self.source_parts[:-2])
+        cvweb_index = report_parts.index(CVWEB_FOLDER)
+        return '//'.join(report_parts[cvweb_index:]) + "//" + file_name
+
+@lru_cache(maxsize=1)
+def get_path_mapper() -> PathMapper:
+    # Mappings are read once per process from configuration.ini
+    return PathMapper.from_config()
+
+def resolve_document_path(path: str) -> DocumentPath:
+    """
+    Resolve a request path, raising a client error if it cannot be mapped.
+
+    Args:
+        path (str): The decoded path from the request
+
+    Returns:
+        DocumentPath: The resolved document path
+    """
+    try:
+        return DocumentPath(path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,255 @@
+# app/reader_mgmt/docom_reader.py
+
+import importlib.util
+from abc import ABC, abstractmethod
+import os
+from functools import lru_cache
+from app.config_mgmt.docom_config import load_config
+from app.worker_mgmt.docom_preload import lazy_import
+
+# Heavy libraries are imported on first use
+pd = lazy_import("pandas")
+openpyxl = lazy_import("openpyxl")
+
+# Configuration section for spreadsheet reading
+READER_SECTION = "Reader"
+
+# Error values Excel stores in cells, read as missing like pandas does
+EXCEL_ERROR_VALUES = ["#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"]
+
+class ReaderEngine(ABC):
+    def __init__(self, name: str, module: str = "") -> None:
+        """
+        A way of parsing spreadsheets into DataFrames.
+
+        Args:
+            name (str): Value of [Reader] engine selecting it
+            module (str): Package the engine needs, empty if it only needs pandas
+        """
+        self.name = name
+        self.module = module
+
+    @property
+    def available(self) -> bool:
+        return not self.module or importlib.util.find_spec(self.module) is not None
+
+    @abstractmethod
+    def sheet_names(self, file_path: str) -> list:
+        """
+        Names of the worksheets of a file.
+
+        Args:
+            file_path (str): The spreadsheet
+
+        Returns:
+            list: Worksheet names in workbook order
+        """
+
+    @abstractmethod
+    def read(self, file_path: str, sheet_name, header):
+        """
+        Parse worksheets of a file.
+
+        Args:
+            file_path (str): The spreadsheet
+            sheet_name: Worksheet name, or None for every worksheet
+            header: Row number of the header, None when every row is data
+
+        Returns:
+            DataFrame, or a dict of worksheet name to DataFrame when sheet_name is None
+
+        Raises:
+            ValueError: If the worksheet does not exist
+        """
+
+class PandasExcelEngine(ReaderEngine):
+    # One of the pd.read_excel engines, 'pandas' lets pandas pick from the file format
+    def _engine(self):
+        return None if self.name == "pandas" else self.name
+
+    def sheet_names(self, file_path: str) -> list:
+        with pd.ExcelFile(file_path, engine=self._engine()) as excel_file:
+            return list(excel_file.sheet_names)
+
+    def read(self, file_path: str, sheet_name, header):
+        return pd.read_excel(file_path, sheet_name=sheet_name, header=header, engine=self._engine())
+
+class OpenpyxlStreamEngine(ReaderEngine):
+    """
+    Stream cell values out of a read-only openpyxl workbook.
+
+    The openpyxl engine of pandas builds a cell object per cell and converts
+    each one in Python; reading values_only rows skips both. Rows are trimmed
+    and parsed exactly as pd.read_excel does, so the frames are the same.
+    """
+    def _open(self, file_path: str):
+        return openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+
+    def sheet_names(self, file_path: str) -> list:
+        workbook = self._open(file_path)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+
+    def _frame(self, worksheet, header):
+        # The dimension record of a read-only sheet may be wrong, read every row
+        worksheet.reset_dimensions()
+        rows = []
+        last_row_with_data = -1
+        for row_number, values in enumerate(worksheet.iter_rows(values_only=True)):
+            row = list(values)
+            while row and row[-1] is None:
+                row.pop()
+            if row:
+                last_row_with_data = row_number
+            rows.append(row)
+        rows = rows[:last_row_with_data + 1]
+        if not rows:
+            return pd.DataFrame()
+        width = max(len(row) for row in rows)
+        rows = [row + [None] * (width - len(row)) for row in rows]
+        return pd.io.parsers.TextParser(rows, header=header, na_values=EXCEL_ERROR_VALUES).read()
+
+    def read(self, file_path: str, sheet_name, header):
+        workbook = self._open(file_path)
+        try:
+            if sheet_name is None:
+                return {worksheet.title: self._frame(worksheet, header) for worksheet in workbook.worksheets}
+            if sheet_name not in workbook.sheetnames:
+                raise ValueError(f"Worksheet named '{sheet_name}' not found")
+            return self._frame(workbook[sheet_name], header)
+        finally:
+            workbook.close()
+
+class CsvEngine(ReaderEngine):
+    # A CSV file is a workbook with a single worksheet named after the file
+    def __init__(self, name: str, module: str = "", csv_engine: str = "c") -> None:
+        super().__init__(name, module)
+        self.csv_engine = csv_engine
+
+    def sheet_names(self, file_path: str) -> list:
+        return [os.path.splitext(os.path.basename(file_path))[0]]
+
+    def read(self, file_path: str, sheet_name, header):
+        name = self.sheet_names(file_path)[0]
+        if sheet_name not in (None, name):
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        frame = pd.read_csv(file_path, header=header, engine=self.csv_engine)
+        return {name: frame} if sheet_name is None else frame
+
+# Engines selectable with [Reader] engine, extended with register_reader_engine
+READER_ENGINES = {}
+
+def register_reader_engine(engine: ReaderEngine) -> None:
+    """
+    Make a reader engine selectable by name.
+
+    Args:
+        engine (ReaderEngine): The engine, selected by its name
+    """
+    READER_ENGINES[engine.name] = engine
+
+for _engine in (
+    PandasExcelEngine("calamine", "python_calamine"),
+    OpenpyxlStreamEngine("openpyxl_stream", "openpyxl"),
+    PandasExcelEngine("openpyxl", "openpyxl"),
+    PandasExcelEngine("xlrd", "xlrd"),
+    PandasExcelEngine("pyxlsb", "pyxlsb"),
+    PandasExcelEngine("odf", "odf"),
+    PandasExcelEngine("pandas"),
+    CsvEngine("pyarrow", "pyarrow", csv_engine="pyarrow"),
+    CsvEngine("csv"),
+):
+    register_reader_engine(_engine)
+
+# Engines tried in auto mode by file extension, the first installed one wins.
+# Entries marked True are only used from [Reader] large_file_mb, file size
+# only ever chooses between engines that produce the same frames.
+AUTO_ENGINES = {
+    ".xlsx": [("calamine", False), ("openpyxl_stream", True), ("openpyxl", False)],
+    ".xlsm": [("calamine", False), ("openpyxl_stream", True), ("openpyxl", False)],
+    ".xlsb": [("calamine", False), ("pyxlsb", False)],
+    ".xls": [("calamine", False), ("xlrd", False)],
+    ".ods": [("calamine", False), ("odf", False)],
+    ".csv": [("pyarrow", False), ("csv", False)],
+}
+
+class SpreadsheetReader:
+    def __init__(self, config=None) -> None:
+        """
+        Parse spreadsheets with the fastest installed engine for each file.
+
+        In auto mode the engine is picked by file extension and size from
+        AUTO_ENGINES: calamine for every Excel format when it is installed,
+        otherwise values-only openpyxl streaming for large .xlsx files and
+        xlrd for .xls, pyarrow for CSV. Setting [Reader] engine to a name
+        reads every file with that engine.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+
+        Raises:
+            ValueError: If the configured engine is unknown or not installed
+        """
+        config = config or load_config()
+        self.engine = (config.get(READER_SECTION, "engine", "auto") or "auto").lower()
+        if self.engine != "auto":
+            if self.engine not in READER_ENGINES:
+                raise ValueError(f"Unknown [Reader] engine: {self.engine}")
+            if not READER_ENGINES[self.engine].available:
+                raise ValueError(f"[Reader] engine {self.engine} needs {READER_ENGINES[self.engine].module} installed")
+        # Files from this size on count as large in auto mode
+        self.large_file_bytes = config.getfloat(READER_SECTION, "large_file_mb", 1) * 1024 * 1024
+
+    def select_engine(self, file_path: str) -> ReaderEngine:
+        """
+        Engine a file is parsed with.
+
+        Args:
+            file_path (str): The spreadsheet
+
+        Returns:
+            ReaderEngine: The configured engine, or the auto choice for the file
+        """
+        if self.engine != "auto":
+            return READER_ENGINES[self.engine]
+        extension = os.path.splitext(file_path)[1].lower()
+        try:
+            large = os.path.getsize(file_path) >= self.large_file_bytes
+        except OSError:
+            large = False
+        for name, large_only in AUTO_ENGINES.get(extension, []):
+            engine = READER_ENGINES.get(name)
+            if engine is not None and engine.available and (large or not large_only):
+                return engine
+        return READER_ENGINES["pandas"]
+
+    def sheet_names(self, file_path: str) -> list:
+        return self.select_engine(file_path).sheet_names(file_path)
+
+    def read_sheet(self, file_path: str, sheet_name: str, header=None):
+        """
+        Parse one worksheet.
+
+        Args:
+            file_path (str): The spreadsheet
+            sheet_name (str): The worksheet
+            header: Row number of the header, None when every row is data
+
+        Returns:
+            DataFrame: The worksheet
+
+        Raises:
+            ValueError: If the worksheet does not exist
+        """
+        return self.select_engine(file_path).read(file_path, sheet_name, header)
+
+    def read_all_sheets(self, file_path: str, header=None) -> dict:
+        # Every worksheet in one parse, keyed by name in workbook order
+        return self.select_engine(file_path).read(file_path, None, header)
+
+@lru_cache(maxsize=1)
+def get_spreadsheet_reader() -> SpreadsheetReader:
+    # Configured once per process
+    return SpreadsheetReader()
@@ -0,0 +1,230 @@
+# app/region_mgmt/docom_regions.py
+
+import importlib
+from functools import lru_cache
+from app.config_mgmt.docom_config import load_config
+from app.worker_mgmt.docom_preload import lazy_import
+
+# Heavy libraries are imported on first use
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Configuration section for difference region classification
+REGIONS_SECTION = "Regions"
+
+def ink_backend(crop1, crop2, tolerance: float = 0.1) -> bool:
+    """
+    Local stand-in for an OCR engine: confirm a region when its ink changed.
+
+    Both crops are binarized with Otsu's threshold; compression noise moves a
+    few edge pixels while an edited glyph changes a large share of the ink.
+
+    Args:
+        crop1: Grayscale region of the first page
+        crop2: Grayscale region of the second page
+        tolerance (float): Share of the ink that must differ
+
+    Returns:
+        bool: True if the region is a real change
+    """
+    _, ink1 = cv2.threshold(crop1, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, ink2 = cv2.threshold(crop2, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    ink = max(cv2.countNonZero(ink1), cv2.countNonZero(ink2))
+    if ink == 0:
+        return False
+    return cv2.countNonZero(cv2.bitwise_xor(ink1, ink2)) / ink > tolerance
+
+def tesseract_backend(crop1, crop2, tolerance: float = 0.1) -> bool:
+    """
+    Confirm text regions whose recognized text changed, needs pytesseract.
+
+    Regions without text in either page are not text changes and keep the
+    pixel diff's verdict.
+    """
+    pytesseract = importlib.import_module("pytesseract")
+    text1 = pytesseract.image_to_string(crop1).strip()
+    text2 = pytesseract.image_to_string(crop2).strip()
+    if not text1 and not text2:
+        return True
+    return text1 != text2
+
+# OCR backends selectable with [Regions] ocr_backend, extended with register_ocr_backend
+OCR_BACKENDS = {"ink": ink_backend, "tesseract": tesseract_backend}
+
+def register_ocr_backend(name: str, backend) -> None:
+    """
+    Make an OCR backend selectable by name.
+
+    Args:
+        name (str): Value of [Regions] ocr_backend selecting it
+        backend: Callable (crop1, crop2, tolerance) -> bool confirming a region
+    """
+    OCR_BACKENDS[name] = backend
+
+def load_ocr_backend(name: str):
+    # A registered name, or 'package.module:function' for a backend outside the service
+    if not name or name.lower() == "none":
+        return None
+    if name in OCR_BACKENDS:
+        return OCR_BACKENDS[name]
+    if ":" in name:
+        module_name, function_name = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), function_name)
+    raise ValueError(f"Unknown [Regions] ocr_backend: {name}")
+
+class RegionClassifier:
+    def __init__(self, config=None) -> None:
+        """
+        Turn a thresholded difference mask into the regions worth annotating.
+
+        The mask is cleaned with a morphological opening (isolated noise
+        pixels) and closing (broken strokes), labelled once with
+        connectedComponentsWithStats, and the components are filtered by area
+        and density in a single vectorized step. Components closer than
+        merge_distance pixels are merged into one region, and an optional OCR
+        backend then confirms the remaining regions.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        self.enabled = config.getboolean(REGIONS_SECTION, "enabled", True)
+        self.opening_kernel = config.getint(REGIONS_SECTION, "opening_kernel", 2)
+        self.closing_kernel = config.getint(REGIONS_SECTION, "closing_kernel", 3)
+        # Smallest component kept, in pixels of the diffed image
+        self.min_area = config.getint(REGIONS_SECTION, "min_area", 6)
+        # Smallest share of its bounding box a component must fill
+        self.min_density = config.getfloat(REGIONS_SECTION, "min_density", 0.05)
+        # Components this many pixels apart or closer become one region, 0 keeps them apart
+        self.merge_distance = config.getint(REGIONS_SECTION, "merge_distance", 0)
+        self.ocr_backend = load_ocr_backend(config.get(REGIONS_SECTION, "ocr_backend", "none"))
+        self.ocr_tolerance = config.getfloat(REGIONS_SECTION, "ocr_tolerance", 0.1)
+
+    def _morphology(self, mask, operation, size: int):
+        if size <= 1:
+            return mask
+        return cv2.morphologyEx(mask, operation, cv2.getStructuringElement(cv2.MORPH_RECT, (size, size)))
+
+    def _merge(self, labels, label_count: int, kept_labels, boxes):
+        # Dilate the kept components only, so dropped noise cannot bridge two regions
+        kept_lookup = np.zeros(label_count, dtype=np.uint8)
+        kept_lookup[kept_labels] = 255
+        size = 2 * self.merge_distance + 1
+        merged_mask = cv2.dilate(kept_lookup[labels], cv2.getStructuringElement(cv2.MORPH_RECT, (size, size)))
+        _, groups = cv2.connectedComponents(merged_mask, connectivity=8)
+
+        # Group of every kept component, read at its first pixel
+        flat_labels = labels.ravel()
+        ink = np.flatnonzero(kept_lookup[flat_labels])
+        component_labels, first_pixel = np.unique(flat_labels[ink], return_index=True)
+        component_groups = groups.ravel()[ink[first_pixel]]
+        group_of = np.zeros(label_count, dtype=np.int64)
+        group_of[component_labels] = component_groups
+        _, group_index = np.unique(group_of[kept_labels], return_inverse=True)
+
+        # Union of the boxes of each group
+        corners = np.column_stack((boxes[:, 0], boxes[:, 1], boxes[:, 0] + boxes[:, 2], boxes[:, 1] + boxes[:, 3]))
+        group_count = group_index.max() + 1
+        lower = np.full((group_count, 2), np.iinfo(np.int32).max, dtype=np.int32)
+        upper = np.zeros((group_count, 2), dtype=np.int32)
+        np.minimum.at(lower, group_index, corners[:, :2])
+        np.maximum.at(upper, group_index, corners[:, 2:])
+        return np.column_stack((lower, upper - lower)).astype(np.int32)
+
+    def classify(self, mask, gray1=None, gray2=None):
+        """
+        Find the difference regions of a thresholded mask.
+
+        Args:
+            mask: Binary difference mask, 255 where the images differ
+            gray1: First grayscale image, needed by the OCR backend
+            gray2: Second grayscale image, needed by the OCR backend
+
+        Returns:
+            numpy.ndarray: (N, 4) int32 array of x, y, w, h bounding boxes in mask pixels
+        """
+        # Label only the part of the mask that holds differences, usually a few lines of a page
+        left, top, width, height = cv2.boundingRect(mask)
+        if not width or not height:
+            return np.empty((0, 4), dtype=np.int32)
+        margin = max(self.closing_kernel, self.merge_distance) if self.enabled else 0
+        right = min(mask.shape[1], left + width + margin)
+        bottom = min(mask.shape[0], top + height + margin)
+        left, top = max(0, left - margin), max(0, top - margin)
+        offset = np.array([left, top, 0, 0], dtype=np.int32)
+        mask = mask[top:bottom, left:right]
+
+        if self.enabled:
+            mask = self._morphology(mask, cv2.MORPH_OPEN, self.opening_kernel)
+            mask = self._morphology(mask, cv2.MORPH_CLOSE, self.closing_kernel)
+        # Block based labelling, several times faster than the default on sparse masks
+        label_count, labels, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(mask, 8, cv2.CV_32S, cv2.CCL_GRANA)
+        if not self.enabled:
+            # Every component is a region, as before classification existed
+            return stats[1:, :4].astype(np.int32) + offset
+
+        # Label 0 is the background
+        stats = stats[1:]
+        widths = stats[:, cv2.CC_STAT_WIDTH]
+        heights = stats[:, cv2.CC_STAT_HEIGHT]
+        areas = stats[:, cv2.CC_STAT_AREA]
+        keep = (areas >= self.min_area) & (areas >= self.min_density * widths * heights)
+        boxes = stats[keep, :4].astype(np.int32)
+
+        if self.merge_distance > 0 and len(boxes) > 1:
+            boxes = self._merge(labels, label_count, np.flatnonzero(keep) + 1, boxes)
+
+        boxes += offset
+        if self.ocr_backend is not None and gray1 is not None and gray2 is not None and len(boxes):
+            confirmed = [
+                self.ocr_backend(gray1[y:y + h, x:x + w], gray2[y:y + h, x:x + w], self.ocr_tolerance)
+                for x, y, w, h in boxes
+            ]
+            boxes = boxes[np.array(confirmed, dtype=bool)]
+        return boxes
+
+def shade_boxes(image, boxes, color: tuple, opacity: float) -> None:
+    """
+    Shade boxes on an image in place, all of them in one blend.
+
+    Overlapping boxes are shaded once, their union is blended with the fill.
+
+    Args:
+        image: BGR image
+        boxes: (N, 4) array of x, y, w, h boxes in image pixels
+        color (tuple): BGR fill colour
+        opacity (float): Opacity of the fill
+    """
+    boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+    if not len(boxes):
+        return
+    # Union of the boxes, edges included as a filled polygon of their corners would be
+    mask = np.zeros(image.shape[:2], dtype=bool)
+    for x, y, w, h in np.clip(boxes, 0, None):
+        mask[y:y + h + 1, x:x + w + 1] = True
+    overlay = image.copy()
+    overlay[mask] = color
+    cv2.addWeighted(overlay, opacity, image, 1 - opacity, 0, image)
+
+def underline_boxes(image, boxes, color: tuple, thickness: int) -> None:
+    """
+    Draw a line just below each box in place, all of them in one call.
+
+    Args:
+        image: BGR image
+        boxes: (N, 4) array of x, y, w, h boxes in image pixels
+        color (tuple): BGR line colour
+        thickness (int): Line thickness in pixels
+    """
+    boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+    if not len(boxes):
+        return
+    x, y, w, h = boxes.T
+    underline_y = y + h + thickness
+    lines = np.stack((np.column_stack((x, underline_y)), np.column_stack((x + w, underline_y))), axis=1)
+    cv2.polylines(image, list(lines), False, color, thickness)
+
+@lru_cache(maxsize=1)
+def get_region_classifier() -> RegionClassifier:
+    # Configured once per process
+    return RegionClassifier()
@@ -0,0 +1,94 @@
+# app/render_mgmt/docom_render.py
+
+import math
+from app.config_mgmt.docom_config import load_config
+
+# Configuration section for PDF page rendering
+RENDER_SECTION = "Render"
+
+# Colorspaces the diff rasters can be rendered in
+DIFF_COLORSPACES = ("gray", "rgb")
+
+class RenderProfile:
+    def __init__(self, config=None) -> None:
+        """
+        Resolutions and colorspace PDF pages are rendered at.
+
+        Pages are rendered twice when the diff needs less than the report
+        shows: an RGB display image at display_dpi for the report and a diff
+        raster at diff_dpi, grayscale by default, that the pixel diff runs on.
+        In auto mode both resolutions are capped per page so a page never
+        exceeds pixel_budget pixels, whatever its paper size.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        self.display_dpi = config.getint(RENDER_SECTION, "display_dpi", 300)
+        # 0 diffs the display images themselves, as before render profiles existed
+        self.diff_dpi = config.getint(RENDER_SECTION, "diff_dpi", 0)
+        self.diff_colorspace = (config.get(RENDER_SECTION, "diff_colorspace", "gray") or "gray").lower()
+        if self.diff_colorspace not in DIFF_COLORSPACES:
+            raise ValueError(f"[Render] diff_colorspace must be one of {', '.join(DIFF_COLORSPACES)}")
+        self.auto_dpi = config.getboolean(RENDER_SECTION, "auto_dpi", False)
+        self.pixel_budget = config.getint(RENDER_SECTION, "pixel_budget", 12_000_000)
+
+    @property
+    def separate_diff(self) -> bool:
+        # A dedicated diff raster is rendered only when it differs from the display image
+        return bool(self.diff_dpi) and (self.diff_dpi != self.display_dpi or self.diff_colorspace != "rgb")
+
+    def page_dpi(self, dpi: float, width_points: float, height_points: float) -> float:
+        """
+        Resolution to render a page at.
+
+        Args:
+            dpi (float): Requested resolution
+            width_points (float): Page width in points
+            height_points (float): Page height in points
+
+        Returns:
+            float: The requested resolution, capped to the pixel budget in auto mode
+        """
+        if not self.auto_dpi or not self.pixel_budget or width_points <= 0 or height_points <= 0:
+            return dpi
+        # pixels = (width / 72 * dpi) * (height / 72 * dpi)
+        budget_dpi = 72 * math.sqrt(self.pixel_budget / (width_points * height_points))
+        return min(dpi, budget_dpi)
+
+    def display_page_dpi(self, width_points: float, height_points: float) -> float:
+        return self.page_dpi(self.display_dpi, width_points, height_points)
+
+    def diff_page_dpi(self, width_points: float, height_points: float) -> float:
+        return self.page_dpi(self.diff_dpi or self.display_dpi, width_points, height_points)
+
+    def page_pixels(self, dpi: float, width_points: float, height_points: float) -> float:
+        return (width_points / 72 * dpi) * (height_points / 72 * dpi)
+
+# Configuration section for the report page images
+PREVIEW_SECTION = "Preview"
+
+class PreviewSettings:
+    def __init__(self, config=None) -> None:
+        """
+        How the report shows PDF pages.
+
+        In tiered mode only small previews are rendered with the comparison and
+        the report links every preview to a full resolution page that is
+        rendered and cached the first time it is requested. In full mode every
+        page is rendered at display resolution up front, as before.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        self.mode = (config.get(PREVIEW_SECTION, "mode", "full") or "full").lower()
+        self.preview_dpi = config.getint(PREVIEW_SECTION, "preview_dpi", 60)
+        self.preview_format = (config.get(PREVIEW_SECTION, "preview_format", "webp") or "webp").lower()
+        self.preview_quality = config.getint(PREVIEW_SECTION, "preview_quality", 75)
+        # Base URL of the full resolution endpoint as seen from the report
+        self.full_resolution_url = config.get(PREVIEW_SECTION, "full_resolution_url", "/api/v1/compare_pdf/page")
+
+    @property
+    def tiered(self) -> bool:
+        return self.mode == "tiered"
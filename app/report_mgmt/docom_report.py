@@ -0,0 +1,98 @@
+# app/report_mgmt/docom_report.py
+
+import os
+from functools import lru_cache
+import jinja2
+from app.config_mgmt.docom_config import load_config
+from app.workspace_mgmt.docom_workspace import atomic_write
+from app.static_mgmt.docom_static import precompress
+
+# Configuration section for report rendering
+REPORT_SECTION = "Report"
+
+# Report templates shipped with the package, extending base.html
+TEMPLATE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+class ReportSettings:
+    def __init__(self, config=None) -> None:
+        """
+        How report templates are loaded and compiled.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        # Directory compiled templates are kept in, shared by every worker process and across restarts, empty compiles in memory only
+        self.bytecode_cache = config.get(REPORT_SECTION, "bytecode_cache", "") or ""
+        # Check template files for changes before every render, for editing templates on a running service
+        self.auto_reload = config.getboolean(REPORT_SECTION, "auto_reload", False)
+
+@lru_cache(maxsize=2)
+def get_report_environment(enable_async: bool = False) -> jinja2.Environment:
+    """
+    The Jinja environment every report is rendered with, one per process.
+
+    Templates are compiled once per process and kept in the bytecode cache,
+    so a new worker process loads them without lexing and compiling.
+
+    Args:
+        enable_async (bool): Environment for render_async, used from the event loop
+
+    Returns:
+        jinja2.Environment: Environment loading the package templates
+    """
+    settings = ReportSettings()
+    bytecode_cache = None
+    if settings.bytecode_cache:
+        # Async templates compile to different code, they are cached apart
+        directory = os.path.join(settings.bytecode_cache, "async") if enable_async else settings.bytecode_cache
+        os.makedirs(directory, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(os.path.abspath(directory))
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIRECTORY),
+        bytecode_cache=bytecode_cache,
+        auto_reload=settings.auto_reload,
+        enable_async=enable_async,
+        # Block tags take no lines of their own in the rendered reports
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+
+def render_report(template_name: str, **context) -> str:
+    """
+    Render a report template.
+
+    Args:
+        template_name (str): Template file, e.g. 'excel.html'
+        **context: Template variables
+
+    Returns:
+        str: The rendered HTML
+    """
+    return get_report_environment().get_template(template_name).render(**context)
+
+async def render_report_async(template_name: str, **context) -> str:
+    # Renders on the event loop, template variables may be awaitables or async iterables
+    return await get_report_environment(enable_async=True).get_template(template_name).render_async(**context)
+
+def write_report(template_name: str, destination: str, **context) -> str:
+    """
+    Render a report template straight into a file, piece by piece.
+
+    The report is never held in memory as a whole, so iterables in the
+    context are consumed while the file is written. The destination is
+    replaced atomically once the template is done, then precompressed.
+
+    Args:
+        template_name (str): Template file, e.g. 'excel_stream.html'
+        destination (str): Path of the report
+        **context: Template variables
+
+    Returns:
+        str: The destination
+    """
+    with atomic_write(destination, "w") as report_file:
+        for piece in get_report_environment().get_template(template_name).generate(**context):
+            report_file.write(piece)
+    precompress(destination)
+    return destination
@@ -0,0 +1,347 @@
+# app/static_mgmt/docom_static.py
+
+import gzip
+import hashlib
+import importlib
+import importlib.util
+import os
+import re
+import shutil
+from email.utils import formatdate, parsedate
+from functools import lru_cache
+from mimetypes import guess_type
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from app.config_mgmt.docom_config import load_config
+from app.workspace_mgmt.docom_workspace import atomic_write
+
+# Configuration section for precompressed reports and static file serving
+STATIC_SECTION = "Static"
+
+# File suffix of the precompressed variant of every encoding
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Read size when compressing and hashing files
+CHUNK_SIZE = 1024 * 1024
+
+# A name ending in a content hash or a UUID, e.g. report.3f2a9c1e0b7d4a61.html, is never rewritten
+CONTENT_ADDRESSED_NAME = re.compile(
+    r"(^|[._-])([0-9a-f]{16,}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(\.[A-Za-z0-9]+)+$"
+)
+
+# Single byte range of a Range header, e.g. bytes=0-1023, bytes=1024- or bytes=-512
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def brotli_available() -> bool:
+    # Brotli variants are optional, they need the brotli package installed next to the service
+    return importlib.util.find_spec("brotli") is not None
+
+class StaticSettings:
+    def __init__(self, config=None) -> None:
+        """
+        How reports are precompressed and how static files are served.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        encodings = [encoding.strip().lower() for encoding in (config.get(STATIC_SECTION, "encodings", "br, gzip") or "").split(",")]
+        # Encodings in order of preference, brotli only when it is installed
+        self.encodings = [encoding for encoding in encodings if encoding in ENCODING_SUFFIXES and (encoding != "br" or brotli_available())]
+        self.min_size = config.getint(STATIC_SECTION, "min_size_kb", 1) * 1024
+        self.gzip_level = config.getint(STATIC_SECTION, "gzip_level", 6)
+        self.brotli_quality = config.getint(STATIC_SECTION, "brotli_quality", 5)
+        extensions = config.get(STATIC_SECTION, "extensions", ".html, .json, .jsonl, .csv, .txt, .svg, .css, .js") or ""
+        self.extensions = {extension.strip().lower() for extension in extensions.split(",") if extension.strip()}
+        # Cache lifetime of content addressed files and the Cache-Control of every other file
+        self.immutable_max_age = config.getint(STATIC_SECTION, "immutable_max_age", 31536000)
+        self.cache_control = config.get(STATIC_SECTION, "cache_control", "no-cache") or "no-cache"
+
+    def compressible(self, path: str) -> bool:
+        return os.path.splitext(path)[1].lower() in self.extensions
+
+    def cache_control_for(self, path: str) -> str:
+        """
+        Cache-Control header of a static file.
+
+        Args:
+            path (str): The file
+
+        Returns:
+            str: Long lived and immutable for content addressed names, cache_control otherwise
+        """
+        if CONTENT_ADDRESSED_NAME.search(os.path.basename(path)):
+            return f"public, max-age={self.immutable_max_age}, immutable"
+        return self.cache_control
+
+@lru_cache(maxsize=1)
+def get_static_settings() -> StaticSettings:
+    # Configured once per process
+    return StaticSettings()
+
+def _gzip(input_file, output_file, level: int) -> None:
+    # No file name or time in the header, the same report always compresses to the same bytes
+    with gzip.GzipFile(filename="", mode="wb", fileobj=output_file, compresslevel=level, mtime=0) as compressed_file:
+        shutil.copyfileobj(input_file, compressed_file, CHUNK_SIZE)
+
+def _brotli(input_file, output_file, quality: int) -> None:
+    compressor = importlib.import_module("brotli").Compressor(quality=quality)
+    for chunk in iter(lambda: input_file.read(CHUNK_SIZE), b""):
+        output_file.write(compressor.process(chunk))
+    output_file.write(compressor.finish())
+
+def precompress(path: str, settings: StaticSettings = None, logger=None) -> list:
+    """
+    Write the compressed variants of a finished report next to it.
+
+    Every configured encoding gets a <path>.br or <path>.gz, written
+    atomically after the report, so the static file layer serves it
+    without compressing on the fly. Files too small, of an already
+    compressed format, or that do not shrink get no variants.
+
+    Args:
+        path (str): The report, already in place
+        settings (StaticSettings): Compression settings, defaults to configuration.ini
+        logger (DOCCOMLogging): Logger instance, or None if logging is disabled
+
+    Returns:
+        list: Paths of the variants written
+    """
+    settings = settings or get_static_settings()
+    if not settings.compressible(path):
+        return []
+    size = os.path.getsize(path)
+    if size < settings.min_size:
+        return []
+    variants = []
+    for encoding in settings.encodings:
+        variant = path + ENCODING_SUFFIXES[encoding]
+        try:
+            with open(path, "rb") as input_file, atomic_write(variant) as output_file:
+                if encoding == "br":
+                    _brotli(input_file, output_file, settings.brotli_quality)
+                else:
+                    _gzip(input_file, output_file, settings.gzip_level)
+        except OSError as e:
+            # The report itself is in place, it is served uncompressed
+            if logger:
+                logger.warning(f"| Precompressing {variant} failed: {e}")
+            continue
+        if os.path.getsize(variant) >= size:
+            os.remove(variant)
+            continue
+        variants.append(variant)
+    if logger:
+        logger.info(f"| Precompressed {path}: {', '.join(os.path.basename(variant) for variant in variants) or 'no smaller variant'}")
+    return variants
+
+@lru_cache(maxsize=4096)
+def _content_digest(path: str, size: int, mtime_ns: int) -> str:
+    # Keyed by size and modification time, a rewritten file is hashed again
+    with open(path, "rb") as input_file:
+        return hashlib.file_digest(input_file, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+
+async def content_etag(path: str, stat_result: os.stat_result) -> str:
+    # Strong ETag from the file's bytes, hashed off the event loop once per version of the file
+    digest = await anyio.to_thread.run_sync(_content_digest, path, stat_result.st_size, stat_result.st_mtime_ns)
+    return f'"{digest}"'
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """
+    Content codings a client accepts.
+
+    Args:
+        accept_encoding (str): The Accept-Encoding header
+
+    Returns:
+        set: Lower case codings, without those sent with q=0
+    """
+    accepted = set()
+    for entry in accept_encoding.split(","):
+        coding, _, parameters = entry.strip().partition(";")
+        quality = parameters.strip().lower()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding.strip():
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def negotiate_variant(path: str, stat_result: os.stat_result, accept_encoding: str, settings: StaticSettings) -> tuple:
+    """
+    Pick the precompressed variant of a file to send.
+
+    Args:
+        path (str): The file requested
+        stat_result (os.stat_result): Its stat result
+        accept_encoding (str): The Accept-Encoding header
+        settings (StaticSettings): Encodings in order of preference
+
+    Returns:
+        tuple: The encoding, variant path and its stat result, or ('', path, stat_result) to send the file itself
+    """
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in settings.encodings:
+        if encoding not in accepted and "*" not in accepted:
+            continue
+        try:
+            variant_stat = os.stat(path + ENCODING_SUFFIXES[encoding])
+        except OSError:
+            continue
+        # A variant older than the file is left over from a previous report
+        if variant_stat.st_mtime_ns >= stat_result.st_mtime_ns:
+            return encoding, path + ENCODING_SUFFIXES[encoding], variant_stat
+    return "", path, stat_result
+
+def not_modified(request_headers: Headers, etag: str, last_modified: str) -> bool:
+    # If-None-Match takes precedence over If-Modified-Since
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    if_modified_since = parsedate(request_headers.get("if-modified-since", ""))
+    return if_modified_since is not None and if_modified_since >= parsedate(last_modified)
+
+def byte_range(range_header: str, size: int):
+    """
+    The byte range a Range header asks for.
+
+    Only single ranges are served; a request for several ranges, or an
+    invalid one such as bytes=100-50, gets the whole file, as HTTP allows.
+
+    Args:
+        range_header (str): The Range header
+        size (int): Size of the file
+
+    Returns:
+        tuple: First and last byte, inclusive, None for the whole file, or () if the range is not satisfiable
+    """
+    match = BYTE_RANGE.match(range_header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range, the last bytes of the file
+        if int(last) == 0:
+            return ()
+        return max(0, size - int(last)), size - 1
+    if last and int(last) < int(first):
+        # An invalid range is ignored, RFC 9110 section 14.2
+        return None
+    if int(first) >= size:
+        return ()
+    return int(first), min(int(last), size - 1) if last else size - 1
+
+class RangeFileResponse(FileResponse):
+    def __init__(self, path: str, first: int, last: int, **kwargs) -> None:
+        """
+        206 response sending one byte range of a file.
+
+        Args:
+            path (str): The file
+            first (int): First byte sent
+            last (int): Last byte sent, inclusive
+            **kwargs: FileResponse arguments
+        """
+        super().__init__(path, status_code=206, **kwargs)
+        self.first = first
+        self.last = last
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as input_file:
+                await input_file.seek(self.first)
+                remaining = self.last - self.first + 1
+                while remaining:
+                    chunk = await input_file.read(min(self.chunk_size, remaining))
+                    remaining = remaining - len(chunk) if chunk else 0
+                    await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining)})
+        if self.background is not None:
+            await self.background()
+
+async def serve_file(path: str, request_headers: Headers, stat_result: os.stat_result = None, media_type: str = None, cache_control: str = None, settings: StaticSettings = None) -> Response:
+    """
+    Response sending a static file the way caches and browsers expect.
+
+    A client accepting brotli or gzip gets the precompressed variant with
+    Content-Encoding and Vary: Accept-Encoding. Every response carries a
+    strong ETag of the bytes sent and answers If-None-Match and
+    If-Modified-Since with 304. Range requests get the requested bytes of
+    the uncompressed file with 206.
+
+    Args:
+        path (str): The file
+        request_headers (Headers): Headers of the request
+        stat_result (os.stat_result): Its stat result, looked up when None
+        media_type (str): Content type, guessed from the name when None
+        cache_control (str): Cache-Control header, by the name of the file when None
+        settings (StaticSettings): Static file settings, defaults to configuration.ini
+
+    Returns:
+        Response: 200, 206, 304 or 416 response
+    """
+    settings = settings or get_static_settings()
+    stat_result = stat_result or await anyio.to_thread.run_sync(os.stat, path)
+    headers = {
+        "accept-ranges": "bytes",
+        "cache-control": cache_control or settings.cache_control_for(path),
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+    }
+    if settings.compressible(path):
+        headers["vary"] = "Accept-Encoding"
+    media_type = media_type or guess_type(path)[0] or "text/plain"
+    etag = await content_etag(path, stat_result)
+
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        # Ranges are served from the file itself, byte offsets of a compressed variant mean nothing to a viewer
+        requested = byte_range(range_header, stat_result.st_size)
+        if requested == ():
+            headers["content-range"] = f"bytes */{stat_result.st_size}"
+            return Response(status_code=416, headers=headers)
+        if requested is not None:
+            first, last = requested
+            headers.update({"etag": etag, "content-range": f"bytes {first}-{last}/{stat_result.st_size}", "content-length": str(last - first + 1)})
+            return RangeFileResponse(path, first, last, headers=headers, media_type=media_type, stat_result=stat_result)
+
+    encoding, served_path, served_stat = negotiate_variant(path, stat_result, request_headers.get("accept-encoding", ""), settings)
+    if encoding:
+        # Each representation has an ETag of its own
+        etag = f'{etag[:-1]}-{encoding}"'
+        headers["content-encoding"] = encoding
+    headers["etag"] = etag
+    if not_modified(request_headers, etag, headers["last-modified"]):
+        headers.pop("content-encoding", None)
+        return Response(status_code=304, headers=headers)
+    return FileResponse(served_path, headers=headers, media_type=media_type, stat_result=served_stat)
+
+class PrecompressedStaticFiles(StaticFiles):
+    def __init__(self, *args, settings: StaticSettings = None, **kwargs) -> None:
+        """
+        StaticFiles serving precompressed variants, content ETags and byte ranges.
+
+        Args:
+            *args: StaticFiles arguments
+            settings (StaticSettings): Static file settings, defaults to configuration.ini
+            **kwargs: StaticFiles arguments
+        """
+        super().__init__(*args, **kwargs)
+        self.settings = settings
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        # Conditional requests are answered in get_response, against the content ETag
+        return FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+    async def get_response(self, path: str, scope) -> Response:
+        response = await super().get_response(path, scope)
+        if isinstance(response, FileResponse) and response.status_code == 200:
+            return await serve_file(str(response.path), Headers(scope=scope), response.stat_result, settings=self.settings)
+        return response
@@ -0,0 +1,152 @@
+# app/stream_mgmt/docom_stream.py
+
+import itertools
+import os
+from app.config_mgmt.docom_config import load_config
+from app.worker_mgmt.docom_preload import lazy_import
+
+# Heavy libraries are imported on first use
+np = lazy_import("numpy")
+openpyxl = lazy_import("openpyxl")
+
+# Configuration section for streaming Excel comparisons
+STREAM_SECTION = "Stream"
+
+# Formats openpyxl can stream row by row
+STREAMABLE_EXTENSIONS = (".xlsx", ".xlsm")
+
+class StreamSettings:
+    def __init__(self, mode: str = "", config=None) -> None:
+        """
+        When and how an Excel comparison streams its sheets.
+
+        In streaming mode both sheets are read row by row in lockstep and
+        diffed in chunks of chunk_rows rows, so memory follows the chunk size
+        rather than the sheet. 'auto' streams once both sheets together have
+        min_cells cells.
+
+        Args:
+            mode (str): Mode requested by the client, empty for [Stream] mode
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        self.mode = (mode or config.get(STREAM_SECTION, "mode", "auto") or "auto").lower()
+        self.min_cells = config.getint(STREAM_SECTION, "min_cells", 5_000_000)
+        self.chunk_rows = max(1, config.getint(STREAM_SECTION, "chunk_rows", 5000))
+        # Changed rows shown in a streamed report, the structured diff holds all of them
+        self.report_max_rows = config.getint(STREAM_SECTION, "report_max_rows", 5000)
+
+    def streaming(self, file_paths: tuple, cell_count: int) -> bool:
+        """
+        Whether a comparison streams its sheets.
+
+        Args:
+            file_paths (tuple): Local paths of the compared documents
+            cell_count (int): Cells of both sheets, from their dimensions
+
+        Returns:
+            bool: True in streaming mode, or in auto mode for large enough sheets; only .xlsx and .xlsm files stream
+        """
+        if self.mode == "memory" or not all(os.path.splitext(file_path)[1].lower() in STREAMABLE_EXTENSIONS for file_path in file_paths):
+            return False
+        return self.mode == "streaming" or cell_count >= self.min_cells
+
+class SheetRowStream:
+    def __init__(self, file_path: str, sheet_name: str) -> None:
+        """
+        Rows of a worksheet read lazily from a read-only workbook.
+
+        Args:
+            file_path (str): The Excel document
+            sheet_name (str): The worksheet
+
+        Raises:
+            ValueError: If the worksheet does not exist
+        """
+        self.workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+        if sheet_name not in self.workbook.sheetnames:
+            self.workbook.close()
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        self.worksheet = self.workbook[sheet_name]
+        # Columns from the dimension record, 0 when the sheet has none
+        self.width = self.worksheet.max_column or 0
+        self.row_count = 0
+
+    def _rows(self):
+        # Empty rows are held back until data follows, trailing ones are dropped like pd.read_excel does
+        pending = 0
+        for values in self.worksheet.iter_rows(values_only=True):
+            if all(value is None for value in values):
+                pending += 1
+                continue
+            for _ in range(pending):
+                yield ()
+            pending = 0
+            yield values
+
+    def chunks(self, chunk_rows: int):
+        """
+        Yield the rows in chunks.
+
+        Args:
+            chunk_rows (int): Rows per chunk, the last one may be shorter
+
+        Yields:
+            numpy.ndarray: (rows, columns) object array, missing cells are None
+        """
+        rows = self._rows()
+        while True:
+            batch = list(itertools.islice(rows, chunk_rows))
+            if not batch:
+                return
+            chunk = np.full((len(batch), max(len(values) for values in batch)), None, dtype=object)
+            for position, values in enumerate(batch):
+                chunk[position, :len(values)] = values
+            self.row_count += len(batch)
+            yield chunk
+
+    def close(self) -> None:
+        self.workbook.close()
+
+def _pad(chunk, row_count: int, column_count: int):
+    padded = np.full((row_count, column_count), None, dtype=object)
+    if chunk is not None:
+        padded[:chunk.shape[0], :chunk.shape[1]] = chunk
+    return padded
+
+def diff_chunks(chunk_1, chunk_2, width_1: int, width_2: int, comparator) -> tuple:
+    """
+    Compare the same rows of two sheets, one vectorized step per column.
+
+    Rows one chunk does not have and columns past a sheet's width are
+    'added' to or 'removed' from the second sheet, and every cell of them
+    counts as changed, as in the in-memory comparison.
+
+    Args:
+        chunk_1: Rows of the first sheet, None once it has ended
+        chunk_2: Rows of the second sheet, None once it has ended
+        width_1 (int): Columns of the first sheet, 0 if unknown
+        width_2 (int): Columns of the second sheet, 0 if unknown
+        comparator (CellComparator): Cell comparison with the configured tolerances
+
+    Returns:
+        tuple: Padded values of both chunks and the changed, added and removed cell masks
+    """
+    chunks = [chunk for chunk in (chunk_1, chunk_2) if chunk is not None]
+    row_count = max(chunk.shape[0] for chunk in chunks)
+    column_count = max(chunk.shape[1] for chunk in chunks)
+    values_1 = _pad(chunk_1, row_count, column_count)
+    values_2 = _pad(chunk_2, row_count, column_count)
+
+    rows = np.arange(row_count)[:, None]
+    columns = np.arange(column_count)[None, :]
+    rows_1 = 0 if chunk_1 is None else chunk_1.shape[0]
+    rows_2 = 0 if chunk_2 is None else chunk_2.shape[0]
+    added = (rows >= rows_1) | ((columns >= width_1) & bool(width_1))
+    removed = (rows >= rows_2) | ((columns >= width_2) & bool(width_2))
+    common_rows = min(rows_1, rows_2)
+    changed = np.zeros((row_count, column_count), dtype=bool)
+    for column in range(column_count):
+        changed[:common_rows, column] = ~comparator.equal(values_1[:common_rows, column], values_2[:common_rows, column])
+    changed |= added != removed
+    return values_1, values_2, changed, added, removed
@@ -0,0 +1,353 @@
+# app/upload_mgmt/docom_upload.py
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+import zipfile
+from urllib.parse import quote
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from app.config_mgmt.docom_config import load_config
+from app.path_mgmt.docom_path import CVWEB_FOLDER
+from app.worker_mgmt.docom_scheduler import schedule_comparison
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    # python-multipart before 0.0.13 only ships the multipart package
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Configuration section for uploads
+UPLOAD_SECTION = "Upload"
+
+# Static directory, uploads below it are served at /static
+STATIC_DIRECTORY = os.path.abspath(os.path.join("app", "v1", "static"))
+
+# Form fields carrying the two documents, each spooled to its own version folder
+UPLOAD_FIELDS = ("file1", "file2")
+
+MEGABYTE = 1024 * 1024
+
+def upload_root(config=None) -> str:
+    # Local folder upload case folders are created below, [Upload] root
+    config = config or load_config()
+    return os.path.abspath(config.get(UPLOAD_SECTION, "root", os.path.join(STATIC_DIRECTORY, "uploads")))
+
+def upload_case_roots(config=None) -> dict:
+    """
+    Folders holding the upload case folders of each document type.
+
+    Args:
+        config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+
+    Returns:
+        dict: Document type to the folder its case folders are created in
+    """
+    root = upload_root(config)
+    return {doc_type: os.path.join(root, CVWEB_FOLDER, doc_type) for doc_type in ("pdf", "image", "excel")}
+
+class UploadedFile:
+    def __init__(self, field_name: str, file_name: str, path: str, hash_algorithm: str) -> None:
+        """
+        A file part being spooled to local disk.
+
+        Args:
+            field_name (str): Form field of the part, file1 or file2
+            file_name (str): File name sent by the client
+            path (str): Local file the part is written to
+            hash_algorithm (str): hashlib algorithm, 'none' disables hashing
+        """
+        self.field_name = field_name
+        self.file_name = file_name
+        self.path = path
+        self.size = 0
+        self.digest = None
+        self._hasher = None if hash_algorithm.lower() == "none" else hashlib.new(hash_algorithm)
+        self._file = open(path, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        if self._hasher:
+            self._hasher.update(data)
+        self.size += len(data)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        if self._hasher:
+            self.digest = self._hasher.hexdigest()
+
+class UploadCase:
+    def __init__(self, doc_type: str, root: str = None, config=None) -> None:
+        """
+        Local case folder of one upload request.
+
+        The folder follows the file server layout, CVWeb/<type>/<case>/<field>/<file>,
+        so the comparison pipelines treat uploads like any other request and
+        write their results to the case folder.
+
+        Args:
+            doc_type (str): Document type of the comparison
+            root (str): Override of [Upload] root
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        self.doc_type = doc_type
+        self.case_id = uuid.uuid4().hex
+        self.root = os.path.abspath(root) if root else upload_root(config)
+        self.path = os.path.join(self.root, CVWEB_FOLDER, doc_type, self.case_id)
+        self.max_file_bytes = config.getint(UPLOAD_SECTION, "max_file_mb", 0) * MEGABYTE
+        self.max_field_bytes = config.getint(UPLOAD_SECTION, "max_field_kb", 64) * 1024
+        self.chunk_size = config.getint(UPLOAD_SECTION, "chunk_size_kb", 1024) * 1024
+        self.hash_algorithm = config.get("Input", "hash_algorithm", "sha256")
+        self.files = {}
+        self.fields = {}
+
+    async def receive(self, request: Request) -> None:
+        """
+        Stream a multipart body to the case folder, hashing files as they arrive.
+
+        Nothing is buffered beyond the chunk being parsed, file parts go
+        straight to their final path instead of a temporary spool file, and
+        form fields are held in memory up to [Upload] max_field_kb.
+
+        Raises:
+            HTTPException: 400 for malformed bodies, 413 for files above [Upload] max_file_mb or fields above [Upload] max_field_kb
+        """
+        _, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+        os.makedirs(self.path, exist_ok=True)
+        part = {}
+        pending = []
+
+        def on_part_begin():
+            part.clear()
+            part.update(headers={}, header_name=b"", header_value=b"", data=bytearray(), file=None)
+
+        def on_header_field(data, start, end):
+            part["header_name"] += data[start:end]
+
+        def on_header_value(data, start, end):
+            part["header_value"] += data[start:end]
+
+        def on_header_end():
+            part["headers"][part["header_name"].lower()] = part["header_value"]
+            part["header_name"] = part["header_value"] = b""
+
+        def on_headers_finished():
+            _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+            part["name"] = options.get(b"name", b"").decode("utf-8", "replace")
+            if b"filename" in options:
+                part["file"] = self._open_file(part["name"], options[b"filename"].decode("utf-8", "replace"))
+
+        def on_part_data(data, start, end):
+            if part["file"] is None:
+                part["data"] += data[start:end]
+                if len(part["data"]) > self.max_field_bytes:
+                    raise HTTPException(status_code=413, detail=f"Form field {part['name']} exceeds the {self.max_field_bytes // 1024} KB limit")
+            else:
+                pending.append((part["file"], data[start:end]))
+
+        def on_part_end():
+            if part["file"] is None:
+                self.fields[part["name"]] = part["data"].decode("utf-8", "replace")
+            else:
+                pending.append((part["file"], None))
+
+        parser = MultipartParser(boundary, {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if pending:
+                    # Disk writes run off the event loop, one batch per received chunk
+                    await run_in_threadpool(self._write_pending, list(pending))
+                    pending.clear()
+            parser.finalize()
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+        finally:
+            for uploaded_file in self.files.values():
+                uploaded_file.close()
+
+        missing = [field for field in UPLOAD_FIELDS if field not in self.files]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Missing file fields: {', '.join(missing)}")
+
+    def _open_file(self, field_name: str, file_name: str) -> UploadedFile:
+        if field_name not in UPLOAD_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Unexpected file field: {field_name}")
+        if field_name in self.files:
+            raise HTTPException(status_code=400, detail=f"File field {field_name} sent more than once")
+        # Keep only the base name, clients may send full Windows or POSIX paths
+        file_name = os.path.basename(file_name.replace("\\", "/"))
+        if file_name in ("", ".", ".."):
+            raise HTTPException(status_code=400, detail=f"Invalid file name for {field_name}")
+        version_directory = os.path.join(self.path, field_name)
+        os.makedirs(version_directory, exist_ok=True)
+        uploaded_file = UploadedFile(field_name, file_name, os.path.join(version_directory, file_name), self.hash_algorithm)
+        self.files[field_name] = uploaded_file
+        return uploaded_file
+
+    def _write_pending(self, pending: list) -> None:
+        for uploaded_file, data in pending:
+            if data is None:
+                uploaded_file.close()
+                continue
+            uploaded_file.write(data)
+            if self.max_file_bytes and uploaded_file.size > self.max_file_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{uploaded_file.file_name} exceeds the upload limit of {self.max_file_bytes // MEGABYTE} MB",
+                )
+
+    def build_request(self, request_model):
+        """
+        Build the path based request of the comparison from the uploaded files and form fields.
+
+        Args:
+            request_model: Pydantic request model of the document type
+
+        Returns:
+            The request model instance
+
+        Raises:
+            HTTPException: 422 if the form fields do not validate
+        """
+        values = dict(self.fields)
+        values.setdefault("session_id", self.case_id)
+        for field_name, uploaded_file in self.files.items():
+            # The pipelines unquote request paths, quote them so file names keep any '%'
+            values[f"{field_name}_path"] = quote(uploaded_file.path)
+        try:
+            return request_model(**values)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=json.loads(e.json()))
+
+    def digests(self) -> dict:
+        return {field_name: uploaded_file.digest for field_name, uploaded_file in self.files.items()}
+
+    def static_url(self, result: str) -> str:
+        # URL of a CVWeb relative result when the upload root is served from /static
+        result_path = os.path.join(self.root, *result.split("//"))
+        relative_path = os.path.relpath(result_path, STATIC_DIRECTORY)
+        if relative_path.startswith(".."):
+            return None
+        return "/static/" + quote(relative_path.replace(os.sep, "/"))
+
+    def iter_zip(self):
+        """
+        Stream the case folder as a ZIP archive while it is being compressed.
+
+        JPEG and PNG files are stored, everything else is deflated.
+        """
+        buffer = _ZipBuffer()
+        with zipfile.ZipFile(buffer, "w") as zip_file:
+            for directory, _, file_names in os.walk(self.path):
+                for file_name in sorted(file_names):
+                    file_path = os.path.join(directory, file_name)
+                    compression = zipfile.ZIP_STORED if file_name.lower().endswith((".jpg", ".jpeg", ".png")) else zipfile.ZIP_DEFLATED
+                    entry_info = zipfile.ZipInfo.from_file(file_path, os.path.relpath(file_path, self.path))
+                    entry_info.compress_type = compression
+                    with open(file_path, "rb") as input_file, zip_file.open(entry_info, "w") as entry:
+                        while chunk := input_file.read(self.chunk_size):
+                            entry.write(chunk)
+                            yield buffer.take()
+                    yield buffer.take()
+        yield buffer.take()
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+class _ZipBuffer:
+    # Write-only, unseekable sink for zipfile, drained after every write
+    def __init__(self) -> None:
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def compare_upload(request: Request, doc_type: str, request_model, estimate_cost, compare_documents):
+    """
+    Run a comparison on files uploaded with the request instead of file server paths.
+
+    The response is the usual JSON body plus the upload digests, or with
+    ?format=zip the case folder (sources, result HTML and images) as a
+    streamed ZIP archive, after which the case folder is removed.
+
+    Args:
+        request (Request): The multipart request, file fields file1 and file2
+        doc_type (str): Document type of the comparison
+        request_model: Pydantic request model, filled from the form fields
+        estimate_cost: Cost estimator of the document type
+        compare_documents: Pipeline function run in the process pool
+    """
+    response_format = request.query_params.get("format", "json")
+    if response_format not in ("json", "zip"):
+        raise HTTPException(status_code=400, detail="format must be json or zip")
+
+    upload_case = UploadCase(doc_type)
+    try:
+        await upload_case.receive(request)
+        file_paths = upload_case.build_request(request_model)
+        cost = await run_in_threadpool(estimate_cost, file_paths)
+        result = await schedule_comparison(doc_type, compare_documents, file_paths, cost=cost, priority=file_paths.priority)
+    except BaseException:
+        upload_case.cleanup()
+        raise
+
+    result["digests"] = upload_case.digests()
+    if response_format == "zip":
+        return StreamingResponse(
+            upload_case.iter_zip(),
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": f'attachment; filename="{upload_case.case_id}.zip"',
+                "X-Comparison-Result": result["result"],
+            },
+            background=BackgroundTask(upload_case.cleanup),
+        )
+    result["url"] = upload_case.static_url(result["result"])
+    return JSONResponse(content=result)
+
+def upload_openapi(*form_fields: str) -> dict:
+    # Request body schema for the docs, the body itself is parsed by UploadCase
+    properties = {field_name: {"type": "string", "format": "binary"} for field_name in UPLOAD_FIELDS}
+    properties.update({field_name: {"type": "string"} for field_name in form_fields})
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"multipart/form-data": {"schema": {"type": "object", "required": list(UPLOAD_FIELDS), "properties": properties}}},
+        }
+    }
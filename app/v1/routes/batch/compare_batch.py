@@ -0,0 +1,140 @@
+# app/v1/routes/batch/compare_batch.py
+
+import asyncio
+import json
+import time
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from app.config_mgmt.docom_config import load_config
+from app.flight_mgmt.docom_flight import single_flight
+from app.log_mgmt.docom_log_config import get_logger
+from app.worker_mgmt.docom_scheduler import get_admission_controller, schedule_comparison
+from app.v1.routes.excel.compare_excel import ExcelFileRequest, compare_excel_documents, estimate_excel_cost
+from app.v1.routes.image.compare_image import ImageFileRequest, compare_image_documents, estimate_image_cost
+from app.v1.routes.pdf.compare_pdf import PDFFileRequest, compare_pdf_documents, estimate_pdf_cost
+
+# Initialize FastAPI router
+router = APIRouter()
+
+# Configuration section for batch comparisons
+BATCH_SECTION = "Batch"
+
+# Request model, cost estimator and pipeline of each document type
+BATCH_HANDLERS = {
+    "pdf": (PDFFileRequest, estimate_pdf_cost, compare_pdf_documents),
+    "image": (ImageFileRequest, estimate_image_cost, compare_image_documents),
+    "excel": (ExcelFileRequest, estimate_excel_cost, compare_excel_documents),
+}
+
+# Pydantic model for one pair of a batch
+class BatchPair(BaseModel):
+    doc_type: str
+    request: dict
+    id: Optional[str] = None
+
+# Pydantic model for batch comparison request
+class BatchRequest(BaseModel):
+    pairs: List[BatchPair]
+    priority: int = 0
+
+class BatchComparator:
+    def __init__(self, batch: BatchRequest, logger=None) -> None:
+        """
+        Run the pairs of a batch through admission control and the process pool.
+
+        A pair that fails is reported on its own result line and does not stop
+        the others. At most max_in_flight pairs are submitted at a time so a
+        large batch never floods the admission queue.
+
+        Args:
+            batch (BatchRequest): The pairs to compare
+            logger (DOCCOMLogging): Logger instance, or None if logging is disabled
+        """
+        config = load_config()
+        self.batch = batch
+        self.batch_id = uuid.uuid4().hex
+        self.logger = logger
+        # 0 keeps twice the admission CPU slots in flight, enough to keep every slot busy
+        self.max_in_flight = config.getint(BATCH_SECTION, "max_in_flight", 0) or 2 * get_admission_controller().cpu_slots
+
+    def build_request(self, index: int, pair: BatchPair):
+        if pair.doc_type not in BATCH_HANDLERS:
+            raise HTTPException(status_code=400, detail=f"Unsupported doc_type: {pair.doc_type}")
+        request_model = BATCH_HANDLERS[pair.doc_type][0]
+        values = dict(pair.request)
+        values.setdefault("session_id", f"batch-{self.batch_id}-{index}")
+        values.setdefault("priority", self.batch.priority)
+        try:
+            return request_model(**values)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=json.loads(e.json()))
+
+    async def compare_pair(self, index: int, pair: BatchPair) -> dict:
+        started = time.perf_counter()
+        line = {"index": index, "id": pair.id, "doc_type": pair.doc_type}
+        try:
+            file_paths = self.build_request(index, pair)
+            _, estimate_cost, compare_documents = BATCH_HANDLERS[pair.doc_type]
+            cost = await run_in_threadpool(estimate_cost, file_paths)
+            # Shared with identical pairs and single requests running at the same time
+            result = await single_flight(f"compare_{pair.doc_type}", file_paths, lambda: schedule_comparison(pair.doc_type, compare_documents, file_paths, cost=cost, priority=file_paths.priority))
+            line.update(status="ok", status_code=200, result=result)
+        except HTTPException as e:
+            line.update(status="error", status_code=e.status_code, detail=e.detail)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"| Batch {self.batch_id} pair {index} failed: {e}")
+            line.update(status="error", status_code=500, detail="Unexpected error during comparison")
+        line["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        return line
+
+    async def stream(self):
+        """
+        Yield one NDJSON line per pair as it finishes, then a summary line.
+        """
+        started = time.perf_counter()
+        pairs = list(enumerate(self.batch.pairs))
+        results = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_in_flight)
+
+        async def run(index, pair):
+            async with slots:
+                await results.put(await self.compare_pair(index, pair))
+
+        tasks = [asyncio.create_task(run(index, pair)) for index, pair in pairs]
+        summary = {"batch_id": self.batch_id, "total": len(pairs), "succeeded": 0, "failed": 0, "by_type": {}, "failures": []}
+        try:
+            for _ in pairs:
+                line = await results.get()
+                by_type = summary["by_type"].setdefault(line["doc_type"], {"succeeded": 0, "failed": 0})
+                if line["status"] == "ok":
+                    summary["succeeded"] += 1
+                    by_type["succeeded"] += 1
+                else:
+                    summary["failed"] += 1
+                    by_type["failed"] += 1
+                    summary["failures"].append({"index": line["index"], "id": line["id"], "status_code": line["status_code"]})
+                yield json.dumps(line) + "\n"
+        finally:
+            # The client went away, do not leave pairs waiting for admission
+            for task in tasks:
+                task.cancel()
+
+        summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        if self.logger:
+            self.logger.info(f"| Batch {self.batch_id}: {summary['succeeded']} of {summary['total']} pairs compared in {summary['elapsed_seconds']}s")
+        yield json.dumps({"summary": summary}) + "\n"
+
+# FastAPI route for comparing many document pairs in one call
+@router.post("/compare_batch")
+async def compare_batch(batch: BatchRequest):
+    # Results are streamed as NDJSON in completion order, the last line is the summary
+    max_pairs = load_config().getint(BATCH_SECTION, "max_pairs", 10000)
+    if len(batch.pairs) > max_pairs:
+        raise HTTPException(status_code=413, detail=f"A batch may hold at most {max_pairs} pairs")
+    comparator = BatchComparator(batch, get_logger())
+    return StreamingResponse(comparator.stream(), media_type="application/x-ndjson")
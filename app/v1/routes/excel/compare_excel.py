@@ -1,15 +1,34 @@
 # app/v1/routes/excel/compare_excel.py
 
+import asyncio
+import hashlib
+import itertools
 import os
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from typing import List, Literal, Optional
 from urllib.parse import unquote
-from jinja2 import Template
-import pandas as pd
-import configparser
-import shutil
-from app.log_mgmt.docom_log_config import DOCCOMLogging
+from starlette.concurrency import run_in_threadpool
+from app.log_mgmt.docom_log_config import DOCCOMLogging, get_logger
+from app.path_mgmt.docom_path import resolve_document_path
+from app.worker_mgmt.docom_scheduler import CostModel, JobCost, schedule_comparison
+from app.worker_mgmt.docom_preload import lazy_import
+from app.workspace_mgmt.docom_workspace import SessionWorkspace
+from app.upload_mgmt.docom_upload import compare_upload, upload_openapi
+from app.diff_mgmt.docom_diff import DiffFormat, DiffSettings, StreamingDiffWriter, StructuredDiff
+from app.reader_mgmt.docom_reader import get_spreadsheet_reader
+from app.report_mgmt.docom_report import render_report, write_report
+from app.static_mgmt.docom_static import precompress
+from app.flight_mgmt.docom_flight import single_flight
+from app.cell_mgmt.docom_cells import get_cell_comparator
+from app.stream_mgmt.docom_stream import SheetRowStream, StreamSettings, diff_chunks
+from app.align_mgmt.docom_align import AlignSettings, CellHashCache, ColumnAligner, RowAligner, paired_columns, row_hashes
+
+# Heavy libraries are imported on first use
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+openpyxl = lazy_import("openpyxl")
 from time import sleep
 
 # Initialize FastAPI router
@@ -33,37 +52,62 @@ class ExcelFileRequest(BaseModel):
     wm_img_width: str
     wm_opacity: str
     wm_rotation: str
+    priority: int = 0
+    # Structured diff next to the HTML report, and whether the HTML report is rendered at all
+    diff_format: DiffFormat = ""
+    html: bool = True
+    # 'memory' loads both sheets, 'streaming' diffs them in row chunks, empty follows [Stream] mode
+    mode: Literal["", "memory", "streaming"] = ""
+    # 'match' pairs columns by header name and content, 'position' by position, empty follows [Align] columns
+    column_matching: Literal["", "position", "match"] = ""
+    # 1 based row holding the column names, 0 for none, None follows [Align] header_row
+    header_row: Optional[int] = None
+    # 'match' pairs rows by a diff of their hashes, 'position' by position, empty follows [Align] rows
+    row_matching: Literal["", "position", "match"] = ""
 
 # Class for excel document comparison
 class ExcelDocumentComparator:
     def __init__(self, file_paths: ExcelFileRequest, logger: DOCCOMLogging) -> None:
         # Decode and initialize file paths and session ID
         """First Document"""
-        self.file1_path = unquote(r'' + file_paths.file1_path)
-        self.file1_name = os.path.basename(self.file1_path)
-        self.file1_version = self.file1_path.split('\\')[-2]
+        self.file1 = resolve_document_path(unquote(r'' + file_paths.file1_path))
+        self.file1_path = str(self.file1.local)
+        self.file1_name = self.file1.name
+        self.file1_version = self.file1.version
         # Check if sheetname is passed
         if file_paths.file1_sheet_name:
             self.file1_sheetname = file_paths.file1_sheet_name
         else:
             # Find the first sheet name
-            self.file1_sheetname = pd.ExcelFile(self.file1_path).sheet_names[0]
+            self.file1_sheetname = get_spreadsheet_reader().sheet_names(self.file1_path)[0]
         
         """Second Document"""
-        self.file2_path = unquote(r'' + file_paths.file2_path)
-        self.file2_name = os.path.basename(self.file2_path)
-        self.file2_version = self.file2_path.split('\\')[-2]
+        self.file2 = resolve_document_path(unquote(r'' + file_paths.file2_path))
+        self.file2_path = str(self.file2.local)
+        self.file2_name = self.file2.name
+        self.file2_version = self.file2.version
         # Check if sheetname is passed
         if file_paths.file2_sheet_name:
             self.file2_sheetname = file_paths.file2_sheet_name
         else:
             # Find the first sheet name
-            self.file2_sheetname = pd.ExcelFile(self.file2_path).sheet_names[0]
+            self.file2_sheetname = get_spreadsheet_reader().sheet_names(self.file2_path)[0]
         
         self.logger = logger
         self.session_id = file_paths.session_id
+        self.workspace = SessionWorkspace(EXCEL_WORKSPACE, self.session_id, logger)
+        self.diff_settings = DiffSettings(file_paths.diff_format, file_paths.html)
+        self.stream_settings = StreamSettings(file_paths.mode)
+        self.align_settings = AlignSettings(file_paths.column_matching, file_paths.header_row, file_paths.row_matching)
+
+    def use_streaming(self) -> bool:
+        # Sheet dimensions are only read when auto mode needs the cell count
+        cell_count = 0
+        if self.stream_settings.mode == "auto":
+            cell_count = count_sheet_cells(self.file1_path, self.file1_sheetname) + count_sheet_cells(self.file2_path, self.file2_sheetname)
+        return self.stream_settings.streaming((self.file1_path, self.file2_path), cell_count)
     
-    def validate_excel_document(self):
+    def validate_excel_document(self, check_empty: bool = True):
         # Validate existence of Excel documents and sheets.
         for file_path, sheet_name in [(self.file1_path, self.file1_sheetname), (self.file2_path, self.file2_sheetname)]:
             # Check if Excel document exists
@@ -73,436 +117,382 @@ class ExcelDocumentComparator:
                 raise HTTPException(status_code=404, detail=f"{file_path} not found.")
         
             # Check if the sheet name exists"""
-            with pd.ExcelFile(file_path) as xls_file1:
-                if sheet_name not in xls_file1.sheet_names:
-                    if self.logger:
-                        self.logger.error(f"| Sheet name {sheet_name} not found in {file_path}")
-                    raise HTTPException(status_code=400, detail=f"Sheet name {sheet_name} not found in {file_path}")
+            reader = get_spreadsheet_reader()
+            if sheet_name not in reader.sheet_names(file_path):
+                if self.logger:
+                    self.logger.error(f"| Sheet name {sheet_name} not found in {file_path}")
+                raise HTTPException(status_code=400, detail=f"Sheet name {sheet_name} not found in {file_path}")
         
-            # Check if the sheet is empty"""
-            sheet = pd.read_excel(file_path, sheet_name)
+            # Check if the sheet is empty, a streamed comparison finds out while reading"""
+            if not check_empty:
+                continue
+            sheet = reader.read_sheet(file_path, sheet_name, header=0)
             if sheet.empty:
                 if self.logger:
                     self.logger.error(f"| Sheet name {sheet_name} in {file_path} is empty")
                 raise HTTPException(status_code=400, detail=f"Sheet name {sheet_name} in {file_path} is empty")
 
     def create_workspace(self):
-        # Create workspace directory for the session if it doesn't exist
-        session_folder = os.path.join(EXCEL_WORKSPACE, self.session_id)
-        if os.path.exists(session_folder):
-            shutil.rmtree(session_folder,ignore_errors=True)
-            os.makedirs(session_folder,exist_ok=True)
-        os.makedirs(session_folder, exist_ok=True)
+        # Create the request's own folder in the session workspace, other requests of the session keep theirs
+        self.workspace.create()
         if self.logger:
             self.logger.info(f"| Workspace created for session: {self.session_id}")
             
     def process_document(self) -> dict:
+        # Create DataFrame object
+        df1 = read_sheet(self.file1_path, self.file1_sheetname)
+        df2 = read_sheet(self.file2_path, self.file2_sheetname)
+        return self.compare_frames(df1, df2)
+
+    def compare_frames(self, df1, df2) -> dict:
         try:
-            # Create DataFrame object
-            df1 = pd.read_excel(self.file1_path, sheet_name=self.file1_sheetname, header=None)
-            df2 = pd.read_excel(self.file2_path, sheet_name=self.file2_sheetname, header=None)
+            # Cell hashes the column and row matching work on, from the sidecar cache when it is enabled
+            hashes_1 = hashes_2 = None
+            if self.align_settings.match_columns or self.align_settings.match_rows:
+                hash_cache = CellHashCache(self.align_settings)
+                hashes_1 = hash_cache.hashes(self.file1_path, self.file1_sheetname, df1)
+                hashes_2 = hash_cache.hashes(self.file2_path, self.file2_sheetname, df2)
 
-            # Handle unequal rows
-            df1, df2 = self._handle_unequal_rows(df1, df2)
+            # Pair the columns, by position unless they are matched by header and content
+            alignment = None
+            compared_1 = df1
+            if self.align_settings.match_columns:
+                alignment = ColumnAligner(self.align_settings).align(df1, df2, hashes_1, hashes_2)
+                compared_1 = alignment.relabel(df1, df2)
+                if self.logger:
+                    self.logger.info(f"| Columns matched: {len(alignment.pairs)} paired, {len(alignment.moved)} moved, {len(alignment.inserted)} inserted, {len(alignment.removed)} removed")
 
-            # Find common_headers_list, common_indices, differing_indices
-            common_headers_list, common_indices, differing_indices = self._find_differences(df1, df2)
+            # Pair the rows, by position unless they are matched by a diff of their hashes over the paired columns
+            rows = None
+            if self.align_settings.match_rows:
+                positions_1, positions_2 = paired_columns(df1, df2, alignment)
+                rows = RowAligner(self.align_settings).align(
+                    row_hashes(hashes_1, positions_1), row_hashes(hashes_2, positions_2), hashes_1[:, positions_1], hashes_2[:, positions_2])
+                if self.logger:
+                    self.logger.info(f"| Rows matched: {int(rows.identical.sum())} identical, {rows.modified} modified, {rows.inserted} inserted, {rows.removed} removed")
 
-            # Find different values in df2
-            different_values_df2 = self._get_detailed_differences(df1, df2, common_indices)
-            
-            # Get the table data from the DataFrames
-            table1 = df1.to_dict(orient='records')
-            table2 = df2.to_dict(orient='records')
+            # Compare the cells in their own dtypes, empty and padded cells are tracked in masks, identical rows are skipped
+            cells = get_cell_comparator().compare(compared_1, df2, rows)
+            if alignment is not None:
+                # Inserted and removed columns are reported as columns, not as changed cells
+                cells.ignore_columns(alignment.inserted + alignment.removed_labels)
+            differing_indices = cells.differing_rows.tolist()
+            common_headers_list = list(compared_1.columns.intersection(df2.columns))
+
+            response = {
+                "common_headers_list": common_headers_list,
+                "differing_indices": differing_indices,
+                # Positions of the inserted columns in df2 and of the removed columns in df1, for the report
+                "inserted_columns": [df2.columns.get_loc(column) for column in alignment.inserted] if alignment else [],
+                "removed_columns": [df1.columns.get_loc(column) for column in alignment.removed] if alignment else [],
+            }
+            if self.diff_settings.enabled:
+                response["structured_diff"] = self._structured_diff(compared_1, df2, cells, differing_indices, alignment, rows)
+
+            if self.diff_settings.html:
+                # The report shows both sheets aligned row by row, empty cells as '-'
+                display_1 = self._display_frame(df1, cells.rows_1)
+                display_2 = self._display_frame(df2, cells.rows_2)
 
-            return {"data1": table1, "data2": table2, "common_headers_list": common_headers_list,
-                "differing_indices": differing_indices, "different_values_df2": different_values_df2}
+                # Find different values in df2
+                response["different_values_df2"] = self._get_detailed_differences(display_2, cells)
+
+                # Get the table data from the DataFrames
+                response["data1"] = display_1.to_dict(orient='records')
+                response["data2"] = display_2.to_dict(orient='records')
+            return response
         except Exception as e:
             if self.logger:
                 self.logger.error(f"| Excel document process failes: {e}")
             raise HTTPException(status_code=500, detail="Error processing Excel document")
-    
-    def _handle_unequal_rows(self, df1, df2) -> tuple:
+
+    def _display_frame(self, df, rows):
         """
-        Handles rows with unequal length between DataFrames.
+        Copy of a sheet for the report, one row per aligned row.
 
         Args:
-            df1: First Excel document DataFrame
-            df2: Second Excel document DataFrame
+            df: Excel document DataFrame
+            rows: Row of the sheet of every aligned row, -1 where it has none
 
         Returns:
-            tuple: A tuple containing the padded DataFrames (df1, df2)
+            DataFrame: Object copy with '-' in empty and padded cells
         """
-        len_df1 = len(df1)
-        len_df2 = len(df2)
-
-        if len_df1 > len_df2:
-            diff = len_df1 - len_df2
-            nan_rows = pd.DataFrame([['-'] * len(df2.columns)] * diff, columns=df2.columns)
-            df2 = pd.concat([df2, nan_rows], ignore_index=True)
-        elif len_df1 < len_df2:
-            diff = len_df2 - len_df1
-            nan_rows = pd.DataFrame([['-'] * len(df1.columns)] * diff, columns=df1.columns)
-            df1 = pd.concat([df1, nan_rows], ignore_index=True)
-
-        df1 = df1.fillna('-')
-        df2 = df2.fillna('-')
-        return (df1, df2)
-
-    def _find_differences(self, df1, df2) -> tuple:
+        # Object dtype first, so padding does not turn integer columns into floats
+        display = df.astype(object).reindex(rows).reset_index(drop=True)
+        return display.where(display.notna(), '-')
+
+    def _get_detailed_differences(self, display_2, cells) -> list:
         """
-        Find common headers and differing row indices between DataFrames
+        Extracts detailed information about differences in the second DataFrame.
 
         Args:
-            df1: First Excel document DataFrame
-            df2: Second Excel document DataFrame
-        
+            display_2: Second Excel document DataFrame as shown in the report
+            cells (CellDiff): Result of the cell comparison
+
         Returns:
-            tuple: A tuple containing the common headers and differing row indices
+            list: (row index, column index, column, value) of every changed cell of df2
         """
-        common_headers = df1.columns.intersection(df2.columns)
-        common_headers_list = list(common_headers)
+        columns = list(display_2.columns)
+        positions = [cells.columns.index(column) for column in columns]
+        rows, column_indices = np.nonzero(cells.changed[:, positions])
+        values = display_2.to_numpy(dtype=object)[rows, column_indices]
+        return [(row, column_index, columns[column_index], value)
+                for row, column_index, value in zip(rows.tolist(), column_indices.tolist(), values)]
 
-        comparison = df1.equals(df2)
-        if not comparison:
-            differing_indices = df1.index[df1.ne(df2).any(axis=1)].tolist()
-        else:
-            differing_indices = []
-        
-        common_indices = df1.index.intersection(df2.index)
-
-        df1_common = df1[common_headers]
-        df2_common = df2[common_headers]
-        common_indices = df1_common.index.intersection(df2_common.index)
-
-        return (common_headers_list, common_indices, differing_indices)
-
-    def _get_detailed_differences(self, df1, df2, common_indices) -> list:
+    def _structured_diff(self, df1, df2, cells, differing_indices: list, alignment=None, rows=None) -> StructuredDiff:
         """
-        Extracts detailed information about differences in the second DataFrame.
+        Changed cells of the DataFrames with their old and new values.
+
+        Rows past the end of the first sheet are 'added', rows past the end
+        of the second 'removed', and so are the cells of columns only one
+        sheet has. Empty cells have no value. With matched columns, cells
+        are named by their column in the second sheet and inserted, removed
+        and moved columns are listed in the summary instead. With matched
+        rows, cells are named by their row in the second sheet, removed rows
+        by their row in the first.
 
         Args:
-            df1: First Excel document DataFrame
+            df1: First Excel document DataFrame, columns relabeled when they were matched
             df2: Second Excel document DataFrame
-            common_headers: Common headers between the two DataFrames
+            cells (CellDiff): Result of the cell comparison
+            differing_indices (list): Rows with at least one difference
+            alignment (ColumnAlignment): Column pairing, None when columns are compared by position
+            rows (RowAlignment): Row pairing, None when rows are compared by position
 
         Returns:
-            list: A list containing detailed information about differences in df2.
+            StructuredDiff: One change per cell, values as text
         """
-        different_values_df2 = []
-        # Iterate through columns of df2
-        for column_index, column in enumerate(df2.columns):
-            # Check if the column exists in both DataFrames
-            if column in df1.columns:
-                # Iterate through common indices and compare corresponding values in df1 and df2
-                for index in common_indices:
-                    # Check if the index exists in both DataFrames
-                    if index in df1.index and index in df2.index:
-                        # Check if the values differ
-                        if df2.loc[index, column] != df1.loc[index, column]:
-                            # Append (header_index, cell_index, column, value) to different_values_df2
-                            different_values_df2.append((index, column_index, column, df2.loc[index, column]))
-            else:
-                # If the column exists only in df2, append (header_index, cell_index, column, value) to different_values_df2
-                for index in df2.index:
-                    if index in df2.index:
-                        different_values_df2.append((index, column_index, column, df2.loc[index, column]))
-        return different_values_df2
+        values_1 = df1.astype(object).reindex(index=cells.rows_1, columns=cells.columns).to_numpy()
+        values_2 = df2.astype(object).reindex(index=cells.rows_2, columns=cells.columns).to_numpy()
+        values_1[cells.missing_1] = None
+        values_2[cells.missing_2] = None
+        row_numbers = np.where(cells.rows_2 >= 0, cells.rows_2, cells.rows_1)
+        changes = cell_changes(cells.columns, values_1, values_2, cells.changed, cells.added, cells.removed, row_numbers=row_numbers)
 
-class HtmlGenerator:
-    def __init__(self, comparator_instance) -> None:
-        self.comparator_instance = comparator_instance
+        rows_1, rows_2 = len(df1), len(df2)
+        summary = {
+            "sheet_1": self.file1_sheetname,
+            "sheet_2": self.file2_sheetname,
+            "rows_1": rows_1,
+            "rows_2": rows_2,
+            "columns_1": len(df1.columns),
+            "columns_2": len(df2.columns),
+            "changed_rows": len(differing_indices),
+            "changed_cells": len(changes["row"]),
+            "modified_cells": changes["change"].count("modified"),
+            "added_rows": int((cells.rows_1 < 0).sum()),
+            "removed_rows": int((cells.rows_2 < 0).sum()),
+        }
+        if rows is not None:
+            summary["identical_rows"] = int(rows.identical.sum())
+        if alignment is not None:
+            summary["inserted_columns"] = [column_letter(column) for column in alignment.inserted]
+            summary["removed_columns"] = [column_letter(column) for column in alignment.removed]
+            summary["moved_columns"] = {column_letter(column_1): column_letter(column_2) for column_1, column_2 in alignment.moved}
+        return StructuredDiff("excel", summary, changes)
 
-    def generate_result_html(self, session_path, data1, data2, title, file1, file2, file1_sheet_name, file2_sheet_name, file_1_version, file_2_version, differing_indices, different_values_df2):
-        # HTML template for comparison result
-        html_template_str = '''<!DOCTYPE html>
-        <html>
-            <head>
-                <title>{{title}}</title>
-                <!-- Bootstrap CSS -->
-                <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.0.2/dist/css/bootstrap.min.css" rel="stylesheet"
-        integrity="sha384-EVSTQN3/azprG1Anm3QDgpJLIm9Nao0Yz1ztcQTwFspd3yD65VohhpuuCOmLASjC" crossorigin="anonymous">
-                <link href="https://icons.getbootstrap.com/assets/font/bootstrap-icons.min.css" rel="stylesheet">
-                <script src="https://ajax.googleapis.com/ajax/libs/jquery/3.7.1/jquery.min.js"></script>
-                <!-- Inline Stylesheet -->
-                <style>
-                    body,
-                    .badge {
-                        font-size: 0.81rem
-                    }
+def column_letter(column) -> str:
+    # Sheets are read without a header row, the column labels are the sheet's column positions
+    return openpyxl.utils.get_column_letter(int(column) + 1) if isinstance(column, (int, np.integer)) else str(column)
 
-                    .table-responsive {
-                        overflow-x: unset;
-                    }
+# Arrow types of the Excel diff changes, for diffs written while streaming
+EXCEL_DIFF_SCHEMA = {"row": "int64", "column": "string", "cell": "string", "change": "string", "old_value": "string", "new_value": "string"}
 
-                    .table-responsive table {
-                        width: 100%;
-                    }
+def cell_changes(columns: list, values_1, values_2, changed, added, removed, row_offset: int = 0, row_numbers=None) -> dict:
+    """
+    Structured diff changes of compared cell arrays.
 
-                    .table-container {
-                        display: flex;
-                    }
+    Args:
+        columns (list): Column label of every array column
+        values_1: Object array of the first sheet's cells
+        values_2: Object array of the second sheet's cells, same shape
+        changed: Cells that differ
+        added: Cells only the second sheet has
+        removed: Cells only the first sheet has
+        row_offset (int): Sheet row of the first array row, 0 based
+        row_numbers: Sheet row of every array row, 0 based, instead of row_offset for aligned rows
 
-                    .table-container .table-responsive {
-                        flex: 0 0 auto;
-                        margin-right: 10px;
-                    }
+    Returns:
+        dict: Columnar changes with row, column, A1 cell, change kind and old/new values as text
+    """
+    rows, column_positions = np.nonzero(changed)
+    kinds = np.where(added[rows, column_positions], "added", np.where(removed[rows, column_positions], "removed", "modified"))
+    old_values = np.where(added[rows, column_positions], None, values_1[rows, column_positions])
+    new_values = np.where(removed[rows, column_positions], None, values_2[rows, column_positions])
+    rows = row_numbers[rows] if row_numbers is not None else rows + row_offset
+    letters = {position: column_letter(column) for position, column in enumerate(columns)}
+    return {
+        "row": (rows + 1).tolist(),
+        "column": [str(columns[position]) for position in column_positions],
+        "cell": [f"{letters[position]}{row + 1}" for row, position in zip(rows.tolist(), column_positions.tolist())],
+        "change": kinds.tolist(),
+        "old_value": [None if value is None else str(value) for value in old_values],
+        "new_value": [None if value is None else str(value) for value in new_values],
+    }
 
-                    .square-badge {
-                        border-radius: 0;
-                    }
+class ExcelStreamComparator:
+    def __init__(self, comparator: ExcelDocumentComparator) -> None:
+        """
+        Compare sheets too large for memory in chunks of rows.
 
-                    .divScrollDiv {
-                        display: inline-block;
-                        width: 100%;
-                        border: 1px solid black;
-                        height: 98vh;
-                        overflow: auto;
-                    }
+        Both sheets are read in lockstep with openpyxl read-only iter_rows and
+        every pair of chunks is diffed in one vectorized step. The changes of a
+        chunk go to the structured diff and the report before the next chunk
+        is read, so memory follows [Stream] chunk_rows rather than the sheet.
 
-                    .tableNoScroll {
-                        overflow: hidden;
-                    }
+        Args:
+            comparator (ExcelDocumentComparator): The validated comparison
+        """
+        self.comparator = comparator
+        self.settings = comparator.stream_settings
+        self.stats = {"rows_1": 0, "rows_2": 0, "columns_1": 0, "columns_2": 0, "changed_rows": 0,
+                      "changed_cells": 0, "modified_cells": 0, "reported_rows": 0}
+        self.diff_writer = None
 
-                    .excelFileName {
-                        max-width: 20%;
-                        white-space: nowrap;
-                        overflow: hidden !important;
-                        text-overflow: ellipsis;
-                        text-align: left;
-                    }
+    def changed_rows(self, report: bool = True):
+        """
+        Diff the sheets chunk by chunk.
 
-                    .badge {
-                        padding: .35em .65em !important
-                    }
+        Args:
+            report (bool): Yield the changed rows for the report, at most [Stream] report_max_rows
 
-                    .tooltip-inner {
-                        max-width: 100%;
-                    } 
+        Yields:
+            dict: Sheet row number and the cells of both sheets with their changed flags
+        """
+        comparator = self.comparator
+        stream_1 = SheetRowStream(comparator.file1_path, comparator.file1_sheetname)
+        try:
+            stream_2 = SheetRowStream(comparator.file2_path, comparator.file2_sheetname)
+        except Exception:
+            stream_1.close()
+            raise
+        try:
+            start_row = 0
+            for chunk_1, chunk_2 in itertools.zip_longest(stream_1.chunks(self.settings.chunk_rows), stream_2.chunks(self.settings.chunk_rows)):
+                values_1, values_2, changed, added, removed = diff_chunks(chunk_1, chunk_2, stream_1.width, stream_2.width, get_cell_comparator())
+                changes = cell_changes(list(range(changed.shape[1])), values_1, values_2, changed, added, removed, row_offset=start_row)
+                if self.diff_writer is not None:
+                    self.diff_writer.append(changes)
+                changed_positions = np.flatnonzero(changed.any(axis=1))
+                self.stats["changed_rows"] += len(changed_positions)
+                self.stats["changed_cells"] += len(changes["row"])
+                self.stats["modified_cells"] += changes["change"].count("modified")
+                for column, chunk in (("columns_1", chunk_1), ("columns_2", chunk_2)):
+                    if chunk is not None:
+                        self.stats[column] = max(self.stats[column], chunk.shape[1])
 
-                    .card-header {
-                        padding: 0.3rem 0.5rem !important;
-                        font-weight: 500;
+                for position in changed_positions if report else ():
+                    if self.stats["reported_rows"] >= self.settings.report_max_rows:
+                        break
+                    self.stats["reported_rows"] += 1
+                    yield {
+                        "row": start_row + position + 1,
+                        "cells_1": list(zip(values_1[position], changed[position])),
+                        "cells_2": list(zip(values_2[position], changed[position])),
                     }
+                start_row += changed.shape[0]
+            self.stats["rows_1"], self.stats["rows_2"] = stream_1.row_count, stream_2.row_count
+        finally:
+            stream_1.close()
+            stream_2.close()
 
-                    .card-body {
-                        padding: 0.5rem 0.5rem !important;
-                    }
+        for file_path, sheet_name, row_count in ((comparator.file1_path, comparator.file1_sheetname, stream_1.row_count),
+                                                 (comparator.file2_path, comparator.file2_sheetname, stream_2.row_count)):
+            if not row_count:
+                if comparator.logger:
+                    comparator.logger.error(f"| Sheet name {sheet_name} in {file_path} is empty")
+                raise HTTPException(status_code=400, detail=f"Sheet name {sheet_name} in {file_path} is empty")
 
-                    .headerFileNameCompare {
-                        max-width: 80%;
-                        white-space: nowrap;
-                        overflow: hidden !important;
-                        text-overflow: ellipsis;
-                    }
+    def summary(self) -> dict:
+        return {
+            "sheet_1": self.comparator.file1_sheetname,
+            "sheet_2": self.comparator.file2_sheetname,
+            "rows_1": self.stats["rows_1"],
+            "rows_2": self.stats["rows_2"],
+            "columns_1": self.stats["columns_1"],
+            "columns_2": self.stats["columns_2"],
+            "changed_rows": self.stats["changed_rows"],
+            "changed_cells": self.stats["changed_cells"],
+            "modified_cells": self.stats["modified_cells"],
+            "added_rows": max(0, self.stats["rows_2"] - self.stats["rows_1"]),
+            "removed_rows": max(0, self.stats["rows_1"] - self.stats["rows_2"]),
+            "mode": "streaming",
+            "chunk_rows": self.settings.chunk_rows,
+        }
 
-                    .headerCompareSheetName {
-                        max-width: 20%;
-                        white-space: nowrap;
-                        overflow: hidden !important;
-                        text-overflow: ellipsis;
-                    }
+    def run(self) -> tuple:
+        """
+        Stream the comparison into the report and the structured diff.
 
-                    .serial-number-column {
-                        width: 25px;
-                        background-color:#fff;
-                        border: 1px solid #fff;
-                    }
+        Returns:
+            tuple: The report URL (None without HTML report) and the diff entry (None without structured diff)
+        """
+        comparator = self.comparator
+        if comparator.diff_settings.enabled:
+            self.diff_writer = StreamingDiffWriter(comparator.diff_settings, comparator.file1, "comparison_result", "excel", EXCEL_DIFF_SCHEMA, comparator.logger)
+        try:
+            result = None
+            if comparator.diff_settings.html:
+                result = StreamHtmlGenerator(comparator).generate_result_html(self.changed_rows(), self.stats)
+            else:
+                for _ in self.changed_rows(report=False):
+                    pass
+            diff = self.diff_writer.close(self.summary()) if self.diff_writer is not None else None
+        except BaseException:
+            if self.diff_writer is not None:
+                self.diff_writer.abort()
+            raise
+        if comparator.logger:
+            comparator.logger.info(f"| Streamed {self.stats['rows_1']} and {self.stats['rows_2']} rows, {self.stats['changed_rows']} changed")
+        return result, diff
 
-                    .hide-header {
-                        display: none;
-                    }
+class StreamHtmlGenerator:
+    def __init__(self, comparator_instance) -> None:
+        self.comparator_instance = comparator_instance
 
-                    .bi-arrow-bar-right::before {
-		                font-size: 1.23rem;
-		                font-weight: 500 !important;
-		                color: red;
-		            }
+    def generate_result_html(self, rows, stats: dict, title: str = "Contentverse Excel Document Comparison", html_file_name: str = "comparison_result.html") -> str:
+        """
+        Write the report of a streamed comparison as its rows are diffed.
 
-                    tr td:first-child {
-                        border-top: 1px solid #fff;
-                        border-left: 1px solid #fff;
-                        border-bottom: 1px solid #fff;
-                    }
+        The report lists the changed rows only, each with both versions and
+        the changed cells highlighted. Jinja renders the template lazily, so
+        every chunk is written to the report file before the next is read.
 
-                    .watermark {
-                        position: fixed;
-                        top: 0;
-                        left: 0;
-                        width: 100%;
-                        height: 100%;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        font-size: 42px;
-                        color: rgba(0, 0, 0, 0.3);
-                        pointer-events: none; 
-                        z-index: 9999;
-                        transform: rotate(-45deg);
-                    }
+        Args:
+            rows: Changed rows from ExcelStreamComparator.changed_rows
+            stats (dict): Running totals of the comparison, complete once rows is exhausted
+            title (str): Title of the report
+            html_file_name (str): File name of the report in the report folder
 
-                    .watermarkimg {
-                        position: fixed;
-                        top: 0;
-                        left: 0;
-                        width: 100%;
-                        height: 100%;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        pointer-events: none;
-                        transform: translate(-50%, -50%);
-                        z-index: 9999;
-                        opacity: 0.5;
-                        transform: rotate(-45deg);
-                    }
-                </style>
-                <script>
-                    $(document).ready(function () {
-                        var target_sec = $("#divFixed");
-                        $("#divLista").scroll(function () {
-                            target_sec.prop("scrollTop", this.scrollTop)
-                            .prop("scrollLeft", this.scrollLeft);
-                        });
-                    var target_first = $("#divLista");
-                        $("#divFixed").scroll(function () {
-                            target_first.prop("scrollTop", this.scrollTop)
-                            .prop("scrollLeft", this.scrollLeft);
-                        });
-                        $('[data-toggle="tooltip"]').tooltip({ placement: 'bottom' });
-                    });
-                </script>
-            </head>
-            <body>
-            <div class="watermark">Document Comparison via Contentverse</div>
-            <div class="col-lg mx-auto p-1 py-md-1">
-                <div class="container-fluid">
-                    <div class="row">
-                        <div class="col divScrollDiv border" id="divFixed">
-                            <div class="card mt-1">
-                                <div class="card-header d-flex flex-row">
-                                    <span class="badge bg-success square-badge excelFileName me-1">{{file_1_version}}</span>
-                                    <span class="headerFileNameCompare me-1" title="{{file1}}">{{file1}}</span> > 
-                                    <span class="headerCompareSheetName ms-1" id="SheetNameExcel1">{{file1_sheet_name}}</span>
-                                </div>
-                                <div class="card-body">
-                                    <div class="table-container">
-                                        <div class="table table-responsive">
-                                            <table class="table-sm table-bordered">
-                                                <thead class="table-dark hide-header">
-                                                    <tr>
-                                                        <th  class="serial-number-column">#</th>
-                                                        {% for column in data1[0].keys() %}
-                                                            <th>{{ column }}</th>
-                                                        {% endfor %}
-                                                    </tr>
-                                                </thead>
-                                                <tbody>
-                                                    {% for index in range(data1 | length) %}
-                                                        {% set row = data1[index] %}
-                                                        {% if not differing_indices %}
-                                                            <tr>
-                                                                <td class="tblCompareFirstCoulmn"></td>
-                                                                {% for value in row.values() %}
-                                                                    <td>{{ value }}</td>
-                                                                {% endfor %}
-                                                            </tr>
-                                                        {% else %}
-                                                            <tr>
-                                                                {% if loop.index0 in differing_indices %}
-                                                                    <td style="background-color: #ffb9b9;">
-                                                                        <i class="bi bi-arrow-bar-right"></i>
-                                                                    </td>
-                                                                {% else %}
-                                                                    <td></td>
-                                                                {% endif %}
-                                                        
-                                                                {% for value in row.values() %}
-                                                                    <td>{{ value }}</td>
-                                                                {% endfor %}
-                                                            </tr>
-                                                        {% endif %}
-                                                    {% endfor %}
-                                                </tbody>
-                                            </table>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="col divScrollDiv border" id="divLista">
-                            <div class="card mt-1">
-                                <div class="card-header d-flex flex-row">
-                                    <span class="badge bg-success square-badge excelFileName me-1">{{file_2_version}}</span>
-                                    <span class="headerFileNameCompare me-1" title="{{file2}}">{{file2}}</span> >
-                                    <span class="headerCompareSheetName ms-1 " id="SheetNameExcel2">{{file2_sheet_name}}</span>
-                                </div>
-                                <div class="card-body">
-                                    <div class="table-container">
-                                         <div class="table table-responsive">
-                                            <table class="table-sm table-bordered">
-                                                <thead class="table-dark hide-header">
-                                                    <tr>
-                                                        <th class="serial-number-column">#</th>
-                                                        {% for column in data2[0].keys() %}
-                                                            <th>{{ column }}</th>
-                                                        {% endfor %}
-                                                    </tr>
-                                                </thead>
-                                                <tbody>
-                                                    {% for index in range(data2 | length) %}
-                                                        {% set row = data2[index] %}
-                                                        {% if not differing_indices %}
-                                                            <tr>
-                                                                <td></td>
-                                                                {% for column, value in row.items() %}
-                                                                    {% set cell_coordinates = (index, loop.index0, column, value) %}
-                                                                    {% if cell_coordinates in different_values_df2 %}
-                                                                        <td style="background-color: rgb(127, 162, 92);">{{ value }}</td>
-                                                                    {% else %}
-                                                                        <td>{{ value }}</td>
-                                                                    {% endif %}
-                                                                {% endfor %}
-                                                            </tr>
-                                                        {% else %}
-                                                            <tr>
-                                                                {% if index in differing_indices %}
-                                                                    <td style="background-color: #ffb9b9;">
-                                                                        <i class="bi bi-arrow-bar-right"></i>
-                                                                    </td>
-                                                                {% else %}
-                                                                    <td></td>
-                                                                {% endif %}
-                                
-                                                                {% for column, value in row.items() %}
-                                                                    {% set cell_coordinates = (index, loop.index0, column, value) %}
-                                                                    {% if cell_coordinates in different_values_df2 %}
-                                                                        <td style="background-color: rgb(127, 162, 92);">{{ value }}</td>
-                                                                    {% else %}
-                                                                        <td>{{ value }}</td>
-                                                                    {% endif %}
-                                                                {% endfor %}
-                                                            </tr>
-                                                        {% endif %}
-                                                    {% endfor %}
-                                                </tbody>
-                                            </table>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            <!-- Bootstrap JS (optional) -->
-            <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.0.2/dist/js/bootstrap.bundle.min.js" integrity="sha384-MrcW6ZMFYlzcLA8Nl+NtUVF0sA7MsXsP1UyJoMp4YLEuNSfAP+JcXn/tWtIaxVXM" crossorigin="anonymous"></script>
-        </body>
-        </html>'''
+        Returns:
+            str: The CVWeb URL of the report
+        """
+        comparator = self.comparator_instance
+        # Written straight to the report folder, the temporary file is renamed into place once complete
+        write_report(
+            "excel_stream.html",
+            os.path.join(comparator.file1.report_directory, html_file_name),
+            title = title,
+            rows = rows,
+            stats = stats,
+            file1 = comparator.file1_name,
+            file2 = comparator.file2_name,
+            file1_sheet_name = comparator.file1_sheetname,
+            file2_sheet_name = comparator.file2_sheetname,
+            file_1_version = comparator.file1_version,
+            file_2_version = comparator.file2_version,
+        )
+        return comparator.file1.cvweb_url(html_file_name)
+
+class HtmlGenerator:
+    def __init__(self, comparator_instance) -> None:
+        self.comparator_instance = comparator_instance
+
+    def generate_result_html(self, session_path, data1, data2, title, file1, file2, file1_sheet_name, file2_sheet_name, file_1_version, file_2_version, differing_indices, different_values_df2, html_file_name="comparison_result.html", inserted_columns=(), removed_columns=()):
         try:
             # Render the HTML template with the provided data
-            template = Template(html_template_str)
-            render_html = template.render(
+            render_html = render_report(
+                "excel.html",
                 title = title,
                 data1 = data1,
                 data2 = data2,
@@ -512,59 +502,48 @@ class HtmlGenerator:
                 file2_sheet_name = file2_sheet_name,
                 file_1_version = file_1_version,
                 file_2_version = file_2_version,
-                differing_indices = differing_indices,
-                different_values_df2 = different_values_df2
+                # Sets, the template looks up every row and cell in them
+                differing_indices = set(differing_indices),
+                different_values_df2 = set(different_values_df2),
+                inserted_columns = set(inserted_columns),
+                removed_columns = set(removed_columns)
             )
 
-            # Save the rendered HTML to a file
-            html_file_path = f"{session_path}/comparison_result.html"
-            if os.path.exists(html_file_path):
-                with open(f"{session_path}/comparison_result.html", "w") as html_file:
-                    html_file.write(render_html)
+            workspace = self.comparator_instance.workspace
+            if workspace.copy_free:
+                # Write the HTML file straight to the CVWeb destination path
+                workspace.write_text(os.path.join(self.comparator_instance.file1.report_directory, html_file_name), render_html)
             else:
-                with open(f"{session_path}/comparison_result.html", "w") as html_file:
+                # Save the rendered HTML to a file
+                html_file_path = os.path.join(session_path, html_file_name)
+                with open(html_file_path, "w") as html_file:
                     html_file.write(render_html)
 
-            # Pause to ensure file operations are complete
-            sleep(5)
-            
-            
-            # Copy the HTML file to the CVWeb destination path
-            destination_path_list = self.comparator_instance.file1_path.split('\\')
-            destination_path_List = self.comparator_instance.file1_path.split('\\')[:-2]
-            destination_path = '\\'.join(destination_path_List)
-            shutil.copy(html_file_path, destination_path)
-            cvweb_index = destination_path_list.index('CVWeb')
-            cvweb_string = '//'.join(destination_path_list[cvweb_index:-2])
-            sleep(2)
+                # Pause to ensure file operations are complete
+                sleep(5)
+
+                # Copy the HTML file to the CVWeb destination path
+                workspace.copy(html_file_path, self.comparator_instance.file1.report_directory)
+                sleep(2)
+            # Brotli and gzip variants next to the report, served by the static file layer
+            precompress(os.path.join(self.comparator_instance.file1.report_directory, html_file_name), logger=self.comparator_instance.logger)
+            cvweb_string = self.comparator_instance.file1.cvweb_url(html_file_name)
 
             # Clean up the session workspace
             if self.comparator_instance.logger:
                 self.comparator_instance.logger.info("| Cleaning up session workspace")
-            SESSION_PATH = os.path.join(EXCEL_WORKSPACE, self.comparator_instance.session_id)
-            shutil.rmtree(SESSION_PATH)
+            workspace.cleanup()
 
-            return cvweb_string+"//comparison_result.html"
+            return cvweb_string
         except Exception as e:
             if self.comparator_instance.logger:
                 self.comparator_instance.logger.error(f"| Generating result HTML failed: {e}")
             raise HTTPException(status_code=500, detail="Error generating result HTML")
 
-# FastAPI route for comparing excel documents and generating the comparison URL   
-@router.post("/compare_excel")
-def generate_url(file_paths: ExcelFileRequest):
-    # Read configuration from the configuration file
-    config = configparser.ConfigParser(allow_no_value=True)
-    configuration_file_path = os.path.abspath(os.path.join("config","configuration.ini"))
-    config.read(rf"{configuration_file_path}")
-    logging_enabled = config.get('Logging', 'logging_enabled')
-    
-    # Configure the logger if logging is enabled
-    if logging_enabled == "on":
-        logger = DOCCOMLogging().configure_logger()
-    else:
-        # Set logger to None if logging is disabled
-        logger = None
+def compare_excel_documents(file_paths: ExcelFileRequest) -> dict:
+    # Runs the full Excel comparison pipeline inside a pool worker process
+    # Logger configured once per process, shared by every request it runs
+    logger = get_logger()
 
     if logger:
         logger.info("| Received request for excel document comparison")
@@ -573,38 +552,504 @@ def generate_url(file_paths: ExcelFileRequest):
     # Validate the provided documents
     if logger:
         logger.info("| Validating Excel Documents")
-    comparator.validate_excel_document()
+    streaming = comparator.use_streaming()
+    comparator.validate_excel_document(check_empty=not streaming)
 
     # Create a workspace for the session
     if logger:
         logger.info("| Creating workspace for session")
     comparator.create_workspace()
+    try:
+        if streaming:
+            # Diff the sheets in row chunks, writing the report and the diff as it goes
+            if logger:
+                logger.info(f"| Streaming Excel documents in chunks of {comparator.stream_settings.chunk_rows} rows")
+            result, diff = ExcelStreamComparator(comparator).run()
+            if result is None:
+                result = diff["url"]
+            if logger:
+                logger.info(f"| Result URL: {result}")
+            response = {"session_id": comparator.session_id, "result": result, "bytes_copied": comparator.workspace.bytes_copied}
+            if diff is not None:
+                response["diff"] = diff
+            return response
 
-    # Process the excel documents and highlight differences
-    if logger:
-        logger.info("| Start processing Excel document")
-    comparision_response = comparator.process_document()
+        # Process the excel documents and highlight differences
+        if logger:
+            logger.info("| Start processing Excel document")
+        comparision_response = comparator.process_document()
     
-    # Generate the result HTML with the comparison
-    if logger:
-        logger.info("| Generating Result HTML for Excel document")
-    session_path = os.path.join(EXCEL_WORKSPACE, comparator.session_id)
-    generate_html = HtmlGenerator(comparator)
-    result = generate_html.generate_result_html(
-        session_path, 
-        comparision_response['data1'], 
-        comparision_response['data2'], 
-        "Contentverse Excel Document Comparison",
-        comparator.file1_name, 
-        comparator.file2_name, 
-        comparator.file1_sheetname,
-        comparator.file2_sheetname, 
-        comparator.file1_version,
-        comparator.file2_version, 
-        comparision_response['differing_indices'], 
-        comparision_response['different_values_df2'])
+        diff = None
+        if comparator.diff_settings.enabled:
+            # Write the structured diff next to the report
+            if logger:
+                logger.info("| Writing structured diff for Excel document")
+            diff = comparision_response['structured_diff'].write(comparator.diff_settings, comparator.file1, "comparison_result", logger)
+
+        if comparator.diff_settings.html:
+            # Generate the result HTML with the comparison
+            if logger:
+                logger.info("| Generating Result HTML for Excel document")
+            session_path = comparator.workspace.path
+            generate_html = HtmlGenerator(comparator)
+            result = generate_html.generate_result_html(
+                session_path, 
+                comparision_response['data1'], 
+                comparision_response['data2'], 
+                "Contentverse Excel Document Comparison",
+                comparator.file1_name, 
+                comparator.file2_name, 
+                comparator.file1_sheetname,
+                comparator.file2_sheetname, 
+                comparator.file1_version,
+                comparator.file2_version, 
+                comparision_response['differing_indices'], 
+                comparision_response['different_values_df2'],
+                inserted_columns=comparision_response['inserted_columns'],
+                removed_columns=comparision_response['removed_columns'])
+        else:
+            # No report, the structured diff is the result
+            result = diff["url"]
     
+        if logger:
+            logger.info(f"| Result URL: {result}")
+        response = {"session_id": comparator.session_id, "result": result, "bytes_copied": comparator.workspace.bytes_copied}
+        if diff is not None:
+            response["diff"] = diff
+        return response
+    finally:
+        # Also on failure, the session folder holds nothing the report needs
+        comparator.workspace.cleanup()
+
+def read_sheet(file_path: str, sheet_name: str):
+    # Read a worksheet without a header row, every cell is compared as data
+    return get_spreadsheet_reader().read_sheet(file_path, sheet_name)
+
+def sheet_dimensions(file_path: str, sheet_name: str) -> tuple:
+    """
+    Rows and columns of a worksheet without loading it.
+
+    Args:
+        file_path (str): The Excel document
+        sheet_name (str): The worksheet, the first one if empty
+
+    Returns:
+        tuple: Rows and columns from the sheet's dimension record, (0, 0) when unknown
+    """
+    try:
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+            return (worksheet.max_row or 0, worksheet.max_column or 0)
+        finally:
+            workbook.close()
+    except Exception:
+        return (0, 0)
+
+def count_sheet_cells(file_path: str, sheet_name: str) -> int:
+    """
+    Count the cells of a worksheet without loading it.
+
+    Args:
+        file_path (str): The Excel document
+        sheet_name (str): The worksheet, the first one if empty
+
+    Returns:
+        int: Rows times columns from the sheet dimensions, or a file size based guess
+    """
+    rows, columns = sheet_dimensions(file_path, sheet_name)
+    if rows and columns:
+        return rows * columns
+    # No dimension record (or not an .xlsx file), assume roughly 10 compressed bytes per cell
+    try:
+        return os.path.getsize(file_path) // 10
+    except OSError:
+        return 0
+
+def estimate_excel_cost(file_paths: ExcelFileRequest) -> JobCost:
+    # Cell count of both compared sheets
+    file1_path = str(resolve_document_path(unquote(r'' + file_paths.file1_path)))
+    file2_path = str(resolve_document_path(unquote(r'' + file_paths.file2_path)))
+    cell_count = count_sheet_cells(file1_path, file_paths.file1_sheet_name) + count_sheet_cells(file2_path, file_paths.file2_sheet_name)
+    stream_settings = StreamSettings(file_paths.mode)
+    if stream_settings.streaming((file1_path, file2_path), cell_count):
+        # A streamed comparison holds one chunk of rows of each sheet
+        columns = sheet_dimensions(file1_path, file_paths.file1_sheet_name)[1] + sheet_dimensions(file2_path, file_paths.file2_sheet_name)[1]
+        return CostModel().excel_stream_cost(cell_count, min(cell_count, stream_settings.chunk_rows * (columns or 1000)))
+    return CostModel().excel_cost(cell_count)
+
+# FastAPI route for comparing excel documents and generating the comparison URL
+@router.post("/compare_excel")
+async def generate_url(file_paths: ExcelFileRequest):
+    # Estimate the job up front, then admit it to the shared process pool
+    cost = await run_in_threadpool(estimate_excel_cost, file_paths)
+    # Identical requests running at the same time, in any HTTP worker, share one comparison
+    result = await single_flight("compare_excel", file_paths, lambda: schedule_comparison("excel", compare_excel_documents, file_paths, cost=cost, priority=file_paths.priority))
+    return JSONResponse(content=result)
+
+@router.post("/compare_excel/upload", openapi_extra=upload_openapi(*(field for field in ExcelFileRequest.model_fields if not field.endswith("_path"))))
+async def generate_url_from_upload(request: Request):
+    # Same comparison on files streamed with the request, ?format=zip returns the result folder as a ZIP
+    return await compare_upload(request, "excel", ExcelFileRequest, estimate_excel_cost, compare_excel_documents)
+
+# Pydantic model for version chain request
+class ExcelChainRequest(BaseModel):
+    file_paths: List[str]
+    # One sheet per version, empty names (or an empty list) pick the first sheet
+    sheet_names: List[str] = []
+    session_id: str
+    priority: int = 0
+
+def read_chain_sheet(file_path: str, sheet_name: str):
+    # Read a version once, with the checks validate_excel_document makes
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail=f"{file_path} not found.")
+    try:
+        sheet = read_sheet(file_path, sheet_name)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Sheet name {sheet_name} not found in {file_path}")
+    if sheet.empty:
+        raise HTTPException(status_code=400, detail=f"Sheet name {sheet_name} in {file_path} is empty")
+    return sheet
+
+def compare_excel_chain(chain: ExcelChainRequest) -> dict:
+    """
+    Compare each adjacent pair of a version chain, inside a pool worker process.
+
+    Every version is read into a DataFrame once and kept in memory only until
+    the pair that uses it as the older side is done. Each pair gets its own
+    result HTML in the report folder. Chains always run copy-free.
+
+    Args:
+        chain (ExcelChainRequest): Ordered versions, oldest first
+
+    Returns:
+        dict: The result URL of every pair
+    """
+    logger = get_logger()
+    workspace = SessionWorkspace(EXCEL_WORKSPACE, chain.session_id, logger, copy_free=True)
+    sheet_names = list(chain.sheet_names) or [""] * len(chain.file_paths)
+    local_paths = [str(resolve_document_path(unquote(r'' + file_path)).local) for file_path in chain.file_paths]
+
+    def resolve_sheet_name(index: int) -> str:
+        # The first sheet is looked up once per version
+        if not sheet_names[index]:
+            if not os.path.isfile(local_paths[index]):
+                raise HTTPException(status_code=404, detail=f"{local_paths[index]} not found.")
+            sheet_names[index] = get_spreadsheet_reader().sheet_names(local_paths[index])[0]
+        return sheet_names[index]
+
+    try:
+        results = []
+        previous_frame = None
+        for index in range(len(chain.file_paths) - 1):
+            pair_request = ExcelFileRequest(
+                file1_path=chain.file_paths[index],
+                file1_sheet_name=resolve_sheet_name(index),
+                file2_path=chain.file_paths[index + 1],
+                file2_sheet_name=resolve_sheet_name(index + 1),
+                session_id=chain.session_id,
+                priority=chain.priority,
+                **{field: "" for field in ExcelFileRequest.model_fields if field.startswith("wm_")},
+            )
+            comparator = ExcelDocumentComparator(pair_request, logger)
+            comparator.workspace = workspace
+            workspace.create()
+
+            if previous_frame is None:
+                previous_frame = read_chain_sheet(comparator.file1_path, comparator.file1_sheetname)
+            current_frame = read_chain_sheet(comparator.file2_path, comparator.file2_sheetname)
+
+            comparision_response = comparator.compare_frames(previous_frame, current_frame)
+            result = HtmlGenerator(comparator).generate_result_html(
+                workspace.path,
+                comparision_response['data1'],
+                comparision_response['data2'],
+                "Contentverse Excel Document Comparison",
+                comparator.file1_name,
+                comparator.file2_name,
+                comparator.file1_sheetname,
+                comparator.file2_sheetname,
+                comparator.file1_version,
+                comparator.file2_version,
+                comparision_response['differing_indices'],
+                comparision_response['different_values_df2'],
+                html_file_name=f"comparison_{comparator.file1_version}_{comparator.file2_version}.html",
+                inserted_columns=comparision_response['inserted_columns'],
+                removed_columns=comparision_response['removed_columns'])
+            pair_result = {"file1_path": chain.file_paths[index], "file2_path": chain.file_paths[index + 1], "result": result}
+            if comparator.diff_settings.enabled:
+                # Structured diff of the pair, when [Diff] default_format asks for one
+                pair_result["diff"] = comparision_response['structured_diff'].write(
+                    comparator.diff_settings, comparator.file1, f"comparison_{comparator.file1_version}_{comparator.file2_version}", logger)
+            del comparision_response
+            results.append(pair_result)
+            if logger:
+                logger.info(f"| Chain pair {index + 1} result URL: {result}")
+
+            # Release the older version, only the newer one is needed for the next pair
+            previous_frame = current_frame
+        return {"session_id": chain.session_id, "results": results, "bytes_copied": workspace.bytes_copied}
+    finally:
+        workspace.cleanup()
+
+def estimate_excel_chain_cost(chain: ExcelChainRequest) -> JobCost:
+    # Two versions are held at a time, memory follows the largest adjacent pair
+    sheet_names = list(chain.sheet_names) or [""] * len(chain.file_paths)
+    cell_counts = [
+        count_sheet_cells(str(resolve_document_path(unquote(r'' + file_path))), sheet_name)
+        for file_path, sheet_name in zip(chain.file_paths, sheet_names)
+    ]
+    cost = CostModel().excel_cost(max(first + second for first, second in zip(cell_counts, cell_counts[1:])))
+    cost.work_units = sum(cell_counts)
+    return cost
+
+# FastAPI route for comparing an ordered list of excel document versions
+@router.post("/compare_excel_chain")
+async def generate_chain_url(chain: ExcelChainRequest):
+    # Diff every adjacent pair of an ordered version list in one pool job
+    if len(chain.file_paths) < 2:
+        raise HTTPException(status_code=400, detail="A version chain needs at least two documents")
+    if chain.sheet_names and len(chain.sheet_names) != len(chain.file_paths):
+        raise HTTPException(status_code=400, detail="sheet_names needs one entry per document")
+    cost = await run_in_threadpool(estimate_excel_chain_cost, chain)
+    result = await single_flight("compare_excel_chain", chain, lambda: schedule_comparison("excel", compare_excel_chain, chain, cost=cost, priority=chain.priority))
+    return JSONResponse(content=result)
+
+# Pydantic model for comparing every sheet of two workbooks
+class ExcelWorkbookRequest(BaseModel):
+    file1_path: str
+    file2_path: str
+    session_id: str
+    # 'name' pairs sheets with the same name, 'position' pairs them in workbook order
+    pairing: Literal["name", "position"] = "name"
+    priority: int = 0
+    diff_format: DiffFormat = ""
+    # Column pairing within each sheet pair, as in ExcelFileRequest
+    column_matching: Literal["", "position", "match"] = ""
+    header_row: Optional[int] = None
+    row_matching: Literal["", "position", "match"] = ""
+
+def frame_digest(frame) -> str:
+    # Content hash of a sheet, equal sheets are skipped without diffing them
+    hasher = hashlib.sha256(repr(frame.shape).encode())
+    hasher.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+def pair_sheets(sheet_names_1: list, sheet_names_2: list, pairing: str) -> list:
+    """
+    Pair the sheets of two workbooks.
+
+    Args:
+        sheet_names_1 (list): Sheets of the first workbook, in workbook order
+        sheet_names_2 (list): Sheets of the second workbook, in workbook order
+        pairing (str): 'name' or 'position'
+
+    Returns:
+        list: (sheet_1, sheet_2) tuples, None on the side a sheet is missing from
+    """
+    if pairing == "position":
+        count = max(len(sheet_names_1), len(sheet_names_2))
+        padded_1 = sheet_names_1 + [None] * (count - len(sheet_names_1))
+        padded_2 = sheet_names_2 + [None] * (count - len(sheet_names_2))
+        return list(zip(padded_1, padded_2))
+    pairs = [(sheet_name, sheet_name if sheet_name in sheet_names_2 else None) for sheet_name in sheet_names_1]
+    pairs.extend((None, sheet_name) for sheet_name in sheet_names_2 if sheet_name not in sheet_names_1)
+    return pairs
+
+def workbook_workspace(workbook: ExcelWorkbookRequest, request_id: str = None) -> SessionWorkspace:
+    # Scratch of the sheets shared by the jobs of one workbook comparison, found again by its request id
+    return SessionWorkspace(EXCEL_WORKSPACE, workbook.session_id, None, copy_free=True, request_id=request_id)
+
+def prepare_excel_workbook(workbook: ExcelWorkbookRequest, request_id: str) -> list:
+    """
+    Parse both workbooks once and plan the sheet comparisons, inside a pool worker process.
+
+    Sheets are paired, hashed and the frames of changed pairs are kept in
+    session scratch for the sheet jobs, which run in parallel.
+
+    Args:
+        workbook (ExcelWorkbookRequest): The workbooks to compare
+        request_id (str): Scratch folder of the request in the session workspace
+
+    Returns:
+        list: One entry per sheet pair with its status, sizes and scratch frames
+    """
+    logger = get_logger()
+    local_paths = [str(resolve_document_path(unquote(r'' + file_path)).local) for file_path in (workbook.file1_path, workbook.file2_path)]
+    for local_path in local_paths:
+        if not os.path.isfile(local_path):
+            if logger:
+                logger.error(f"| {local_path} not found")
+            raise HTTPException(status_code=404, detail=f"{local_path} not found.")
+    # Every sheet of a workbook in one parse
+    sheets_1, sheets_2 = (get_spreadsheet_reader().read_all_sheets(local_path) for local_path in local_paths)
+    scratch = workbook_workspace(workbook, request_id).scratch_dir("sheets")
+
+    plan = []
+    for index, (sheet_1, sheet_2) in enumerate(pair_sheets(list(sheets_1), list(sheets_2), workbook.pairing), start=1):
+        frame_1 = sheets_1.get(sheet_1) if sheet_1 is not None else None
+        frame_2 = sheets_2.get(sheet_2) if sheet_2 is not None else None
+        entry = {
+            "index": index,
+            "sheet_1": sheet_1,
+            "sheet_2": sheet_2,
+            "rows_1": 0 if frame_1 is None else len(frame_1),
+            "rows_2": 0 if frame_2 is None else len(frame_2),
+            "cells": sum(frame.size for frame in (frame_1, frame_2) if frame is not None),
+        }
+        if frame_1 is None or frame_1.empty:
+            entry["status"] = "unchanged" if frame_2 is None or frame_2.empty else "added"
+        elif frame_2 is None or frame_2.empty:
+            entry["status"] = "removed"
+        elif frame_digest(frame_1) == frame_digest(frame_2):
+            entry["status"] = "unchanged"
+        else:
+            entry["status"] = "changed"
+            entry["frame_1"] = os.path.join(scratch, f"{index}_1.pkl")
+            entry["frame_2"] = os.path.join(scratch, f"{index}_2.pkl")
+            frame_1.to_pickle(entry["frame_1"])
+            frame_2.to_pickle(entry["frame_2"])
+        plan.append(entry)
     if logger:
-        logger.info(f"| Result URL: {result}")
-    return JSONResponse(content={"session_id": comparator.session_id, "result": result})
-        
\ No newline at end of file
+        changed = sum(entry["status"] == "changed" for entry in plan)
+        logger.info(f"| Workbook {workbook.session_id}: {len(plan)} sheet pairs, {changed} changed")
+    return plan
+
+def compare_excel_sheet(workbook: ExcelWorkbookRequest, entry: dict) -> dict:
+    """
+    Diff one changed sheet pair of a workbook comparison, inside a pool worker process.
+
+    Args:
+        workbook (ExcelWorkbookRequest): The workbooks being compared
+        entry (dict): The pair's plan entry from prepare_excel_workbook
+
+    Returns:
+        dict: The pair's counts, report file and structured diff
+    """
+    logger = get_logger()
+    pair_request = ExcelFileRequest(
+        file1_path=workbook.file1_path,
+        file1_sheet_name=entry["sheet_1"],
+        file2_path=workbook.file2_path,
+        file2_sheet_name=entry["sheet_2"],
+        session_id=f"{workbook.session_id}-sheet-{entry['index']}",
+        priority=workbook.priority,
+        diff_format=workbook.diff_format,
+        column_matching=workbook.column_matching,
+        header_row=workbook.header_row,
+        row_matching=workbook.row_matching,
+        **{field: "" for field in ExcelFileRequest.model_fields if field.startswith("wm_")},
+    )
+    comparator = ExcelDocumentComparator(pair_request, logger)
+    # Each sheet job has its own workspace, removed once the sheet is done or has failed
+    comparator.workspace = SessionWorkspace(EXCEL_WORKSPACE, pair_request.session_id, logger, copy_free=True)
+    comparator.workspace.create()
+    try:
+        comparision_response = comparator.compare_frames(pd.read_pickle(entry["frame_1"]), pd.read_pickle(entry["frame_2"]))
+        report_name = f"comparison_result_sheet_{entry['index']}"
+        HtmlGenerator(comparator).generate_result_html(
+            comparator.workspace.path,
+            comparision_response['data1'],
+            comparision_response['data2'],
+            "Contentverse Excel Document Comparison",
+            comparator.file1_name,
+            comparator.file2_name,
+            comparator.file1_sheetname,
+            comparator.file2_sheetname,
+            comparator.file1_version,
+            comparator.file2_version,
+            comparision_response['differing_indices'],
+            comparision_response['different_values_df2'],
+            html_file_name=f"{report_name}.html",
+            inserted_columns=comparision_response['inserted_columns'],
+            removed_columns=comparision_response['removed_columns'])
+        result = {
+            "changed_rows": len(comparision_response['differing_indices']),
+            "changed_cells": len(comparision_response['different_values_df2']),
+            "report": f"{report_name}.html",
+        }
+        if comparator.diff_settings.enabled:
+            result["diff"] = comparision_response['structured_diff'].write(comparator.diff_settings, comparator.file1, report_name, logger)
+        return result
+    finally:
+        comparator.workspace.cleanup()
+
+def write_workbook_report(workbook: ExcelWorkbookRequest, plan: list) -> str:
+    """
+    Write the combined report, a per-sheet summary with the changed sheets' reports embedded.
+
+    Args:
+        workbook (ExcelWorkbookRequest): The workbooks compared
+        plan (list): Plan entries, completed with the sheet job results
+
+    Returns:
+        str: CVWeb relative URL of the report
+    """
+    file1 = resolve_document_path(unquote(r'' + workbook.file1_path))
+    file2 = resolve_document_path(unquote(r'' + workbook.file2_path))
+    render_html = render_report(
+        "excel_workbook.html",
+        title="Contentverse Excel Workbook Comparison",
+        file1=file1.name,
+        file2=file2.name,
+        file_1_version=file1.version,
+        file_2_version=file2.version,
+        sheets=plan,
+    )
+    workbook_workspace(workbook).write_text(os.path.join(file1.report_directory, "comparison_result.html"), render_html)
+    precompress(os.path.join(file1.report_directory, "comparison_result.html"))
+    return file1.cvweb_url("comparison_result.html")
+
+def estimate_excel_workbook_cost(workbook: ExcelWorkbookRequest) -> JobCost:
+    # Parsing holds every sheet of both workbooks at once
+    cell_count = sum(
+        count_workbook_cells(str(resolve_document_path(unquote(r'' + file_path))))
+        for file_path in (workbook.file1_path, workbook.file2_path)
+    )
+    return CostModel().excel_cost(cell_count)
+
+def count_workbook_cells(file_path: str) -> int:
+    # Cells of every worksheet from the sheet dimensions, or a file size based guess
+    try:
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            return sum((worksheet.max_row or 0) * (worksheet.max_column or 0) for worksheet in workbook.worksheets)
+        finally:
+            workbook.close()
+    except Exception:
+        try:
+            return os.path.getsize(file_path) // 10
+        except OSError:
+            return 0
+
+async def compare_workbook_sheet(workbook: ExcelWorkbookRequest, entry: dict) -> None:
+    # Run one changed sheet pair, a failing sheet is reported in its summary row
+    try:
+        entry.update(await schedule_comparison(
+            "excel", compare_excel_sheet, workbook, entry, cost=CostModel().excel_cost(entry["cells"]), priority=workbook.priority))
+    except HTTPException as e:
+        entry.update(status="error", detail=e.detail)
+
+# FastAPI route for comparing every sheet of two workbooks
+@router.post("/compare_excel_workbook")
+async def generate_workbook_url(workbook: ExcelWorkbookRequest):
+    # Parse both workbooks once, then diff the changed sheet pairs in parallel pool jobs
+    cost = await run_in_threadpool(estimate_excel_workbook_cost, workbook)
+
+    async def compare_workbook() -> dict:
+        workspace = workbook_workspace(workbook)
+        try:
+            plan = await schedule_comparison("excel", prepare_excel_workbook, workbook, workspace.request_id, cost=cost, priority=workbook.priority)
+            await asyncio.gather(*(compare_workbook_sheet(workbook, entry) for entry in plan if entry["status"] == "changed"))
+            result = await run_in_threadpool(write_workbook_report, workbook, plan)
+        finally:
+            await run_in_threadpool(workspace.cleanup)
+        for entry in plan:
+            entry.pop("frame_1", None)
+            entry.pop("frame_2", None)
+            entry.pop("cells", None)
+        return {"session_id": workbook.session_id, "result": result, "sheets": plan}
+
+    # Identical requests running at the same time, in any HTTP worker, share one comparison
+    return JSONResponse(content=await single_flight("compare_excel_workbook", workbook, compare_workbook))
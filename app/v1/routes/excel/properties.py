@@ -4,10 +4,11 @@ from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from urllib.parse import unquote
-import pandas as pd
-import configparser
 import os
-from app.log_mgmt.docom_log_config import DOCCOMLogging
+from app.log_mgmt.docom_log_config import DOCCOMLogging, get_logger
+from app.path_mgmt.docom_path import resolve_document_path
+from app.worker_mgmt.docom_worker_pool import run_comparison
+from app.reader_mgmt.docom_reader import get_spreadsheet_reader
 
 # Create the FastAPI router for the Excel document properties endpoint
 router = APIRouter()
@@ -27,8 +28,8 @@ class ExcelDocumentProperties:
             file_paths (ExcelFileRequest): The request containing the file paths.
             logger (DOCCOMLogging): The logger instance to use for logging.
         """
-        self.file_1_path = unquote(r'' + file_paths.file1_path)
-        self.file_2_path = unquote(r'' + file_paths.file2_path)
+        self.file_1_path = str(resolve_document_path(unquote(r'' + file_paths.file1_path)))
+        self.file_2_path = str(resolve_document_path(unquote(r'' + file_paths.file2_path)))
         self.logger = logger
 
     def _validate_excel_document(self, file_path: str) -> None:
@@ -57,8 +58,8 @@ class ExcelDocumentProperties:
         try:
             if self.logger:
                 self.logger.debug(f"| Reading Excel document properties for file: {file_path}")
-            # Read the Excel file using pandas
-            df = pd.read_excel(file_path, sheet_name=None)
+            # Read the Excel file with the engine selected for it
+            df = get_spreadsheet_reader().read_all_sheets(file_path, header=0)
 
             # Extract properties for the Excel document
             properties = {}
@@ -95,29 +96,18 @@ class ExcelDocumentProperties:
             'file2_properties': file2_properties
         }
     
-@router.post("/excel_properties")
-def properties(file_paths: ExcelFileRequest):
+def read_excel_properties(file_paths: ExcelFileRequest) -> dict:
     """
-    Endpoint to retrieve the properties of two Excel documents.
+    Retrieve the properties of two Excel documents, runs inside a pool worker process.
 
     Args:
         file_paths (ExcelFileRequest): The request containing the file paths of the two Excel documents.
 
     Returns:
-        JSONResponse: A JSON response containing the properties of the two Excel documents.
+        dict: The properties of the two Excel documents.
     """
-    # Read configuration from the configuration file
-    config = configparser.ConfigParser(allow_no_value=True)
-    configuration_file_path = os.path.abspath(os.path.join("config","configuration.ini"))
-    config.read(rf"{configuration_file_path}")
-    logging_enabled = config.get('Logging', 'logging_enabled')
-    
-    # Configure the logger if logging is enabled
-    if logging_enabled == "on":
-        logger = DOCCOMLogging().configure_logger()
-    else:
-        # Set logger to None if logging is disabled
-        logger = None
+    # Logger configured once per process, shared by every request it runs
+    logger = get_logger()
 
     # Create an instance of the ExcelDocumentProperties class
     exceldocproperties = ExcelDocumentProperties(file_paths, logger)
@@ -125,6 +115,19 @@ def properties(file_paths: ExcelFileRequest):
     # Return the properties of the Excel documents
     if logger:
         logger.info(f"| Processing Excel document properties for files: {file_paths.file1_path} and {file_paths.file2_path}")
-    properties = exceldocproperties.get_excel_doc_properties()
+    return exceldocproperties.get_excel_doc_properties()
+
+@router.post("/excel_properties")
+async def properties(file_paths: ExcelFileRequest):
+    """
+    Endpoint to retrieve the properties of two Excel documents.
+
+    Args:
+        file_paths (ExcelFileRequest): The request containing the file paths of the two Excel documents.
 
-    return JSONResponse(content=properties)
\ No newline at end of file
+    Returns:
+        JSONResponse: A JSON response containing the properties of the two Excel documents.
+    """
+    # Workbooks are parsed with pandas, keep that off the event loop
+    properties = await run_comparison("excel", read_excel_properties, file_paths)
+    return JSONResponse(content=properties)
@@ -2,17 +2,30 @@
 
 import os
 import uuid
-import cv2
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from urllib.parse import unquote
-from jinja2 import Template
-import shutil
-import configparser
-from app.log_mgmt.docom_log_config import DOCCOMLogging
+from typing import List
+from urllib.parse import quote, unquote
+from app.log_mgmt.docom_log_config import DOCCOMLogging, get_logger
+from app.path_mgmt.docom_path import resolve_document_path
+from app.worker_mgmt.docom_scheduler import CostModel, JobCost, schedule_comparison
+from app.worker_mgmt.docom_preload import lazy_import
+from app.workspace_mgmt.docom_workspace import SessionWorkspace
+from app.report_mgmt.docom_report import render_report
+from app.static_mgmt.docom_static import precompress
+from app.upload_mgmt.docom_upload import compare_upload, upload_openapi
+from app.input_mgmt.docom_input import read_image
+from app.region_mgmt.docom_regions import get_region_classifier, shade_boxes
+from app.diff_mgmt.docom_diff import DiffFormat, DiffSettings, StructuredDiff
+from app.flight_mgmt.docom_flight import single_flight
+
+# Heavy libraries are imported on first use
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
 from time import sleep
-import numpy as np 
+from starlette.concurrency import run_in_threadpool
 
 # Initialize FastAPI router
 router = APIRouter()
@@ -25,23 +38,41 @@ class ImageFileRequest(BaseModel):
     file1_path: str
     file2_path: str
     session_id: str
+    priority: int = 0
+    # Structured diff next to the HTML report, and whether the HTML report is rendered at all
+    diff_format: DiffFormat = ""
+    html: bool = True
 
 # Class for image document comparison
 class ImageDocumentComparator:
     def __init__(self, file_paths: ImageFileRequest, logger: DOCCOMLogging ) -> None:
         # Decode and initialize file paths and session ID
         """First Image"""
-        self.file_1_path = unquote(r'' + file_paths.file1_path)
-        self.file_1_name = os.path.basename(self.file_1_path)
-        self.file_1_version = self.file_1_path.split('\\')[-2]
+        self.file_1 = resolve_document_path(unquote(r'' + file_paths.file1_path))
+        self.file_1_path = str(self.file_1.local)
+        self.file_1_name = self.file_1.name
+        self.file_1_version = self.file_1.version
 
         """Second Image"""
-        self.file_2_path = unquote(r'' + file_paths.file2_path)
-        self.file_2_name = os.path.basename(self.file_2_path)
-        self.file_2_version = self.file_2_path.split('\\')[-2]
+        self.file_2 = resolve_document_path(unquote(r'' + file_paths.file2_path))
+        self.file_2_path = str(self.file_2.local)
+        self.file_2_name = self.file_2.name
+        self.file_2_version = self.file_2.version
 
         self.logger = logger
         self.session_id = file_paths.session_id
+        self.workspace = SessionWorkspace(IMAGE_WORKSPACE, self.session_id, logger)
+
+        # Paths the images are read from, set once they are staged
+        self.image_1_source = self.file_1_path
+        self.image_2_source = self.file_2_path
+        # Content hashes of the images, computed while they are read
+        self.image_1_digest = None
+        self.image_2_digest = None
+        self.diff_settings = DiffSettings(file_paths.diff_format, file_paths.html)
+        # Regions found by the last diff and the size of the image they were found on
+        self.difference_regions = None
+        self.image_size = None
 
     def validate_image_document(self):
         # Validate if image files exist
@@ -56,41 +87,31 @@ class ImageDocumentComparator:
         
     def create_workspace(self):
         # Create workspace directory for the session if it doesn't exist
-        session_folder = os.path.join(IMAGE_WORKSPACE, self.session_id)
-        os.makedirs(session_folder, exist_ok=True)
+        self.workspace.create()
         if self.logger:
             self.logger.info(f"| Workspace created for session: {self.session_id}")
     
     def copy_document_to_session_workspace(self):
         try:
-            # Create directories for the image versions within the session workspace
-            session_path = os.path.join(IMAGE_WORKSPACE, self.session_id)
-            file_1_workspace = os.path.join(session_path, self.file_1_version)
-            file_2_workspace = os.path.join(session_path, self.file_2_version)
-            
-            # Create session workspace folder
-            os.makedirs(file_1_workspace, exist_ok=True)
-            os.makedirs(file_2_workspace, exist_ok=True)
-            
-            # Copy images to the session workspace
-            shutil.copy(self.file_1_path, file_1_workspace)
-            shutil.copy(self.file_2_path, file_2_workspace)
+            # Copy images to their version folders in the session workspace, or read them in place when copy-free
+            self.image_1_source = self.workspace.stage_source(self.file_1_path, self.file_1_version)
+            self.image_2_source = self.workspace.stage_source(self.file_2_path, self.file_2_version)
 
-            if self.logger:
+            if self.logger and not self.workspace.copy_free:
                 self.logger.info(f"| Images copied to workspace for session: {self.session_id}")
 
             data = [ {
                         "file1": {
                             "file1_name": self.file_1_name,
                             "file1_version": self.file_1_version,
-                            "file1_static_path": f"/static/image/{self.session_id}/{self.file_1_version}/{self.file_1_name}"
+                            "file1_static_path": f"/static/image/{self.session_id}/{self.workspace.request_id}/{self.file_1_version}/{self.file_1_name}"
                         }
                     },
                     {
                         "file2": {
                             "file2_name": self.file_2_name,
                             "file2_version": self.file_2_version,
-                            "file2_static_path": f"/static/image/{self.session_id}/{self.file_2_version}/{self.file_2_name}"
+                            "file2_static_path": f"/static/image/{self.session_id}/{self.workspace.request_id}/{self.file_2_version}/{self.file_2_name}"
                         }
                     }
             ]
@@ -100,57 +121,96 @@ class ImageDocumentComparator:
                 self.logger.error(f"| Error copying images to workspace: {e}")
             raise HTTPException(status_code=500, detail="Error copying images to workspace")
 
-    def process_image(self):
-        try:
-            # Paths for images in the session workspace
-            SESSION_PATH = os.path.join(IMAGE_WORKSPACE, self.session_id)
-            image1_path = os.path.join(SESSION_PATH, self.file_1_version, self.file_1_name)
-            image2_path = os.path.join(SESSION_PATH, self.file_2_version, self.file_2_name)
-            
-            # Read Image
-            image1 = cv2.imread(image1_path)
-            image2 = cv2.imread(image2_path)
+    def find_differences(self, image1, image2) -> tuple:
+        """
+        Find the regions where image2 differs from image1.
 
-            # Resize image2 if dimensions do not match
-            if image1.shape[:2] != image2.shape[:2]:
-                image2_resized = cv2.resize(image2, (image1.shape[1], image1.shape[0]))
-            else:
-                image2_resized = image2
+        Args:
+            image1: Decoded first image
+            image2: Decoded second image
+
+        Returns:
+            tuple: image2 resized to image1 if needed, and the (N, 4) x, y, w, h regions
+        """
+        # Resize image2 if dimensions do not match
+        if image1.shape[:2] != image2.shape[:2]:
+            image2_resized = cv2.resize(image2, (image1.shape[1], image1.shape[0]))
+        else:
+            image2_resized = image2
 
-            # Convert images to grayscale
-            gray1 = cv2.cvtColor(image1, cv2.COLOR_BGR2GRAY)
-            gray2 = cv2.cvtColor(image2_resized, cv2.COLOR_BGR2GRAY)
+        # Convert images to grayscale
+        gray1 = cv2.cvtColor(image1, cv2.COLOR_BGR2GRAY)
+        gray2 = cv2.cvtColor(image2_resized, cv2.COLOR_BGR2GRAY)
 
-            # Compute absolute difference between the two images
-            diff = cv2.absdiff(gray1, gray2)
+        # Compute absolute difference between the two images
+        diff = cv2.absdiff(gray1, gray2)
 
-            # Threshold the difference image
-            _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
+        # Threshold the difference image
+        _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
 
-            # Find contours of differences
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # Keep the regions that are real changes rather than scan or compression noise
+        regions = get_region_classifier().classify(thresh, gray1, gray2)
+        self.difference_regions = regions
+        self.image_size = (image1.shape[1], image1.shape[0])
+        return image2_resized, regions
 
-            # Draw bounding boxes around differences in image2
-            red_color = (51, 51, 255)
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                # Create a green rectangle with opacity
-                opacity = 0.3
-                overlay = image2_resized.copy()
-                cv2.rectangle(overlay, (x, y), (x+w, y+h), red_color, cv2.FILLED)
-                cv2.addWeighted(overlay, opacity, image2_resized, 1 - opacity, 0, image2_resized)
-            cv2.imwrite(image2_path, image2_resized)
+    def annotate_differences(self, image1, image2):
+        """
+        Shade the regions where image2 differs from image1.
+
+        Args:
+            image1: Decoded first image
+            image2: Decoded second image, shaded in place when it has the size of image1
+
+        Returns:
+            image2, resized to image1 if needed, with the differences shaded
+        """
+        image2_resized, regions = self.find_differences(image1, image2)
+
+        # Shade every difference in image2 with one translucent overlay
+        red_color = (51, 51, 255)
+        opacity = 0.3
+        shade_boxes(image2_resized, regions, red_color, opacity)
+        return image2_resized
+
+    def process_image(self):
+        try:
+            # Paths for images in the session workspace, or the sources when copy-free
+            image1_path = self.image_1_source
+            image2_path = self.image_2_source
+            
+            # Read Image from memory-mapped files, hashing them in the same pass
+            image1, self.image_1_digest = read_image(image1_path)
+            image2, self.image_2_digest = read_image(image2_path)
+            if self.logger:
+                self.logger.info(f"| Read images (digests {self.image_1_digest}, {self.image_2_digest})")
+
+            if not self.diff_settings.html:
+                # Only the structured diff is wanted, nothing is annotated or written
+                self.find_differences(image1, image2)
+                return None
+
+            image2_resized = self.annotate_differences(image1, image2)
 
             # Generate unique IDs for the processed images
-            image_extention = os.path.splitext(self.file_1_path)[1:][0]
+            image_extention = self.file_1.suffix
             unique_id_image_1 = uuid.uuid4()
             unique_id_image_1_str = f"{str(unique_id_image_1)}{image_extention}"
             unique_id_image_2 = uuid.uuid4()
             unique_id_image_2_str = f"{str(unique_id_image_2)}{image_extention}"
+            report_directory = self.file_1.report_directory
+
+            if self.workspace.copy_free:
+                # The report links the first image where it is and gets the annotated second image written beside it
+                _, encoded_image = cv2.imencode(image_extention, image2_resized)
+                self.workspace.write_bytes(os.path.join(report_directory, unique_id_image_2_str), encoded_image.tobytes())
+                unique_id_image_1_str = f"{quote(self.file_1_version)}/{quote(self.file_1_name)}"
+            else:
+                cv2.imwrite(image2_path, image2_resized)
 
-            # Copy processed images to base path
-            shutil.copy(image1_path, f"{'//'.join(self.file_1_path.split('\\')[:-2])}//{unique_id_image_1_str}")
-            shutil.copy(image2_path, f"{'//'.join(self.file_1_path.split('\\')[:-2])}//{unique_id_image_2_str}")
+                # Copy processed images to base path
+                self.workspace.copy(image1_path, os.path.join(report_directory, unique_id_image_1_str))
+                self.workspace.copy(image2_path, os.path.join(report_directory, unique_id_image_2_str))
 
             if self.logger:
                 self.logger.info(f"| Processed images for session: {self.session_id}")
@@ -161,160 +221,38 @@ class ImageDocumentComparator:
                 self.logger.error(f"| Docuemnt Pre-Processing failed: {e}")
             raise HTTPException(status_code=500, detail="Error processing images")
 
+    def structured_diff(self) -> StructuredDiff:
+        # Regions of the last diff in pixels of the first image
+        regions = self.difference_regions
+        width, height = self.image_size
+        changes = {
+            "x": regions[:, 0].tolist(),
+            "y": regions[:, 1].tolist(),
+            "width": regions[:, 2].tolist(),
+            "height": regions[:, 3].tolist(),
+        }
+        summary = {
+            "image_1": self.file_1_name,
+            "image_2": self.file_2_name,
+            "width": width,
+            "height": height,
+            "regions": len(regions),
+            # Overlapping regions are counted twice, an upper bound of the changed share
+            "changed_area_ratio": round(min(1.0, float((regions[:, 2] * regions[:, 3]).sum()) / (width * height)), 6),
+        }
+        return StructuredDiff("image", summary, changes)
+
 
 class HtmlGenerator:
 
     def __init__(self, comparator_instance) -> None:
         self.comparator_instance = comparator_instance
 
-    def generate_result_html(self, session_path, file1, file2, file_1_version, file_2_version, file_1_static_path, file_2_static_path):
-        # HTML template for comparison result
-        html_template_str = '''<!DOCTYPE html>
-        <html>
-            <head>
-                <title></title>
-                <!-- Bootstrap CSS -->
-                <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.0.2/dist/css/bootstrap.min.css" rel="stylesheet"
-        integrity="sha384-EVSTQN3/azprG1Anm3QDgpJLIm9Nao0Yz1ztcQTwFspd3yD65VohhpuuCOmLASjC" crossorigin="anonymous">
-                <script src="https://ajax.googleapis.com/ajax/libs/jquery/3.7.1/jquery.min.js"></script>
-                <style>
-                    body,.badge {
-                        font-size: 0.81rem
-                    }
-
-                    .table-responsive {
-                        overflow-x: unset;
-                    }
-
-                    .table-responsive table {
-                        width: 100%;
-                    }
-
-                    .table-container {
-                        display: flex;
-                    }
-
-                    .table-container .table-responsive {
-                        flex: 0 0 auto;
-                        margin-right: 10px;
-                    }
-
-                    .square-badge {
-                        border-radius: 0;
-                    }
-
-                    .divScrollDiv {
-                        display: inline-block;
-                        width: 100%;
-                        border: 1px solid black;
-                        height: 98vh;
-                        overflow: auto;
-                    }
-
-                    .tableNoScroll {
-                        overflow: hidden;
-                    }
-
-                    .excelFileName {
-                        max-width: 20%;
-                        white-space: nowrap;
-                        overflow: hidden !important;
-                        text-overflow: ellipsis;
-                        text-align: left;
-                    }
-
-                    .badge {
-                        padding: .35em .65em !important
-                    }
-
-                    .tooltip-inner {
-                        max-width: 100%;
-                    }
-
-                    .card-header {
-                        padding: 0.3rem 0.5rem !important;
-                        font-weight: 500;
-                    }
-
-                    .card-body {
-                        padding: 0.5rem 0.5rem !important;
-                    }
-
-                    .headerFileNameCompare {
-                        max-width: 80%;
-                        white-space: nowrap;
-                        overflow: hidden !important;
-                        text-overflow: ellipsis;
-                    }
-                </style>
-                <script>
-                    $(document).ready(function () {
-                        var target_sec = $("#divFixed");
-                        $("#divLista").scroll(function () {
-                            target_sec.prop("scrollTop", this.scrollTop)
-                            .prop("scrollLeft", this.scrollLeft);
-                        });
-
-                    var target_first = $("#divLista");
-
-                    $("#divFixed").scroll(function () {
-                        target_first.prop("scrollTop", this.scrollTop)
-                        .prop("scrollLeft", this.scrollLeft);
-                    });
-                    });
-                </script>
-            </head>
-            <body>
-                <div class="col-lg mx-auto p-1 py-md-1">
-                    <div class="container-fluid">
-                       <div class="row">
-                            <div class="col divScrollDiv border" id="divFixed">
-                                <div class="card mt-1">
-                                    <div class="card-header d-flex flex-row">
-                                        <span class="badge bg-success square-badge excelFileName me-1">{{file_1_version}}</span>
-                                        <span class="headerFileNameCompare me-1" title="{{file1}}">{{file1}}</span>
-                                    </div>
-                                    <div class="card-body">
-                                        <div class="table-container">
-                                            <div class="table table-responsive">
-                                                <!-- Load First Image -->
-                                                <img src="{{file_1_static_path}}" class="img-fluid" alt="{{file1}}"
-                                        style="height: 100%; width: 100%; background-size: cover;">
-                                            </div>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="col divScrollDiv border" id="divLista">
-                                <div class="card mt-1">
-                                    <div class="card-header d-flex flex-row">
-                                        <span class="badge bg-success square-badge excelFileName me-1">{{file_2_version}}</span>
-                                        <span class="headerFileNameCompare me-1" title="{{file2}}">{{file2}}</span>
-                                    </div>
-                                </div>
-                                <div class="card-body">
-                                    <div class="table-container">
-                                        <div class="table table-responsive">
-                                            <!--Load Second Image-->
-                                            <img src="{{file_2_static_path}}" class="img-fluid" alt="{{file2}}"
-                                        style="height: 100%; width: 100%; background-size: cover;">
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                       </div> 
-                    </div>
-                </div>
-                <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.0.2/dist/js/bootstrap.bundle.min.js"
-        integrity="sha384-MrcW6ZMFYlzcLA8Nl+NtUVF0sA7MsXsP1UyJoMp4YLEuNSfAP+JcXn/tWtIaxVXM"
-        crossorigin="anonymous"></script>
-            </body>
-        </html>'''
-
+    def generate_result_html(self, session_path, file1, file2, file_1_version, file_2_version, file_1_static_path, file_2_static_path, html_file_name="comparison_result.html"):
         try:
             # Render the HTML template with the provided data
-            template = Template(html_template_str)
-            render_html = template.render(
+            render_html = render_report(
+                "image.html",
                 file1 = file1,
                 file2 = file2,
                 file_1_version = file_1_version,
@@ -323,48 +261,42 @@ class HtmlGenerator:
                 file_2_static_path = file_2_static_path
             )
 
+            workspace = self.comparator_instance.workspace
+            if workspace.copy_free:
+                # Write the HTML file straight to the CVWeb destination path
+                workspace.write_text(os.path.join(self.comparator_instance.file_1.report_directory, html_file_name), render_html)
+                precompress(os.path.join(self.comparator_instance.file_1.report_directory, html_file_name), logger=self.comparator_instance.logger)
+                return self.comparator_instance.file_1.cvweb_url(html_file_name)
+
             # Save the rendered HTML to a file
-            html_file_path = f"{session_path}/comparison_result.html"
+            html_file_path = os.path.join(session_path, html_file_name)
             if os.path.exists(html_file_path):
                 os.remove(html_file_path)
-                with open(f"{session_path}/comparison_result.html", "w") as html_file:
+                with open(html_file_path, "w") as html_file:
                     html_file.write(render_html)
             else:
-                with open(f"{session_path}/comparison_result.html", "w") as html_file:
+                with open(html_file_path, "w") as html_file:
                     html_file.write(render_html)
 
             # Pause to ensure file operations are complete
             sleep(5)
 
             # Copy the HTML file to the CVWeb destination path
-            destination_path_list = self.comparator_instance.file_1_path.split('\\')
-            destination_path_List = self.comparator_instance.file_1_path.split('\\')[:-2]
-            destination_path = '\\'.join(destination_path_List)
-            shutil.copy(html_file_path, destination_path)
-            cvweb_index = destination_path_list.index('CVWeb')
-            cvweb_string = '//'.join(destination_path_list[cvweb_index:-2])
-            return cvweb_string+"//comparison_result.html"
+            workspace.copy(html_file_path, self.comparator_instance.file_1.report_directory)
+            # Brotli and gzip variants next to the report, served by the static file layer
+            precompress(os.path.join(self.comparator_instance.file_1.report_directory, html_file_name), logger=self.comparator_instance.logger)
+            return self.comparator_instance.file_1.cvweb_url(html_file_name)
         except Exception as e:
             if self.comparator_instance.logger:
                 self.comparator_instance.logger.error(f"| Generating result HTML failed: {e}")
             raise HTTPException(status_code=500, detail="Error generating result HTML")
         
-# FastAPI route for comparing images and generating the comparison URL   
-@router.post("/compare_image")
-def generate_url(file_paths: ImageFileRequest):
+def compare_image_documents(file_paths: ImageFileRequest) -> dict:
+    # Runs the full image comparison pipeline inside a pool worker process
+    comparator = None
     try:
-        # Read configuration from the configuration file
-        config = configparser.ConfigParser(allow_no_value=True)
-        configuration_file_path = os.path.abspath(os.path.join("config","configuration.ini"))
-        config.read(rf"{configuration_file_path}")
-        logging_enabled = config.get('Logging', 'logging_enabled')
-    
-        # Configure the logger if logging is enabled
-        if logging_enabled == "on":
-            logger = DOCCOMLogging().configure_logger()
-        else:
-            # Set logger to None if logging is disabled
-            logger = None
+        # Logger configured once per process, shared by every request it runs
+        logger = get_logger()
 
         if logger:
             logger.info("| Received request for image document comparison")
@@ -380,41 +312,196 @@ def generate_url(file_paths: ImageFileRequest):
             logger.info("| Creating workspace for session")
         comparator.create_workspace()
 
-        # Copy the images to the session workspace
-        if logger:
-            logger.info("| Copying images to session workspace")
-        copied_image = comparator.copy_document_to_session_workspace()
+        html = comparator.diff_settings.html
+        if html:
+            # Copy the images to the session workspace
+            if logger:
+                logger.info("| Copying images to session workspace")
+            copied_image = comparator.copy_document_to_session_workspace()
     
         # Process the images and highlight differences
         if logger:
             logger.info("| Processing images for differences")
         compare_image_result = comparator.process_image()
+
+        diff = None
+        if comparator.diff_settings.enabled:
+            # Write the structured diff next to the report
+            if logger:
+                logger.info("| Writing structured diff for Image document")
+            diff = comparator.structured_diff().write(comparator.diff_settings, comparator.file_1, "comparison_result", logger)
     
-        # Generate the result HTML with the comparison
-        if logger:
-            logger.info("| Generating Result HTML for Image document")
-        session_path = os.path.join(IMAGE_WORKSPACE, comparator.session_id)
-        generate_html = HtmlGenerator(comparator)
-        result = generate_html.generate_result_html(
-            session_path,
-            copied_image[0]['file1']['file1_name'],
-            copied_image[1]['file2']['file2_name'],
-            copied_image[0]['file1']['file1_version'], 
-            copied_image[1]['file2']['file2_version'],
-            compare_image_result['file_1'], 
-            compare_image_result['file_2']
-            )
+        if html:
+            # Generate the result HTML with the comparison
+            if logger:
+                logger.info("| Generating Result HTML for Image document")
+            session_path = comparator.workspace.path
+            generate_html = HtmlGenerator(comparator)
+            result = generate_html.generate_result_html(
+                session_path,
+                copied_image[0]['file1']['file1_name'],
+                copied_image[1]['file2']['file2_name'],
+                copied_image[0]['file1']['file1_version'], 
+                copied_image[1]['file2']['file2_version'],
+                compare_image_result['file_1'], 
+                compare_image_result['file_2']
+                )
+        else:
+            # No report, the structured diff is the result
+            result = diff["url"]
 
         # Clean up the session workspace
         if logger:
             logger.info("| Cleaning up session workspace")
-        shutil.rmtree(session_path)
+        comparator.workspace.cleanup()
 
         # Return the result URL
         if logger:
             logger.info(f"| Result URL: {result}")    
-        return JSONResponse(content=({"session_id": comparator.session_id, "result": result}))
+        response = {"session_id": comparator.session_id, "result": result, "bytes_copied": comparator.workspace.bytes_copied}
+        if diff is not None:
+            response["diff"] = diff
+        return response
     except Exception as e:
         if logger:
             logger.error(f"| Unexpected error during PDF comparison: {e}")
         raise HTTPException(status_code=500, detail="Unexpected error during Image comparison")
+    finally:
+        # A failed comparison leaves no copied images behind
+        if comparator is not None:
+            comparator.workspace.cleanup()
+
+def estimate_image_cost(file_paths: ImageFileRequest) -> JobCost:
+    # Pixel count of both images, read from the image headers only
+    comparator = ImageDocumentComparator(file_paths, None)
+    pixel_count = 0
+    for image_path in (comparator.file_1_path, comparator.file_2_path):
+        try:
+            with Image.open(image_path) as image:
+                pixel_count += image.width * image.height
+        except OSError:
+            # Missing or unreadable images are reported by the comparison itself
+            continue
+    return CostModel().image_cost(pixel_count)
+
+# FastAPI route for comparing images and generating the comparison URL
+@router.post("/compare_image")
+async def generate_url(file_paths: ImageFileRequest):
+    # Estimate the job up front, then admit it to the shared process pool
+    cost = await run_in_threadpool(estimate_image_cost, file_paths)
+    # Identical requests running at the same time, in any HTTP worker, share one comparison
+    result = await single_flight("compare_image", file_paths, lambda: schedule_comparison("image", compare_image_documents, file_paths, cost=cost, priority=file_paths.priority))
+    return JSONResponse(content=result)
+
+@router.post("/compare_image/upload", openapi_extra=upload_openapi("session_id", "priority", "diff_format", "html"))
+async def generate_url_from_upload(request: Request):
+    # Same comparison on files streamed with the request, ?format=zip returns the result folder as a ZIP
+    return await compare_upload(request, "image", ImageFileRequest, estimate_image_cost, compare_image_documents)
+
+# Pydantic model for version chain request
+class ImageChainRequest(BaseModel):
+    file_paths: List[str]
+    session_id: str
+    priority: int = 0
+
+def chain_pair_request(chain: ImageChainRequest, index: int) -> ImageFileRequest:
+    # Request of the adjacent pair starting at the given version
+    return ImageFileRequest(file1_path=chain.file_paths[index], file2_path=chain.file_paths[index + 1], session_id=chain.session_id, priority=chain.priority)
+
+def read_chain_image(image_path: str):
+    image, _ = read_image(image_path)
+    if image is None:
+        raise HTTPException(status_code=400, detail=f"{image_path} is not a readable image")
+    return image
+
+def compare_image_chain(chain: ImageChainRequest) -> dict:
+    """
+    Compare each adjacent pair of a version chain, inside a pool worker process.
+
+    Every version is decoded once and kept in memory only until the pair
+    that uses it as the older side is done. Each pair gets its own annotated
+    image and result HTML in the report folder. Chains always run copy-free.
+
+    Args:
+        chain (ImageChainRequest): Ordered versions, oldest first
+
+    Returns:
+        dict: The result URL of every pair
+    """
+    logger = get_logger()
+    workspace = SessionWorkspace(IMAGE_WORKSPACE, chain.session_id, logger, copy_free=True)
+    workspace.create()
+    try:
+        results = []
+        previous_image = None
+        for index in range(len(chain.file_paths) - 1):
+            comparator = ImageDocumentComparator(chain_pair_request(chain, index), logger)
+            comparator.workspace = workspace
+            comparator.validate_image_document()
+
+            if previous_image is None:
+                previous_image = read_chain_image(comparator.file_1_path)
+            current_image = read_chain_image(comparator.file_2_path)
+
+            # Shade a copy, the clean image is the older side of the next pair
+            annotated_image = comparator.annotate_differences(previous_image, current_image.copy())
+            image_extention = comparator.file_1.suffix
+            annotated_name = f"{uuid.uuid4()}{image_extention}"
+            _, encoded_image = cv2.imencode(image_extention, annotated_image)
+            workspace.write_bytes(os.path.join(comparator.file_1.report_directory, annotated_name), encoded_image.tobytes())
+            del annotated_image, encoded_image
+
+            result = HtmlGenerator(comparator).generate_result_html(
+                workspace.path,
+                comparator.file_1_name,
+                comparator.file_2_name,
+                comparator.file_1_version,
+                comparator.file_2_version,
+                f"{quote(comparator.file_1_version)}/{quote(comparator.file_1_name)}",
+                annotated_name,
+                html_file_name=f"comparison_{comparator.file_1_version}_{comparator.file_2_version}.html")
+            pair_result = {"file1_path": chain.file_paths[index], "file2_path": chain.file_paths[index + 1], "result": result}
+            if comparator.diff_settings.enabled:
+                # Structured diff of the pair, when [Diff] default_format asks for one
+                pair_result["diff"] = comparator.structured_diff().write(
+                    comparator.diff_settings, comparator.file_1, f"comparison_{comparator.file_1_version}_{comparator.file_2_version}", logger)
+            results.append(pair_result)
+            if logger:
+                logger.info(f"| Chain pair {index + 1} result URL: {result}")
+
+            # Release the older version, only the newer one is needed for the next pair
+            previous_image = current_image
+        return {"session_id": chain.session_id, "results": results, "bytes_copied": workspace.bytes_copied}
+    except HTTPException:
+        raise
+    except Exception as e:
+        if logger:
+            logger.error(f"| Unexpected error during image chain comparison: {e}")
+        raise HTTPException(status_code=500, detail="Unexpected error during image chain comparison")
+    finally:
+        workspace.cleanup()
+
+def estimate_image_chain_cost(chain: ImageChainRequest) -> JobCost:
+    # Two decoded versions and one annotated copy are held at a time
+    pixel_counts = []
+    for file_path in chain.file_paths:
+        try:
+            with Image.open(str(resolve_document_path(unquote(r'' + file_path)).local)) as image:
+                pixel_counts.append(image.width * image.height)
+        except OSError:
+            # Missing or unreadable images are reported by the comparison itself
+            pixel_counts.append(0)
+    largest_pair = max(first + second for first, second in zip(pixel_counts, pixel_counts[1:]))
+    cost = CostModel().image_cost(largest_pair)
+    cost.work_units = sum(pixel_counts)
+    return cost
+
+# FastAPI route for comparing an ordered list of image versions
+@router.post("/compare_image_chain")
+async def generate_chain_url(chain: ImageChainRequest):
+    # Diff every adjacent pair of an ordered version list in one pool job
+    if len(chain.file_paths) < 2:
+        raise HTTPException(status_code=400, detail="A version chain needs at least two documents")
+    cost = await run_in_threadpool(estimate_image_chain_cost, chain)
+    result = await single_flight("compare_image_chain", chain, lambda: schedule_comparison("image", compare_image_chain, chain, cost=cost, priority=chain.priority))
+    return JSONResponse(content=result)
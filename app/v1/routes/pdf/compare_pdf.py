@@ -1,23 +1,105 @@
 # app/v1/routes/pdf/compare_pdf.py
 
+import json
 import os
-import cv2
-import fitz # PyMuPDF
-from fastapi import APIRouter, HTTPException
+import uuid
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from urllib.parse import unquote
-from jinja2 import Template
-import configparser
-import shutil
+from typing import List
+from urllib.parse import quote, unquote
 from fastapi.staticfiles import StaticFiles
-from app.log_mgmt.docom_log_config import DOCCOMLogging
-from PIL import Image
+from starlette.concurrency import run_in_threadpool
+from app.log_mgmt.docom_log_config import DOCCOMLogging, get_logger
+from app.path_mgmt.docom_path import resolve_document_path
+from app.worker_mgmt.docom_scheduler import CostModel, JobCost, schedule_comparison
+from app.worker_mgmt.docom_preload import lazy_import
+from app.workspace_mgmt.docom_workspace import SessionWorkspace, atomic_write
+from app.report_mgmt.docom_report import render_report
+from app.static_mgmt.docom_static import precompress, serve_file
+from app.upload_mgmt.docom_upload import compare_upload, upload_openapi
+from app.input_mgmt.docom_input import open_pdf, read_image
+from app.render_mgmt.docom_render import PreviewSettings, RenderProfile
+from app.region_mgmt.docom_regions import get_region_classifier, underline_boxes
+from app.diff_mgmt.docom_diff import DiffFormat, DiffSettings, StructuredDiff
+from app.flight_mgmt.docom_flight import single_flight
 import time
 
+# Heavy libraries are imported on first use
+cv2 = lazy_import("cv2")
+fitz = lazy_import("fitz") # PyMuPDF
+Image = lazy_import("PIL.Image")
+np = lazy_import("numpy")
+
 # Initialize FastAPI router
 router = APIRouter()
 
+# Underline drawn below each difference, thickness in pixels of a 300 DPI A4 page image
+UNDERLINE_THICKNESS = 4
+UNDERLINE_COLOR = (0, 0, 255)  # Red Color
+UNDERLINE_REFERENCE_WIDTH = 2480
+
+def find_difference_boxes(gray1, gray2):
+    """
+    Find the regions where two grayscale page rasters differ.
+
+    Args:
+        gray1: First page raster
+        gray2: Second page raster, resized to the first if needed
+
+    Returns:
+        numpy.ndarray: (N, 4) x, y, w, h boxes as fractions of the page size, valid at any resolution
+    """
+    if gray1.shape != gray2.shape:
+        gray2 = cv2.resize(np.ascontiguousarray(gray2), (gray1.shape[1], gray1.shape[0]))
+    # Compute absolute difference between the two images
+    diff = cv2.absdiff(gray1, gray2)
+    # Threshold the difference image
+    _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
+    # Keep the regions that are real changes rather than rendering or compression noise
+    regions = get_region_classifier().classify(thresh, gray1, gray2)
+    height, width = gray1.shape[:2]
+    return regions / np.array([width, height, width, height], dtype=np.float64)
+
+def render_page_raster(page, dpi: float, colorspace: str = "rgb"):
+    """
+    Render a PDF page to an array owning its pixels.
+
+    Args:
+        page: PyMuPDF page
+        dpi (float): Rendering resolution
+        colorspace (str): 'rgb' for a BGR image, 'gray' for a single channel one
+
+    Returns:
+        The rendered page
+    """
+    pixmap = page.get_pixmap(matrix=fitz.Matrix(dpi/72, dpi/72), colorspace=fitz.csGRAY if colorspace == "gray" else fitz.csRGB)
+    samples = np.frombuffer(pixmap.samples_mv, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+    if pixmap.n == 1:
+        return samples[:, :, 0].copy()
+    return cv2.cvtColor(samples, cv2.COLOR_RGB2BGR)
+
+def page_manifest_path(document_directory: str, document_name: str) -> str:
+    # Written next to a compared PDF, describes how to render its full resolution pages
+    return os.path.join(document_directory, f"{document_name}.pages.json")
+
+def full_page_path(document_directory: str, page_number: int) -> str:
+    return os.path.join(document_directory, f"page_{page_number}.full.jpg")
+
+def draw_underlines(image, boxes) -> None:
+    """
+    Underline difference boxes on a page image of any resolution, in place.
+
+    Args:
+        image: BGR page image
+        boxes: Boxes from find_difference_boxes, or their list form from a page manifest
+    """
+    height, width = image.shape[:2]
+    thickness = max(1, round(UNDERLINE_THICKNESS * width / UNDERLINE_REFERENCE_WIDTH))
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    # Scale the page fractions to this image, then draw a horizontal line below every box at once
+    underline_boxes(image, np.rint(boxes * [width, height, width, height]), UNDERLINE_COLOR, thickness)
+
 # Set the workspace directory for storing PDF
 PDF_WORKSPACE = os.path.abspath(os.path.join("app", "v1", "static", "pdf"))
 
@@ -26,28 +108,44 @@ class PDFFileRequest(BaseModel):
     file1_path: str
     file2_path: str
     session_id: str
+    priority: int = 0
+    # Structured diff next to the HTML report, and whether the HTML report is rendered at all
+    diff_format: DiffFormat = ""
+    html: bool = True
 
 # Class for PDF document comparison
 class PDFDocumentComparator:
     def __init__(self, file_paths: PDFFileRequest, logger: DOCCOMLogging) -> None:
         # Decode and initialize file paths and session ID
         """First PDF"""
-        self.file_1_path = unquote(r'' + file_paths.file1_path)
-        self.file_1_name = os.path.basename(self.file_1_path)
-        self.file_1_version = self.file_1_path.split('\\')[-2]
+        self.file_1 = resolve_document_path(unquote(r'' + file_paths.file1_path))
+        self.file_1_path = str(self.file_1.local)
+        self.file_1_name = self.file_1.name
+        self.file_1_version = self.file_1.version
 
         """Second PDF"""
-        self.file_2_path = unquote(r'' + file_paths.file2_path)
-        self.file_2_name = os.path.basename(self.file_2_path)
-        self.file_2_version = self.file_2_path.split('\\')[-2]
+        self.file_2 = resolve_document_path(unquote(r'' + file_paths.file2_path))
+        self.file_2_path = str(self.file_2.local)
+        self.file_2_name = self.file_2.name
+        self.file_2_version = self.file_2.version
 
         self.logger = logger
         self.session_id = file_paths.session_id
+        self.workspace = SessionWorkspace(PDF_WORKSPACE, self.session_id, logger)
+        # Content hashes of the PDFs, computed while they are read
+        self.digests = {}
+        # Page rendering resolutions and the diff rasters rendered for each page image
+        self.render_profile = RenderProfile()
+        self.diff_rasters = {}
+        self.preview_settings = PreviewSettings()
+        self.diff_settings = DiffSettings(file_paths.diff_format, file_paths.html)
+        # Difference boxes of every compared page, by page number, and the page counts of both PDFs
+        self.page_differences = {}
+        self.page_counts = (0, 0)
     
     def create_workspace(self):
         # Create workspace directory for the session if it doesn't exist
-        session_folder = os.path.join(PDF_WORKSPACE, self.session_id)
-        os.makedirs(session_folder, exist_ok=True)
+        self.workspace.create()
         if self.logger:
             self.logger.info(f"| Workspace created for session: {self.session_id}")
 
@@ -63,26 +161,36 @@ class PDFDocumentComparator:
                 self.logger.error(f"Error counting pages in PDF {pdf_file}: {e}")
             return 0
         
-    def copy_document_to_session_workspace(self):
+    def max_page_size(self, pdf_file: str) -> tuple:
         try:
-            # Define session and version-specific paths
-            session_path = os.path.join(PDF_WORKSPACE, self.session_id)
-            file_1_workspace = os.path.join(session_path, self.file_1_version)
-            file_2_workspace = os.path.join(session_path, self.file_2_version)
-            
-            # Create directories for PDF versions
-            os.makedirs(file_1_workspace, exist_ok=True)
-            os.makedirs(file_2_workspace, exist_ok=True)
-
-            # Copy PDF files to their respective directories
-            shutil.copy(self.file_1_path, file_1_workspace)
-            shutil.copy(self.file_2_path, file_2_workspace)
-
+            # Largest page width and height in points, A4 if the PDF cannot be read
+            with fitz.open(pdf_file) as pdf_document:
+                sizes = [(page.rect.width, page.rect.height) for page in pdf_document]
+            return max(sizes, key=lambda size: size[0] * size[1], default=(595, 842))
+        except Exception as e:
             if self.logger:
-                self.logger.info("| Copied PDFs to session workspace")
+                self.logger.error(f"Error reading page sizes in PDF {pdf_file}: {e}")
+            return (595, 842)
+
+    def copy_document_to_session_workspace(self):
+        try:
+            # Copy PDF files to their version directories, or read them in place when copy-free
+            file_1_source = self.workspace.stage_source(self.file_1_path, self.file_1_version)
+            file_2_source = self.workspace.stage_source(self.file_2_path, self.file_2_version)
+
+            if self.workspace.copy_free:
+                # First PDF pages are rendered straight to their destination,
+                # second PDF pages to scratch and annotated into their destination
+                file_1_workspace = str(self.file_1.directory)
+                file_2_workspace = self.workspace.scratch_dir(self.file_2_version)
+            else:
+                file_1_workspace = os.path.dirname(file_1_source)
+                file_2_workspace = os.path.dirname(file_2_source)
+                if self.logger:
+                    self.logger.info("| Copied PDFs to session workspace")
 
-            # Short delay to ensure file copy completion
-            time.sleep(0.5)
+                # Short delay to ensure file copy completion
+                time.sleep(0.5)
 
             # Return file properties including path and number of pages
             return {
@@ -90,15 +198,15 @@ class PDFDocumentComparator:
                     "file1_name": self.file_1_name,
                     "file1_version": self.file_1_version,
                     "file1_session_path": f"{file_1_workspace}",
-                    "file1_path": f"{file_1_workspace}\\{self.file_1_name}",
-                    "number_of_pages": self.count_pdf_pages(f"{file_1_workspace}\\{self.file_1_name}")
+                    "file1_path": file_1_source,
+                    "number_of_pages": self.count_pdf_pages(file_1_source)
                 },
                 "file_2_property": {
                     "file2_name": self.file_2_name,
                     "file2_version": self.file_2_version,
                     "file2_session_path": f"{file_2_workspace}",
-                    "file2_path": f"{file_2_workspace}\\{self.file_2_name}",
-                    "number_of_pages": self.count_pdf_pages(f"{file_2_workspace}\\{self.file_2_name}")
+                    "file2_path": file_2_source,
+                    "number_of_pages": self.count_pdf_pages(file_2_source)
                 }
             }
         except Exception as e:
@@ -109,33 +217,83 @@ class PDFDocumentComparator:
     def split_convert_pdf_to_jpg(self, pdf_file_path: str, output_path: str ):
         try:
             converted_image_path_list = []
-            # Open the provided PDF file
-            pdf_document = fitz.open(pdf_file_path)
-            # Iterate over each page in the PDF
-            for page_number in range(len(pdf_document)):
-                # Get the page
-                page = pdf_document[page_number]
-
-                # Render the page as an image
-                image = page.get_pixmap(matrix=fitz.Matrix(300/72, 300/72))
-
-                # Convert the image to RGB (Pillow expects RGB images)
-                img = Image.frombytes("RGB", [image.width, image.height], image.samples)
-
-                # Save the image
-                image_path = f"{output_path}\\page_{page_number + 1}.jpg"
-                img.save(image_path,dpi=(300,300))
-                converted_image_path_list.append(image_path)
-                time.sleep(0.5)
-            # Close the PDF file
-            pdf_document.close()
+            # Open the provided PDF file from a memory-mapped buffer, hashing it in the same pass
+            with open_pdf(pdf_file_path) as pdf_input:
+                pdf_document = pdf_input.document
+                self.digests[pdf_file_path] = pdf_input.digest
+                if self.logger:
+                    self.logger.info(f"| Opened {pdf_file_path} (digest {pdf_input.digest})")
+                if self.render_profile.separate_diff:
+                    raster_directory = self.workspace.scratch_dir("diff", uuid.uuid4().hex)
+                # Iterate over each page in the PDF
+                for page_number in range(len(pdf_document)):
+                    # Get the page
+                    page = pdf_document[page_number]
+
+                    # Render the page as an image at the display resolution
+                    display_dpi = self.render_profile.display_page_dpi(page.rect.width, page.rect.height)
+                    image = page.get_pixmap(matrix=fitz.Matrix(display_dpi/72, display_dpi/72))
+
+                    # Convert the image to RGB (Pillow expects RGB images)
+                    img = Image.frombytes("RGB", [image.width, image.height], image.samples)
+                    del image
+
+                    # Save the image, renamed into place once complete
+                    image_path = os.path.join(output_path, f"page_{page_number + 1}.jpg")
+                    with self.workspace.atomic_write(image_path) as image_file:
+                        img.save(image_file, format="JPEG", dpi=(round(display_dpi), round(display_dpi)))
+                    del img
+
+                    if self.render_profile.separate_diff:
+                        # Diff raster straight from the page, at the diff resolution and colorspace
+                        self.diff_rasters[image_path] = self.render_diff_raster(page, image_path, raster_directory)
+                    converted_image_path_list.append(image_path)
+                    if not self.workspace.copy_free:
+                        time.sleep(0.5)
             return converted_image_path_list
         except Exception as e:
             if self.logger:
                 self.logger.error(f"| Spliting and converting PDF: {e}")
             raise HTTPException(status_code=400, detail="Error converting PDFs to images")
 
-    def compare_pdf_image(self, file1: list, file2: list):
+    def render_diff_raster(self, page, image_path: str, raster_directory: str) -> str:
+        """
+        Render the raster the pixel diff runs on and keep it in session scratch.
+
+        Args:
+            page: PyMuPDF page
+            image_path (str): Display image of the page, names the raster
+            raster_directory (str): Scratch directory of the document's rasters
+
+        Returns:
+            str: Path of the raster, a .npy file memory-mapped when diffed
+        """
+        diff_dpi = self.render_profile.diff_page_dpi(page.rect.width, page.rect.height)
+        raster = render_page_raster(page, diff_dpi, self.render_profile.diff_colorspace)
+        raster_path = os.path.join(raster_directory, os.path.basename(image_path) + ".npy")
+        np.save(raster_path, raster)
+        del raster
+        return raster_path
+
+    def release_diff_rasters(self, image_paths: list) -> None:
+        # Delete the diff rasters of pages that will not be compared again
+        for image_path in image_paths:
+            raster_path = self.diff_rasters.pop(image_path, None)
+            if raster_path and os.path.exists(raster_path):
+                os.remove(raster_path)
+
+    def diff_gray(self, image_path: str, image=None):
+        # Grayscale diff input of a page, its diff raster when one was rendered
+        raster_path = self.diff_rasters.get(image_path)
+        if raster_path:
+            raster = np.load(raster_path, mmap_mode="r")
+            return raster if raster.ndim == 2 else cv2.cvtColor(np.ascontiguousarray(raster), cv2.COLOR_BGR2GRAY)
+        if image is not None:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray, _ = read_image(image_path, cv2.IMREAD_GRAYSCALE)
+        return gray
+
+    def compare_pdf_image(self, file1: list, file2: list, output_path: str = None):
         try:
             if self.logger:
                 self.logger.info(f"| Comparing pdf images")
@@ -147,31 +305,23 @@ class PDFDocumentComparator:
                 if file1_filename in file2_filenames:
                     file1_index = file1_filenames.index(file1_filename)
                     file2_index = file2_filenames.index(file1_filename)
-                    """Read Image"""
-                    image1 = cv2.imread(file1[file1_index])
-                    image2 = cv2.imread(file2[file2_index])
-
-                    """Convert images to grayscale"""
-                    gray1 = cv2.cvtColor(image1, cv2.COLOR_BGR2GRAY)
-                    gray2 = cv2.cvtColor(image2, cv2.COLOR_BGR2GRAY)
-                    """Compute absolute difference between the two images"""
-                    diff = cv2.absdiff(gray1, gray2)
-                    """Threshold the difference image"""
-                    _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
-                    """Find contours of differences"""
-                    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                    """Create underlines (draw horizontal lines) on image2"""
-                    underline_thickness = 4  # Thickness of underline
-                    underline_color = (0, 0, 255)  # Red Color
-                    for contour in contours:
-                        x, y, w, h = cv2.boundingRect(contour)
-                        # Draw a horizontal line (underline) below the contour
-                        underline_y = y + h + underline_thickness  # Position the underline just below the contour
-                        cv2.line(image2, (x, underline_y), (x + w, underline_y), underline_color,
-                                 underline_thickness)
+                    """Read Image, only the second one is annotated and needs colour"""
+                    image2, _ = read_image(file2[file2_index])
+
+                    """Grayscale diff inputs, the diff rasters when rendered separately"""
+                    gray1 = self.diff_gray(file1[file1_index])
+                    gray2 = self.diff_gray(file2[file2_index], image2)
+                    """Find the differing regions and underline them on image2"""
+                    boxes = find_difference_boxes(gray1, gray2)
+                    self.page_differences[file1_index + 1] = boxes
+                    draw_underlines(image2, boxes)
                     
-                    cv2.imwrite(file2[file2_index], image2)
-                    time.sleep(0.5)
+                    # Write the annotated page over the rendered one, or into output_path when given
+                    annotated_path = os.path.join(output_path, file1_filename) if output_path else file2[file2_index]
+                    _, encoded_image = cv2.imencode(".jpg", image2)
+                    self.workspace.write_bytes(annotated_path, encoded_image.tobytes())
+                    if not self.workspace.copy_free:
+                        time.sleep(0.5)
                 else:
                     if self.logger:
                         self.logger.error(f"| {file1_filename} not found in {file2_filenames}")
@@ -181,208 +331,197 @@ class PDFDocumentComparator:
                 self.logger.error(f"| Error comparing PDF: {e}")
             raise HTTPException(status_code=500, detail="Error comparing PDF")
 
+    def diff_page_pair(self, page_pair: list):
+        # Diff rasters at the diff resolution, grayscale unless configured otherwise
+        rasters = []
+        for page in page_pair:
+            raster = render_page_raster(page, self.render_profile.diff_page_dpi(page.rect.width, page.rect.height), self.render_profile.diff_colorspace)
+            rasters.append(raster if raster.ndim == 2 else cv2.cvtColor(raster, cv2.COLOR_BGR2GRAY))
+        return find_difference_boxes(*rasters)
+
+    def diff_pages(self, file_1_source: str, file_2_source: str) -> None:
+        """
+        Diff the PDFs page by page without rendering any report image.
+
+        Used when the HTML report is skipped, the differences are only kept
+        for the structured diff.
+
+        Args:
+            file_1_source (str): First PDF to read
+            file_2_source (str): Second PDF to read
+        """
+        try:
+            with open_pdf(file_1_source) as pdf_1, open_pdf(file_2_source) as pdf_2:
+                self.digests[file_1_source] = pdf_1.digest
+                self.digests[file_2_source] = pdf_2.digest
+                pages = [pdf_1.document, pdf_2.document]
+                self.page_counts = (len(pages[0]), len(pages[1]))
+                for page_number in range(min(self.page_counts)):
+                    self.page_differences[page_number + 1] = self.diff_page_pair([pages[0][page_number], pages[1][page_number]])
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"| Diffing PDF pages: {e}")
+            raise HTTPException(status_code=500, detail="Error comparing PDF")
+
+    def structured_diff(self) -> StructuredDiff:
+        # Regions of every compared page, as fractions of the page size
+        pages, regions = [], []
+        for page_number, boxes in sorted(self.page_differences.items()):
+            pages.extend([page_number] * len(boxes))
+            regions.append(np.asarray(boxes, dtype=np.float64).reshape(-1, 4))
+        regions = np.round(np.concatenate(regions), 6) if regions else np.empty((0, 4))
+        changes = {
+            "page": pages,
+            "x": regions[:, 0].tolist(),
+            "y": regions[:, 1].tolist(),
+            "width": regions[:, 2].tolist(),
+            "height": regions[:, 3].tolist(),
+        }
+        pages_1, pages_2 = self.page_counts
+        summary = {
+            "pdf_1": self.file_1_name,
+            "pdf_2": self.file_2_name,
+            "pages_1": pages_1,
+            "pages_2": pages_2,
+            "compared_pages": len(self.page_differences),
+            "changed_pages": sorted(page_number for page_number, boxes in self.page_differences.items() if len(boxes)),
+            "regions": len(pages),
+            "added_pages": max(0, pages_2 - pages_1),
+            "removed_pages": max(0, pages_1 - pages_2),
+        }
+        return StructuredDiff("pdf", summary, changes)
+
+    def generate_page_previews(self, file_1_source: str, file_2_source: str) -> dict:
+        """
+        Diff the PDFs page by page and render only the preview tier of the report.
+
+        Each page pair is diffed on rasters at the diff resolution, then small
+        previews are written to the version folders, the second PDF's with the
+        differences underlined. The differences are kept in a manifest next to
+        each PDF so render_full_page can draw them on a full resolution page
+        when the report first asks for it. Only one page pair is in memory at a time.
+
+        Args:
+            file_1_source (str): First PDF to read
+            file_2_source (str): Second PDF to read
+
+        Returns:
+            dict: Preview paths relative to the report folder and full resolution URLs of both PDFs
+        """
+        settings = self.preview_settings
+        extension = f".{settings.preview_format}"
+        quality_flag = cv2.IMWRITE_WEBP_QUALITY if settings.preview_format == "webp" else cv2.IMWRITE_JPEG_QUALITY
+        documents = [
+            {"key": "file_1", "source": file_1_source, "path": self.file_1, "annotations": {}},
+            {"key": "file_2", "source": file_2_source, "path": self.file_2, "annotations": {}},
+        ]
+        previews = {}
+        try:
+            with open_pdf(file_1_source) as pdf_1, open_pdf(file_2_source) as pdf_2:
+                self.digests[file_1_source] = pdf_1.digest
+                self.digests[file_2_source] = pdf_2.digest
+                pages = [pdf_1.document, pdf_2.document]
+                for document, pdf_document in zip(documents, pages):
+                    document["pages"] = len(pdf_document)
+                    previews[document["key"]] = []
+                    previews[f"{document['key']}_full"] = []
+
+                self.page_counts = (len(pages[0]), len(pages[1]))
+                for page_number in range(max(len(pages[0]), len(pages[1]))):
+                    page_pair = [pdf_document[page_number] if page_number < len(pdf_document) else None for pdf_document in pages]
+                    boxes = []
+                    if None not in page_pair:
+                        boxes = self.diff_page_pair(page_pair)
+                        self.page_differences[page_number + 1] = boxes
+                        documents[1]["annotations"][str(page_number + 1)] = boxes.tolist()
+
+                    for document, page in zip(documents, page_pair):
+                        if page is None:
+                            continue
+                        preview = render_page_raster(page, settings.preview_dpi)
+                        if document["key"] == "file_2":
+                            draw_underlines(preview, boxes)
+                        _, encoded_image = cv2.imencode(extension, preview, [quality_flag, settings.preview_quality])
+                        preview_name = f"page_{page_number + 1}{extension}"
+                        self.workspace.write_bytes(os.path.join(document["path"].directory, preview_name), encoded_image.tobytes())
+                        previews[document["key"]].append(f"{document['path'].version}/{preview_name}")
+                        previews[f"{document['key']}_full"].append(
+                            f"{settings.full_resolution_url}?file_path={quote(document['path'].source)}&page={page_number + 1}")
+
+            for document in documents:
+                directory = str(document["path"].directory)
+                manifest = {
+                    # The request's source, staged copies are gone by the time full pages are requested
+                    "source": str(document["path"].local),
+                    "pages": document["pages"],
+                    "annotations": document["annotations"],
+                }
+                self.workspace.write_text(page_manifest_path(directory, document["path"].name), json.dumps(manifest))
+                # Full resolution pages of an earlier comparison no longer match the previews
+                for page_number in range(1, document["pages"] + 1):
+                    if os.path.exists(full_page_path(directory, page_number)):
+                        os.remove(full_page_path(directory, page_number))
+            return previews
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"| Rendering page previews: {e}")
+            raise HTTPException(status_code=500, detail="Error rendering PDF page previews")
+
 class HtmlGenerator:
     def __init__(self, comparator_instance) -> None:
         self.comparator_instance = comparator_instance
 
-    def generate_result_html(self, session_path, file1, file2, file_1_version, file_2_version, pdf1_image_list, pdf2_image_list):
-        html_template_str = '''<!DOCTYPE html>
-        <html>
-            <head>
-                <title></title>
-                <!-- Bootstrap CSS -->
-                <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.0.2/dist/css/bootstrap.min.css" rel="stylesheet"
-        integrity="sha384-EVSTQN3/azprG1Anm3QDgpJLIm9Nao0Yz1ztcQTwFspd3yD65VohhpuuCOmLASjC" crossorigin="anonymous">
-                <script src="https://ajax.googleapis.com/ajax/libs/jquery/3.7.1/jquery.min.js"></script>
-                <style>
-                    body,.badge {
-                        font-size: 0.81rem
-                    }
-
-                    .table-responsive {
-                        overflow-x: unset;
-                    }
-
-                    .table-responsive table {
-                        width: 100%;
-                    }
-
-                    .table-container {
-                        display: flex;
-                    }
-
-                    .table-container .table-responsive {
-                        flex: 0 0 auto;
-                        margin-right: 10px;
-                    }
-
-                    .square-badge {
-                        border-radius: 0;
-                    }
-
-                    .divScrollDiv {
-                        display: inline-block;
-                        width: 100%;
-                        border: 1px solid black;
-                        height: 98vh;
-                        overflow: auto;
-                    }
-
-                    .tableNoScroll {
-                        overflow: hidden;
-                    }
-
-                    .excelFileName {
-                        max-width: 20%;
-                        white-space: nowrap;
-                        overflow: hidden !important;
-                        text-overflow: ellipsis;
-                        text-align: left;
-                    }
-
-                    .badge {
-                        padding: .35em .65em !important
-                    }
-
-                    .tooltip-inner {
-                        max-width: 100%;
-                    }
-
-                    .card-header {
-                        padding: 0.3rem 0.5rem !important;
-                        font-weight: 500;
-                    }
-
-                    .card-body {
-                        padding: 0.5rem 0.5rem !important;
-                    }
-
-                    .headerFileNameCompare {
-                        max-width: 80%;
-                        white-space: nowrap;
-                        overflow: hidden !important;
-                        text-overflow: ellipsis;
-                    }
-                </style>
-                <script>
-                    $(document).ready(function () {
-                        var target_sec = $("#divFixed");
-                        $("#divLista").scroll(function () {
-                            target_sec.prop("scrollTop", this.scrollTop)
-                            .prop("scrollLeft", this.scrollLeft);
-                        });
-
-                    var target_first = $("#divLista");
-
-                    $("#divFixed").scroll(function () {
-                        target_first.prop("scrollTop", this.scrollTop)
-                        .prop("scrollLeft", this.scrollLeft);
-                    });
-                    });
-                </script>
-            </head>
-            <body>
-                <div class="col-lg mx-auto p-1 py-md-1">
-                    <div class="container-fluid">
-                       <div class="row">
-                            <div class="col divScrollDiv border" id="divFixed">
-                                <div class="card mt-1">
-                                    <div class="card-header d-flex flex-row">
-                                        <span class="badge bg-success square-badge excelFileName me-1">{{file_1_version}}</span>
-                                        <span class="headerFileNameCompare me-1" title="{{file1}}">{{file1}}</span>
-                                    </div>
-                                    {% for i in pdf1_image_list %}
-                                        <div class="card-body shadow mb-3">
-                                            <div class="table-container">
-                                                <div class="table table-responsive">
-                                                    <!-- Load Images -->
-                                                    <img src={{i}} class="img-fluid" alt="{{file1}}" style="height: 100%; width:100%; background-size: cover;">
-                                                </div>
-                                            </div>
-                                        </div>
-                                    {% endfor %}
-                                </div>
-                            </div>
-                            <div class="col divScrollDiv border" id="divLista">
-                                <div class="card mt-1">
-                                    <div class="card-header d-flex flex-row">
-                                        <span class="badge bg-success square-badge excelFileName me-1">{{file_2_version}}</span>
-                                        <span class="headerFileNameCompare me-1" title="{{file2}}">{{file2}}</span>
-                                    </div>
-                                </div>
-                                {% for i in pdf2_image_list %}
-                                    <div class="card-body shadow mb-3">
-                                        <div class="table-container">
-                                            <div class="table table-responsive">
-                                                <!--Load Images-->
-                                                <img src={{i}} class="img-fluid" alt="{{file2}}" style="height: 100%; width:100%; background-size: cover;">
-                                            </div>
-                                        </div>
-                                    </div>
-                                {% endfor %}
-                            </div>
-                       </div> 
-                    </div>
-                </div>
-                <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.0.2/dist/js/bootstrap.bundle.min.js"
-        integrity="sha384-MrcW6ZMFYlzcLA8Nl+NtUVF0sA7MsXsP1UyJoMp4YLEuNSfAP+JcXn/tWtIaxVXM"
-        crossorigin="anonymous"></script>
-            </body>
-        </html>'''
-
+    def generate_result_html(self, session_path, file1, file2, file_1_version, file_2_version, pdf1_image_list, pdf2_image_list, html_file_name="comparison_result.html", pdf1_full_list=None, pdf2_full_list=None):
         try:
             # Render the HTML template with the provided data
-            template = Template(html_template_str)
-            render_html = template.render(
+            render_html = render_report(
+                "pdf.html",
                 file1 = file1,
                 file2 = file2,
                 file_1_version = file_1_version,
                 file_2_version = file_2_version,
                 pdf1_image_list = pdf1_image_list,
-                pdf2_image_list = pdf2_image_list
+                pdf2_image_list = pdf2_image_list,
+                pdf1_full_list = pdf1_full_list,
+                pdf2_full_list = pdf2_full_list
             )
 
+            workspace = self.comparator_instance.workspace
+            if workspace.copy_free:
+                # Write the HTML file straight to the CVWeb destination path
+                workspace.write_text(os.path.join(self.comparator_instance.file_1.report_directory, html_file_name), render_html)
+                precompress(os.path.join(self.comparator_instance.file_1.report_directory, html_file_name), logger=self.comparator_instance.logger)
+                return self.comparator_instance.file_1.cvweb_url(html_file_name)
+
             # Save the rendered HTML to a file
-            html_file_path = f"{session_path}/comparison_result.html"
+            html_file_path = os.path.join(session_path, html_file_name)
             if os.path.exists(html_file_path):
                 os.remove(html_file_path)
-                with open(f"{session_path}/comparison_result.html", "w") as html_file:
+                with open(html_file_path, "w") as html_file:
                     html_file.write(render_html)
             else:
-                with open(f"{session_path}/comparison_result.html", "w") as html_file:
+                with open(html_file_path, "w") as html_file:
                     html_file.write(render_html)
 
             # Pause to ensure file operations are complete
             time.sleep(5)
 
             # Copy the HTML file to the CVWeb destination path
-            destination_path_list = self.comparator_instance.file_1_path.split('\\')
-            destination_path_List = self.comparator_instance.file_1_path.split('\\')[:-2]
-            destination_path = '\\'.join(destination_path_List)
-            shutil.copy(html_file_path, destination_path)
-            cvweb_index = destination_path_list.index('CVWeb')
-            cvweb_string = '//'.join(destination_path_list[cvweb_index:-2])
-            return cvweb_string+"//comparison_result.html"
+            workspace.copy(html_file_path, self.comparator_instance.file_1.report_directory)
+            # Brotli and gzip variants next to the report, served by the static file layer
+            precompress(os.path.join(self.comparator_instance.file_1.report_directory, html_file_name), logger=self.comparator_instance.logger)
+            return self.comparator_instance.file_1.cvweb_url(html_file_name)
         except Exception as e:
             if self.comparator_instance.logger:
                 self.comparator_instance.logger.error(f"| Generating result HTML failed: {e}")
             raise HTTPException(status_code=500, detail="Error generating result HTML")
             
-@router.post("/compare_pdf")
-def generate_url(file_paths: PDFFileRequest):
+def compare_pdf_documents(file_paths: PDFFileRequest) -> dict:
+    # Runs the full PDF comparison pipeline inside a pool worker process
+    comparator_instance = None
     try:
-        # Read configuration from the configuration file
-        config = configparser.ConfigParser(allow_no_value=True)
-        configuration_file_path = os.path.abspath(os.path.join("config","configuration.ini"))
-        config.read(rf"{configuration_file_path}")
-        logging_enabled = config.get('Logging', 'logging_enabled')
-    
-        # Configure the logger if logging is enabled
-        if logging_enabled == "on":
-            logger = DOCCOMLogging().configure_logger()
-        else:
-            # Set logger to None if logging is disabled
-            logger = None
+        # Logger configured once per process, shared by every request it runs
+        logger = get_logger()
 
         if logger:
             logger.info("| Received request for pdf document comparison")
@@ -399,51 +538,283 @@ def generate_url(file_paths: PDFFileRequest):
             logger.info("| Copying pdf to session workspace")
         copied_pdf_info = comparator_instance.copy_document_to_session_workspace()
     
-        # Convert PDFs to Images
-        if logger:
-            logger.info(f"| Spliting and converting PDF to JPG")
-        split_pdf_1 = comparator_instance.split_convert_pdf_to_jpg(copied_pdf_info['file_1_property']['file1_path'], copied_pdf_info['file_1_property']['file1_session_path'])
-        split_pdf_2 = comparator_instance.split_convert_pdf_to_jpg(copied_pdf_info['file_2_property']['file2_path'], copied_pdf_info['file_2_property']['file2_session_path'])
-
-        # Compare images and highlight differences
-        comparator_instance.compare_pdf_image(split_pdf_1, split_pdf_2)
-    
-        # Generate HTML to display comparison results
-        if logger:
-            logger.info("| Generating Result HTML for PDF document")
-        session_path = os.path.join(PDF_WORKSPACE, comparator_instance.session_id)
-        pdf1_image_list = [f"{copied_pdf_info['file_1_property']['file1_version']}\\page_{i}.jpg" for i in range(1, copied_pdf_info['file_1_property']['number_of_pages'] + 1)]
-        pdf2_image_list = [f"{copied_pdf_info['file_2_property']['file2_version']}\\page_{i}.jpg" for i in range(1, copied_pdf_info['file_2_property']['number_of_pages'] + 1)]
-        generate_html = HtmlGenerator(comparator_instance)
+        tiered = comparator_instance.preview_settings.tiered
+        html = comparator_instance.diff_settings.html
+        if not html:
+            # No report, diff the pages at the diff resolution without rendering report images
+            if logger:
+                logger.info("| Diffing PDF pages for the structured diff")
+            comparator_instance.diff_pages(copied_pdf_info['file_1_property']['file1_path'], copied_pdf_info['file_2_property']['file2_path'])
+        elif tiered:
+            # Diff the PDFs and render the preview tier only, full resolution pages are rendered on first request
+            if logger:
+                logger.info("| Diffing PDFs and rendering page previews")
+            previews = comparator_instance.generate_page_previews(copied_pdf_info['file_1_property']['file1_path'], copied_pdf_info['file_2_property']['file2_path'])
+            pdf1_image_list, pdf2_image_list = previews["file_1"], previews["file_2"]
+            pdf1_full_list, pdf2_full_list = previews["file_1_full"], previews["file_2_full"]
+        else:
+            # Convert PDFs to Images
+            if logger:
+                logger.info(f"| Spliting and converting PDF to JPG")
+            split_pdf_1 = comparator_instance.split_convert_pdf_to_jpg(copied_pdf_info['file_1_property']['file1_path'], copied_pdf_info['file_1_property']['file1_session_path'])
+            split_pdf_2 = comparator_instance.split_convert_pdf_to_jpg(copied_pdf_info['file_2_property']['file2_path'], copied_pdf_info['file_2_property']['file2_session_path'])
+
+            # Compare images and highlight differences
+            annotated_path = str(comparator_instance.file_2.directory) if comparator_instance.workspace.copy_free else None
+            comparator_instance.compare_pdf_image(split_pdf_1, split_pdf_2, annotated_path)
+
+            pdf1_image_list = [f"{copied_pdf_info['file_1_property']['file1_version']}/page_{i}.jpg" for i in range(1, copied_pdf_info['file_1_property']['number_of_pages'] + 1)]
+            pdf2_image_list = [f"{copied_pdf_info['file_2_property']['file2_version']}/page_{i}.jpg" for i in range(1, copied_pdf_info['file_2_property']['number_of_pages'] + 1)]
+            pdf1_full_list = pdf2_full_list = None
+            comparator_instance.page_counts = (copied_pdf_info['file_1_property']['number_of_pages'], copied_pdf_info['file_2_property']['number_of_pages'])
+
+        diff = None
+        if comparator_instance.diff_settings.enabled:
+            # Write the structured diff next to the report
+            if logger:
+                logger.info("| Writing structured diff for PDF document")
+            diff = comparator_instance.structured_diff().write(comparator_instance.diff_settings, comparator_instance.file_1, "comparison_result", logger)
     
-        result = generate_html.generate_result_html(
-            session_path,
-            copied_pdf_info["file_1_property"]["file1_name"], 
-            copied_pdf_info["file_2_property"]["file2_name"],
-            copied_pdf_info["file_1_property"]["file1_version"], 
-            copied_pdf_info["file_2_property"]["file2_version"],
-            pdf1_image_list, pdf2_image_list )
-
-        # Copy the images to user session workspace
-        file1_path = "\\".join(comparator_instance.file_1_path.split('\\')[:-1])+"\\"
-        for i in range(1, copied_pdf_info['file_1_property']['number_of_pages'] + 1):
-            shutil.copy(f"{session_path}\\{copied_pdf_info['file_1_property']['file1_version']}\\page_{i}.jpg", file1_path)
-            time.sleep(0.5)
-        file2_path = "\\".join(comparator_instance.file_2_path.split('\\')[:-1])+"\\"
-        for i in range(1, copied_pdf_info['file_2_property']['number_of_pages'] + 1):
-            shutil.copy(f"{session_path}\\{copied_pdf_info['file_2_property']['file2_version']}\\page_{i}.jpg", file2_path)
-            time.sleep(0.5)
+        if html:
+            # Generate HTML to display comparison results
+            if logger:
+                logger.info("| Generating Result HTML for PDF document")
+            session_path = comparator_instance.workspace.path
+            generate_html = HtmlGenerator(comparator_instance)
+        
+            result = generate_html.generate_result_html(
+                session_path,
+                copied_pdf_info["file_1_property"]["file1_name"], 
+                copied_pdf_info["file_2_property"]["file2_name"],
+                copied_pdf_info["file_1_property"]["file1_version"], 
+                copied_pdf_info["file_2_property"]["file2_version"],
+                pdf1_image_list, pdf2_image_list,
+                pdf1_full_list=pdf1_full_list, pdf2_full_list=pdf2_full_list)
+        else:
+            # No report, the structured diff is the result
+            result = diff["url"]
+
+        # Copy the images to user session workspace, copy-free and tiered runs already wrote them there
+        if html and not comparator_instance.workspace.copy_free and not tiered:
+            file1_path = comparator_instance.file_1.directory
+            for i in range(1, copied_pdf_info['file_1_property']['number_of_pages'] + 1):
+                comparator_instance.workspace.copy(os.path.join(copied_pdf_info['file_1_property']['file1_session_path'], f"page_{i}.jpg"), file1_path)
+                time.sleep(0.5)
+            file2_path = comparator_instance.file_2.directory
+            for i in range(1, copied_pdf_info['file_2_property']['number_of_pages'] + 1):
+                comparator_instance.workspace.copy(os.path.join(copied_pdf_info['file_2_property']['file2_session_path'], f"page_{i}.jpg"), file2_path)
+                time.sleep(0.5)
 
         # Clean up the session workspace
         if logger:
             logger.info("| Cleaning up session workspace")
-        shutil.rmtree(session_path)
+        comparator_instance.workspace.cleanup()
 
         # Return the result URL
         if logger:
             logger.info(f"| Result URL: {result}")
-        return JSONResponse(content={"session_id": comparator_instance.session_id, "result": result})
+        response = {"session_id": comparator_instance.session_id, "result": result, "bytes_copied": comparator_instance.workspace.bytes_copied}
+        if diff is not None:
+            response["diff"] = diff
+        return response
     except Exception as e:
         if logger:
             logger.error(f"| Unexpected error during PDF comparison: {e}")
-        raise HTTPException(status_code=500, detail="Unexpected error during PDF comparison")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Unexpected error during PDF comparison")
+    finally:
+        # A failed comparison leaves no copied sources or page images behind
+        if comparator_instance is not None:
+            comparator_instance.workspace.cleanup()
+
+def estimate_pdf_cost(file_paths: PDFFileRequest) -> JobCost:
+    # Rendering cost follows page count and page size at the rendering DPI
+    comparator_instance = PDFDocumentComparator(file_paths, None)
+    page_count = 0
+    page_sizes = []
+    for pdf_file in (comparator_instance.file_1_path, comparator_instance.file_2_path):
+        page_count += comparator_instance.count_pdf_pages(pdf_file)
+        page_sizes.append(comparator_instance.max_page_size(pdf_file))
+    largest_page = max(page_sizes, key=lambda size: size[0] * size[1])
+    return CostModel().pdf_cost(page_count, largest_page)
+
+@router.post("/compare_pdf")
+async def generate_url(file_paths: PDFFileRequest):
+    # Estimate the job up front, then admit it to the shared process pool
+    cost = await run_in_threadpool(estimate_pdf_cost, file_paths)
+    # Identical requests running at the same time, in any HTTP worker, share one comparison
+    result = await single_flight("compare_pdf", file_paths, lambda: schedule_comparison("pdf", compare_pdf_documents, file_paths, cost=cost, priority=file_paths.priority))
+    return JSONResponse(content=result)
+
+@router.post("/compare_pdf/upload", openapi_extra=upload_openapi("session_id", "priority", "diff_format", "html"))
+async def generate_url_from_upload(request: Request):
+    # Same comparison on files streamed with the request, ?format=zip returns the result folder as a ZIP
+    return await compare_upload(request, "pdf", PDFFileRequest, estimate_pdf_cost, compare_pdf_documents)
+
+# Pydantic model for version chain request
+class PDFChainRequest(BaseModel):
+    file_paths: List[str]
+    session_id: str
+    priority: int = 0
+
+def chain_pair_request(chain: PDFChainRequest, index: int) -> PDFFileRequest:
+    # Request of the adjacent pair starting at the given version
+    return PDFFileRequest(file1_path=chain.file_paths[index], file2_path=chain.file_paths[index + 1], session_id=chain.session_id, priority=chain.priority)
+
+def compare_pdf_chain(chain: PDFChainRequest) -> dict:
+    """
+    Compare each adjacent pair of a version chain, inside a pool worker process.
+
+    Every version is rendered once, into its own version folder, and its
+    pages serve as the right side of one pair and the left side of the next.
+    The annotated pages of a pair go to a diff_<previous version> sub folder
+    of the newer version and each pair gets its own result HTML. Chains
+    always run copy-free.
+
+    Args:
+        chain (PDFChainRequest): Ordered versions, oldest first
+
+    Returns:
+        dict: The result URL of every pair
+    """
+    logger = get_logger()
+    workspace = SessionWorkspace(PDF_WORKSPACE, chain.session_id, logger, copy_free=True)
+    workspace.create()
+    try:
+        results = []
+        previous_pages = None
+        # Diff rasters of the versions still to be compared, shared across the pairs
+        diff_rasters = {}
+        for index in range(len(chain.file_paths) - 1):
+            comparator_instance = PDFDocumentComparator(chain_pair_request(chain, index), logger)
+            comparator_instance.workspace = workspace
+            comparator_instance.diff_rasters = diff_rasters
+            if comparator_instance.file_1.directory == comparator_instance.file_2.directory:
+                raise HTTPException(status_code=400, detail=f"{comparator_instance.file_1_path} and {comparator_instance.file_2_path} share a version folder")
+
+            if previous_pages is None:
+                previous_pages = comparator_instance.split_convert_pdf_to_jpg(comparator_instance.file_1_path, str(comparator_instance.file_1.directory))
+            current_pages = comparator_instance.split_convert_pdf_to_jpg(comparator_instance.file_2_path, str(comparator_instance.file_2.directory))
+
+            # Annotate into a sub folder, the clean renders are the left side of the next pair
+            diff_folder = f"diff_{comparator_instance.file_1_version}"
+            annotated_path = os.path.join(comparator_instance.file_2.directory, diff_folder)
+            os.makedirs(annotated_path, exist_ok=True)
+            comparator_instance.compare_pdf_image(previous_pages, current_pages, annotated_path)
+
+            previous_names = {os.path.basename(page) for page in previous_pages}
+            pdf1_image_list = [f"{comparator_instance.file_1_version}/{os.path.basename(page)}" for page in previous_pages]
+            pdf2_image_list = [
+                f"{comparator_instance.file_2_version}/{diff_folder}/{name}" if name in previous_names else f"{comparator_instance.file_2_version}/{name}"
+                for name in (os.path.basename(page) for page in current_pages)
+            ]
+            result = HtmlGenerator(comparator_instance).generate_result_html(
+                workspace.path,
+                comparator_instance.file_1_name,
+                comparator_instance.file_2_name,
+                comparator_instance.file_1_version,
+                comparator_instance.file_2_version,
+                pdf1_image_list, pdf2_image_list,
+                html_file_name=f"comparison_{comparator_instance.file_1_version}_{comparator_instance.file_2_version}.html")
+            pair_result = {"file1_path": chain.file_paths[index], "file2_path": chain.file_paths[index + 1], "result": result}
+            if comparator_instance.diff_settings.enabled:
+                # Structured diff of the pair, when [Diff] default_format asks for one
+                comparator_instance.page_counts = (len(previous_pages), len(current_pages))
+                pair_result["diff"] = comparator_instance.structured_diff().write(
+                    comparator_instance.diff_settings, comparator_instance.file_1,
+                    f"comparison_{comparator_instance.file_1_version}_{comparator_instance.file_2_version}", logger)
+            results.append(pair_result)
+            if logger:
+                logger.info(f"| Chain pair {index + 1} result URL: {result}")
+
+            # Only the newer version is needed for the next pair
+            comparator_instance.release_diff_rasters(previous_pages)
+            previous_pages = current_pages
+        return {"session_id": chain.session_id, "results": results, "bytes_copied": workspace.bytes_copied}
+    except HTTPException:
+        raise
+    except Exception as e:
+        if logger:
+            logger.error(f"| Unexpected error during PDF chain comparison: {e}")
+        raise HTTPException(status_code=500, detail="Unexpected error during PDF chain comparison")
+    finally:
+        workspace.cleanup()
+
+def estimate_pdf_chain_cost(chain: PDFChainRequest) -> JobCost:
+    # Every version is rendered once, memory follows the largest page
+    comparator_instance = PDFDocumentComparator(chain_pair_request(chain, 0), None)
+    page_count = 0
+    page_sizes = []
+    for file_path in chain.file_paths:
+        pdf_file = str(resolve_document_path(unquote(r'' + file_path)).local)
+        page_count += comparator_instance.count_pdf_pages(pdf_file)
+        page_sizes.append(comparator_instance.max_page_size(pdf_file))
+    largest_page = max(page_sizes, key=lambda size: size[0] * size[1])
+    return CostModel().pdf_cost(page_count, largest_page)
+
+@router.post("/compare_pdf_chain")
+async def generate_chain_url(chain: PDFChainRequest):
+    # Diff every adjacent pair of an ordered version list in one pool job
+    if len(chain.file_paths) < 2:
+        raise HTTPException(status_code=400, detail="A version chain needs at least two documents")
+    cost = await run_in_threadpool(estimate_pdf_chain_cost, chain)
+    result = await single_flight("compare_pdf_chain", chain, lambda: schedule_comparison("pdf", compare_pdf_chain, chain, cost=cost, priority=chain.priority))
+    return JSONResponse(content=result)
+
+def render_full_page(file_path: str, page_number: int) -> str:
+    """
+    Render a full resolution page of a compared PDF, once, inside a pool worker process.
+
+    Args:
+        file_path (str): Path of the PDF as sent with the comparison request
+        page_number (int): Page to render, starting at 1
+
+    Returns:
+        str: The cached page image next to the PDF
+    """
+    document = resolve_document_path(unquote(r'' + file_path))
+    directory = str(document.directory)
+    page_path = full_page_path(directory, page_number)
+    if os.path.exists(page_path):
+        return page_path
+
+    manifest_path = page_manifest_path(directory, document.name)
+    if not os.path.exists(manifest_path):
+        raise HTTPException(status_code=404, detail=f"No comparison report for {document.source}")
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    if not 1 <= page_number <= manifest["pages"]:
+        raise HTTPException(status_code=404, detail=f"Page {page_number} not found in {document.source}")
+
+    render_profile = RenderProfile()
+    with open_pdf(manifest["source"]) as pdf_input:
+        page = pdf_input.document[page_number - 1]
+        image = render_page_raster(page, render_profile.display_page_dpi(page.rect.width, page.rect.height))
+    draw_underlines(image, manifest["annotations"].get(str(page_number), []))
+    _, encoded_image = cv2.imencode(".jpg", image)
+    with atomic_write(page_path) as page_file:
+        page_file.write(encoded_image.tobytes())
+    return page_path
+
+def estimate_full_page_cost(file_path: str, page_number: int) -> JobCost:
+    # One page at the rendering DPI, render_full_page reports missing reports and pages
+    document = resolve_document_path(unquote(r'' + file_path))
+    page_size = (0, 0)
+    try:
+        with open(page_manifest_path(str(document.directory), document.name)) as manifest_file:
+            manifest = json.load(manifest_file)
+        if 1 <= page_number <= manifest["pages"]:
+            with open_pdf(manifest["source"]) as pdf_input:
+                page_rect = pdf_input.document[page_number - 1].rect
+                page_size = (page_rect.width, page_rect.height)
+    except (OSError, ValueError, KeyError):
+        pass
+    return CostModel().pdf_cost(1, page_size)
+
+# FastAPI route serving the full resolution tier of the report pages
+@router.get("/compare_pdf/page")
+async def full_resolution_page(request: Request, file_path: str, page: int):
+    # Rendered in the process pool on first request, served from the cache afterwards, with ETag revalidation and byte ranges
+    cost = await run_in_threadpool(estimate_full_page_cost, file_path, page)
+    page_path = await schedule_comparison("pdf", render_full_page, file_path, page, cost=cost)
+    # The URL stays the same when a comparison is run again, so the page is revalidated by the [Static] cache_control
+    return await serve_file(page_path, request.headers, media_type="image/jpeg")
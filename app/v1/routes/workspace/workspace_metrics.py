@@ -0,0 +1,15 @@
+# app/v1/routes/workspace/workspace_metrics.py
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from app.workspace_mgmt.docom_janitor import get_workspace_janitor
+
+# Initialize FastAPI router
+router = APIRouter()
+
+# FastAPI route reporting the disk usage of the session workspaces
+@router.get("/workspace/metrics")
+async def workspace_metrics():
+    # Measured on request, with what the janitor of this HTTP worker removed so far
+    return JSONResponse(content=await run_in_threadpool(get_workspace_janitor().stats))
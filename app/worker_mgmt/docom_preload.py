@@ -0,0 +1,102 @@
+# app/worker_mgmt/docom_preload.py
+
+import importlib
+from app.config_mgmt.docom_config import load_config
+
+# Heavy libraries each document type needs
+PRELOAD_MODULES = {
+    "pdf": ("fitz", "cv2", "numpy", "PIL.Image"),
+    "image": ("cv2", "numpy", "PIL.Image"),
+    "excel": ("pandas", "openpyxl"),
+}
+
+# Report templates each document type renders, compiled ahead of the first request
+REPORT_TEMPLATES = {
+    "pdf": ("pdf.html",),
+    "image": ("image.html",),
+    "excel": ("excel.html", "excel_stream.html", "excel_workbook.html"),
+}
+
+class LazyModule:
+    """
+    Module proxy importing the real module on first attribute access.
+
+    Routers reference cv2, fitz, pandas and PIL through these proxies so an
+    HTTP worker only pays for the libraries of the document types it serves.
+    """
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+def _warm_up_pdf() -> None:
+    # Open and render a blank page so PyMuPDF initialises its fonts and colorspaces
+    fitz = importlib.import_module("fitz")
+    with fitz.open() as document:
+        document.new_page(width=72, height=72).get_pixmap()
+
+def _warm_up_image() -> None:
+    # Exercise the OpenCV calls of the diff pipeline on a tiny image
+    cv2 = importlib.import_module("cv2")
+    np = importlib.import_module("numpy")
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(cv2.absdiff(gray, gray), 30, 255, cv2.THRESH_BINARY)
+    cv2.connectedComponentsWithStats(thresh, connectivity=8)
+    cv2.imencode(".jpg", image)
+
+def _warm_up_excel() -> None:
+    pd = importlib.import_module("pandas")
+    importlib.import_module("openpyxl")
+    pd.DataFrame([[1, "-"]]).fillna("-").to_dict(orient="records")
+
+WARM_UP = {"pdf": _warm_up_pdf, "image": _warm_up_image, "excel": _warm_up_excel}
+
+def preload_document_types(doc_types) -> None:
+    """
+    Import and warm up the libraries of the given document types.
+
+    Args:
+        doc_types: Document types to preload, e.g. ("pdf", "excel")
+    """
+    for doc_type in doc_types:
+        for module_name in PRELOAD_MODULES.get(doc_type, ()):
+            importlib.import_module(module_name)
+        if doc_type in WARM_UP:
+            WARM_UP[doc_type]()
+        load_report_templates(REPORT_TEMPLATES.get(doc_type, ()))
+
+def load_report_templates(template_names) -> None:
+    # Compiled, or loaded from the bytecode cache, into the process' report environment
+    from app.report_mgmt.docom_report import get_report_environment
+    environment = get_report_environment()
+    for template_name in template_names:
+        environment.get_template(template_name)
+
+def configured_preload_types(config=None) -> tuple:
+    # [Runtime] preload = pdf,image,excel
+    config = config or load_config()
+    value = config.get("Runtime", "preload", "") or ""
+    return tuple(doc_type.strip() for doc_type in value.split(",") if doc_type.strip() in PRELOAD_MODULES)
+
+def warm_up_worker(doc_types: tuple) -> None:
+    # Process pool initializer, runs in every pool process right after it starts
+    preload_document_types(doc_types)
+
+def no_op() -> None:
+    # Submitted to the pool to start its processes ahead of the first request
+    return None
@@ -0,0 +1,234 @@
+# app/worker_mgmt/docom_scheduler.py
+
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from app.config_mgmt.docom_config import load_config
+from app.render_mgmt.docom_render import RenderProfile
+from app.worker_mgmt.docom_worker_pool import RuntimeSettings, run_comparison, total_memory_bytes
+
+# Configuration section for admission control
+ADMISSION_SECTION = "Admission"
+
+MEGABYTE = 1024 * 1024
+
+class JobCost:
+    def __init__(self, memory_bytes: int, work_units: int = 0, description: str = "") -> None:
+        """
+        Up-front estimate of what a comparison will need.
+
+        Args:
+            memory_bytes (int): Estimated peak resident memory of the job
+            work_units (int): Relative CPU work, e.g. pixels to render and diff
+            description (str): Human readable basis of the estimate, used in errors
+        """
+        self.memory_bytes = int(memory_bytes)
+        self.work_units = int(work_units)
+        self.description = description
+
+    def __repr__(self) -> str:
+        return f"JobCost(memory={self.memory_bytes / MEGABYTE:.1f} MB, work={self.work_units}, {self.description})"
+
+class CostModel:
+    def __init__(self, config=None) -> None:
+        """
+        Factors used by the per document type cost estimators.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        # Fixed overhead of a pool worker running any comparison
+        self.base_memory_bytes = config.getint(ADMISSION_SECTION, "base_memory_mb", 150) * MEGABYTE
+        # Bytes held per rendered/decoded pixel across the copies the pipelines keep
+        self.bytes_per_pixel = config.getint(ADMISSION_SECTION, "bytes_per_pixel", 24)
+        # Bytes held per worksheet cell (DataFrame, records and rendered HTML)
+        self.bytes_per_cell = config.getint(ADMISSION_SECTION, "bytes_per_cell", 600)
+        # Rendering resolution of PDF pages, 0 follows the [Render] profile
+        self.render_profile = RenderProfile(config)
+        self.pdf_dpi = config.getint(ADMISSION_SECTION, "pdf_dpi", 0) or self.render_profile.display_dpi
+
+    def pdf_cost(self, page_count: int, page_size_points: tuple) -> JobCost:
+        # Pages are rendered and diffed one at a time, memory follows the largest page
+        width, height = page_size_points
+        dpi = self.render_profile.page_dpi(self.pdf_dpi, width, height)
+        page_pixels = self.render_profile.page_pixels(dpi, width, height)
+        return JobCost(
+            memory_bytes=self.base_memory_bytes + page_pixels * self.bytes_per_pixel,
+            work_units=page_count * page_pixels,
+            description=f"{page_count} pages at {dpi:.0f} DPI",
+        )
+
+    def image_cost(self, pixel_count: int) -> JobCost:
+        return JobCost(
+            memory_bytes=self.base_memory_bytes + pixel_count * self.bytes_per_pixel,
+            work_units=pixel_count,
+            description=f"{pixel_count} pixels",
+        )
+
+    def excel_cost(self, cell_count: int) -> JobCost:
+        return JobCost(
+            memory_bytes=self.base_memory_bytes + cell_count * self.bytes_per_cell,
+            work_units=cell_count,
+            description=f"{cell_count} cells",
+        )
+
+    def excel_stream_cost(self, cell_count: int, chunk_cell_count: int) -> JobCost:
+        # Streamed sheets are held one chunk at a time, the work still covers every cell
+        return JobCost(
+            memory_bytes=self.base_memory_bytes + chunk_cell_count * self.bytes_per_cell,
+            work_units=cell_count,
+            description=f"{cell_count} cells streamed {chunk_cell_count} at a time",
+        )
+
+class _Waiter:
+    def __init__(self, cost: JobCost) -> None:
+        self.cost = cost
+        self.future = asyncio.get_running_loop().create_future()
+
+class AdmissionController:
+    def __init__(self, memory_budget_bytes: int, cpu_slots: int, max_queue: int = 100, queue_timeout: float = 300.0) -> None:
+        """
+        Admit comparisons against a memory and CPU budget, queueing the rest by priority.
+
+        Args:
+            memory_budget_bytes (int): Memory all running jobs may use together
+            cpu_slots (int): Number of jobs that may run at the same time
+            max_queue (int): Maximum number of waiting jobs before requests are rejected
+            queue_timeout (float): Seconds a job may wait for admission
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.cpu_slots = cpu_slots
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.memory_in_use = 0
+        self.running = 0
+        self._queue = []
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_config(cls, config=None, settings: RuntimeSettings = None) -> "AdmissionController":
+        config = config or load_config()
+        settings = settings or RuntimeSettings(config)
+        memory_budget_mb = config.getint(ADMISSION_SECTION, "memory_budget_mb", 0)
+        if memory_budget_mb:
+            memory_budget_bytes = memory_budget_mb * MEGABYTE
+        else:
+            # Default to this HTTP worker's share of the usable host memory
+            total = total_memory_bytes() or settings.cpu_workers * settings.memory_per_job_mb * MEGABYTE
+            memory_budget_bytes = int(total * settings.memory_fraction) // settings.http_workers
+        return cls(
+            memory_budget_bytes=memory_budget_bytes,
+            cpu_slots=config.getint(ADMISSION_SECTION, "cpu_slots", 0) or settings.cpu_workers,
+            max_queue=config.getint(ADMISSION_SECTION, "max_queue", 100),
+            queue_timeout=config.getfloat(ADMISSION_SECTION, "queue_timeout", 300.0),
+        )
+
+    def _fits(self, cost: JobCost) -> bool:
+        return self.running < self.cpu_slots and self.memory_in_use + cost.memory_bytes <= self.memory_budget_bytes
+
+    def _grant(self, cost: JobCost) -> None:
+        self.running += 1
+        self.memory_in_use += cost.memory_bytes
+
+    def _dispatch(self) -> None:
+        # Strict priority order, a large job at the head is not overtaken so it cannot starve
+        while self._queue:
+            waiter = self._queue[0][2]
+            if waiter.future.done():
+                heapq.heappop(self._queue)
+                continue
+            if not self._fits(waiter.cost):
+                break
+            heapq.heappop(self._queue)
+            self._grant(waiter.cost)
+            waiter.future.set_result(True)
+
+    async def acquire(self, cost: JobCost, priority: int = 0) -> None:
+        """
+        Wait until the job fits the budget.
+
+        Args:
+            cost (JobCost): Estimated cost of the job
+            priority (int): Higher priorities are admitted first
+
+        Raises:
+            HTTPException: 413 if the job can never fit, 503 if the queue is full or the wait times out
+        """
+        if cost.memory_bytes > self.memory_budget_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Comparison needs an estimated {cost.memory_bytes / MEGABYTE:.0f} MB ({cost.description}), "
+                       f"which exceeds the memory budget of {self.memory_budget_bytes / MEGABYTE:.0f} MB",
+            )
+        if not self._queue and self._fits(cost):
+            self._grant(cost)
+            return
+        if len(self._queue) >= self.max_queue:
+            raise HTTPException(status_code=503, detail="Comparison queue is full, retry later")
+
+        waiter = _Waiter(cost)
+        heapq.heappush(self._queue, (-priority, next(self._sequence), waiter))
+        # A higher priority job may now be at the head and fit
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted while timing out, hand the slot back
+                self.release(cost)
+            else:
+                waiter.future.cancel()
+                self._dispatch()
+            if isinstance(e, asyncio.TimeoutError):
+                raise HTTPException(status_code=503, detail="Timed out waiting for comparison capacity, retry later")
+            raise
+
+    def release(self, cost: JobCost) -> None:
+        self.running -= 1
+        self.memory_in_use -= cost.memory_bytes
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, cost: JobCost, priority: int = 0):
+        await self.acquire(cost, priority)
+        try:
+            yield
+        finally:
+            self.release(cost)
+
+    def stats(self) -> dict:
+        return {
+            "memory_budget_mb": self.memory_budget_bytes / MEGABYTE,
+            "memory_in_use_mb": self.memory_in_use / MEGABYTE,
+            "running": self.running,
+            "cpu_slots": self.cpu_slots,
+            "queued": sum(1 for _, _, waiter in self._queue if not waiter.future.done()),
+        }
+
+_admission_controller = None
+
+def get_admission_controller() -> AdmissionController:
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController.from_config()
+    return _admission_controller
+
+async def schedule_comparison(doc_type: str, func, *args, cost: JobCost, priority: int = 0):
+    """
+    Admit a comparison against the budget, then run it in the process pool.
+
+    Args:
+        doc_type (str): Document type whose concurrency limit applies
+        func: Module level function to call in the worker process
+        *args: Picklable arguments for the function
+        cost (JobCost): Estimated cost of the comparison
+        priority (int): Higher priorities are admitted first
+
+    Returns:
+        The return value of the function
+    """
+    async with get_admission_controller().admit(cost, priority):
+        return await run_comparison(doc_type, func, *args)
@@ -0,0 +1,215 @@
+# app/worker_mgmt/docom_worker_pool.py
+
+import asyncio
+import ctypes
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.config_mgmt.docom_config import load_config
+from app.worker_mgmt.docom_preload import configured_preload_types, no_op, warm_up_worker
+
+# Configuration sections for the runtime model
+RUNTIME_SECTION = "Runtime"
+CONCURRENCY_SECTION = "Concurrency"
+
+# Document types with their own concurrency limit
+DOCUMENT_TYPES = ("pdf", "image", "excel")
+
+class ComparisonError(Exception):
+    """
+    Picklable stand-in for HTTPException raised inside a pool worker.
+
+    HTTPException cannot be rebuilt after pickling, so errors are carried back
+    to the HTTP worker as a ComparisonError and raised there again.
+    """
+    def __init__(self, status_code: int, detail) -> None:
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def _run_job(func, args: tuple):
+    # Runs inside the pool worker process
+    try:
+        return func(*args)
+    except HTTPException as e:
+        raise ComparisonError(e.status_code, e.detail)
+
+def total_memory_bytes():
+    """
+    Return the physical memory of the host, or None if it cannot be determined.
+    """
+    if hasattr(os, "sysconf"):
+        try:
+            return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        except (ValueError, OSError):
+            pass
+    if os.name == "nt":
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("sullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+    return None
+
+class RuntimeSettings:
+    def __init__(self, config=None) -> None:
+        """
+        Read the runtime model from the [Runtime] and [Concurrency] sections.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        self.cpu_count = multiprocessing.cpu_count()
+        self.http_workers = config.getint(RUNTIME_SECTION, "http_workers", 0) or min(2, self.cpu_count)
+        self.use_process_pool = config.getboolean(RUNTIME_SECTION, "use_process_pool", True)
+        self.memory_per_job_mb = config.getint(RUNTIME_SECTION, "memory_per_job_mb", 1024)
+        self.memory_fraction = config.getfloat(RUNTIME_SECTION, "memory_fraction", 0.75)
+        self.max_tasks_per_child = config.getint(RUNTIME_SECTION, "max_tasks_per_child", 50) or None
+        self.start_method = config.get(RUNTIME_SECTION, "start_method", "spawn")
+        # Document types whose libraries pool processes import and warm up when they start
+        self.preload = configured_preload_types(config)
+        self.prestart_pool = config.getboolean(RUNTIME_SECTION, "prestart_pool", False)
+        self.cpu_workers = config.getint(RUNTIME_SECTION, "cpu_workers", 0) or self._default_cpu_workers()
+        self.concurrency_limits = {
+            doc_type: config.getint(CONCURRENCY_SECTION, doc_type, 0) or self.cpu_workers
+            for doc_type in DOCUMENT_TYPES
+        }
+
+    def _default_cpu_workers(self) -> int:
+        # One worker per core, capped by how many jobs fit in memory, shared by all HTTP workers
+        workers = self.cpu_count
+        memory = total_memory_bytes()
+        if memory:
+            workers = min(workers, int(memory * self.memory_fraction) // (self.memory_per_job_mb * 1024 * 1024))
+        return max(1, workers // self.http_workers)
+
+class ComparisonPool:
+    def __init__(self, settings: RuntimeSettings = None) -> None:
+        """
+        Bounded process pool running CPU bound comparisons off the event loop.
+
+        Args:
+            settings (RuntimeSettings): Pool size and per document type limits
+        """
+        self.settings = settings or RuntimeSettings()
+        self._executor = None
+        self._semaphores = {}
+        # Jobs currently waiting for a slot and running, per document type
+        self.waiting = dict.fromkeys(DOCUMENT_TYPES, 0)
+        self.running = dict.fromkeys(DOCUMENT_TYPES, 0)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Started on first use so HTTP workers that never compare stay light
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.settings.cpu_workers,
+                mp_context=multiprocessing.get_context(self.settings.start_method),
+                max_tasks_per_child=self.settings.max_tasks_per_child,
+                initializer=warm_up_worker,
+                initargs=(self.settings.preload,),
+            )
+        return self._executor
+
+    async def prestart(self) -> None:
+        """
+        Start all pool processes ahead of the first request.
+
+        Each process runs the warm-up initializer for the configured preload
+        types while it starts, so the first comparison does not pay for it.
+        """
+        if not self.settings.use_process_pool:
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, no_op) for _ in range(self.settings.cpu_workers)))
+
+    def _semaphore(self, doc_type: str) -> asyncio.Semaphore:
+        if doc_type not in self._semaphores:
+            limit = self.settings.concurrency_limits.get(doc_type, self.settings.cpu_workers)
+            self._semaphores[doc_type] = asyncio.Semaphore(limit)
+        return self._semaphores[doc_type]
+
+    async def run(self, doc_type: str, func, *args):
+        """
+        Run a comparison function in the pool, limited per document type.
+
+        Args:
+            doc_type (str): Document type whose concurrency limit applies
+            func: Module level function to call in the worker process
+            *args: Picklable arguments for the function
+
+        Returns:
+            The return value of the function
+        """
+        self.waiting[doc_type] = self.waiting.get(doc_type, 0) + 1
+        try:
+            await self._semaphore(doc_type).acquire()
+        finally:
+            self.waiting[doc_type] -= 1
+        self.running[doc_type] = self.running.get(doc_type, 0) + 1
+        try:
+            if not self.settings.use_process_pool:
+                return await run_in_threadpool(func, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, _run_job, func, args)
+        except ComparisonError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory), start a fresh pool for the next job
+            self.shutdown(wait=False)
+            raise HTTPException(status_code=503, detail="Comparison worker terminated unexpectedly")
+        finally:
+            self.running[doc_type] -= 1
+            self._semaphore(doc_type).release()
+
+    def stats(self) -> dict:
+        """
+        Report pool occupancy for metrics and load testing.
+
+        Returns:
+            dict: Pool capacity with running and waiting jobs per document type
+        """
+        return {
+            "cpu_workers": self.settings.cpu_workers,
+            "running": dict(self.running),
+            "waiting": dict(self.waiting),
+            "utilization": min(sum(self.running.values()) / self.settings.cpu_workers, 1.0),
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+_comparison_pool = None
+
+def get_comparison_pool() -> ComparisonPool:
+    global _comparison_pool
+    if _comparison_pool is None:
+        _comparison_pool = ComparisonPool()
+    return _comparison_pool
+
+async def run_comparison(doc_type: str, func, *args):
+    # Convenience wrapper used by the routers
+    return await get_comparison_pool().run(doc_type, func, *args)
+
+def shutdown_comparison_pool() -> None:
+    global _comparison_pool
+    if _comparison_pool is not None:
+        _comparison_pool.shutdown()
+        _comparison_pool = None
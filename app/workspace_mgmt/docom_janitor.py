@@ -0,0 +1,261 @@
+# app/workspace_mgmt/docom_janitor.py
+
+import asyncio
+import os
+import shutil
+import time
+from starlette.concurrency import run_in_threadpool
+from app.config_mgmt.docom_config import load_config
+from app.flight_mgmt.docom_flight import get_single_flight
+from app.log_mgmt.docom_log_config import get_logger
+from app.upload_mgmt.docom_upload import UPLOAD_SECTION, upload_case_roots
+
+# Configuration section for the workspace janitor
+JANITOR_SECTION = "Janitor"
+
+# Session workspaces of each document type, one folder per session below each
+WORKSPACE_ROOTS = {
+    doc_type: os.path.abspath(os.path.join("app", "v1", "static", doc_type))
+    for doc_type in ("pdf", "image", "excel")
+}
+
+class JanitorSettings:
+    def __init__(self, config=None) -> None:
+        """
+        When leaked session workspaces are removed.
+
+        Args:
+            config (DOCCOMConfig): Configuration to read, defaults to configuration.ini
+        """
+        config = config or load_config()
+        self.enabled = config.getboolean(JANITOR_SECTION, "enabled", True)
+        self.interval = max(1, config.getint(JANITOR_SECTION, "interval_seconds", 300))
+        # Sessions untouched for max_age_minutes are removed, 0 keeps them until the quota needs the space
+        self.max_age = config.getint(JANITOR_SECTION, "max_age_minutes", 60) * 60
+        # Total size of all session workspaces, oldest sessions are removed beyond it, 0 disables the quota
+        self.quota = config.getint(JANITOR_SECTION, "quota_mb", 0) * 1024 * 1024
+        # Sessions written to more recently are still running and never removed
+        self.min_idle = config.getint(JANITOR_SECTION, "min_idle_seconds", 120)
+        # Upload case folders are served at /static and kept for retention_minutes, 0 keeps them
+        self.upload_max_age = config.getint(UPLOAD_SECTION, "retention_minutes", 1440) * 60
+
+class SessionUsage:
+    def __init__(self, doc_type: str, path: str, size: int, last_modified: float) -> None:
+        """
+        Disk usage of one session workspace.
+
+        Args:
+            doc_type (str): Document type the session belongs to
+            path (str): The session folder
+            size (int): Bytes of every file below it
+            last_modified (float): Newest modification time of the folder or anything below it
+        """
+        self.doc_type = doc_type
+        self.path = path
+        self.size = size
+        self.last_modified = last_modified
+
+def session_usage(doc_type: str, path: str):
+    # Size and newest modification time of a session folder, None once it is gone
+    try:
+        size, last_modified = 0, os.lstat(path).st_mtime
+        for directory, _, file_names in os.walk(path):
+            last_modified = max(last_modified, os.lstat(directory).st_mtime)
+            for file_name in file_names:
+                try:
+                    file_stat = os.lstat(os.path.join(directory, file_name))
+                except FileNotFoundError:
+                    continue
+                size += file_stat.st_size
+                last_modified = max(last_modified, file_stat.st_mtime)
+    except FileNotFoundError:
+        return None
+    return SessionUsage(doc_type, path, size, last_modified)
+
+class WorkspaceJanitor:
+    def __init__(self, roots: dict = None, settings: JanitorSettings = None, logger=None, upload_roots: dict = None) -> None:
+        """
+        Remove session workspaces a failed or killed comparison left behind.
+
+        Sessions clean up after themselves, but a worker killed mid-request
+        leaves its copied sources and page images on disk. The janitor sweeps
+        the workspace roots periodically: sessions idle longer than the
+        maximum age are removed, then the oldest idle sessions until all of
+        them fit the quota. Sessions still being written to are left alone.
+        Upload case folders hold results clients fetch later, they are only
+        removed once older than the upload retention and not counted
+        against the quota.
+
+        Args:
+            roots (dict): Document type to workspace root, defaults to WORKSPACE_ROOTS
+            settings (JanitorSettings): Sweep settings, defaults to configuration.ini
+            logger (DOCCOMLogging): Logger instance, or None if logging is disabled
+            upload_roots (dict): Document type to upload case folder root, defaults to [Upload] root
+        """
+        self.roots = roots or WORKSPACE_ROOTS
+        self.upload_roots = upload_roots or upload_case_roots()
+        self.settings = settings or JanitorSettings()
+        self.logger = logger
+        self.sweeps = 0
+        self.expired = 0
+        self.expired_uploads = 0
+        self.evicted = 0
+        self.bytes_freed = 0
+        self.last_sweep = None
+        self.last_sweep_seconds = 0.0
+        self._task = None
+
+    def scan(self, roots: dict = None) -> list:
+        """
+        Measure every session workspace.
+
+        Args:
+            roots (dict): Document type to root to scan, defaults to the workspace roots
+
+        Returns:
+            list: SessionUsage of every session folder below the roots
+        """
+        sessions = []
+        for doc_type, root in (roots or self.roots).items():
+            try:
+                entries = list(os.scandir(root))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                # Files next to the sessions, e.g. README.md, are not sessions
+                if entry.is_dir(follow_symlinks=False):
+                    usage = session_usage(doc_type, entry.path)
+                    if usage is not None:
+                        sessions.append(usage)
+        return sessions
+
+    def _remove(self, session: SessionUsage) -> None:
+        shutil.rmtree(session.path, ignore_errors=True)
+        self.bytes_freed += session.size
+
+    def sweep(self, now: float = None) -> dict:
+        """
+        Remove expired sessions, then the oldest ones beyond the quota.
+
+        Args:
+            now (float): Current time, defaults to time.time()
+
+        Returns:
+            dict: Workspace usage after the sweep, as stats returns it
+        """
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        sessions = []
+        for session in self.scan():
+            idle = now - session.last_modified
+            if self.settings.max_age and idle >= max(self.settings.max_age, self.settings.min_idle):
+                self._remove(session)
+                self.expired += 1
+                if self.logger:
+                    self.logger.info(f"| Janitor removed session idle for {idle:.0f}s: {session.path}")
+            else:
+                sessions.append(session)
+
+        total = sum(session.size for session in sessions)
+        if self.settings.quota and total > self.settings.quota:
+            # Oldest first, sessions in use are skipped
+            for session in sorted(sessions, key=lambda session: session.last_modified):
+                if total <= self.settings.quota:
+                    break
+                if now - session.last_modified < self.settings.min_idle:
+                    continue
+                self._remove(session)
+                sessions.remove(session)
+                total -= session.size
+                self.evicted += 1
+                if self.logger:
+                    self.logger.info(f"| Janitor evicted session of {session.size} bytes over the workspace quota: {session.path}")
+            if total > self.settings.quota and self.logger:
+                self.logger.warning(f"| Running sessions use {total} bytes, over the workspace quota of {self.settings.quota} bytes")
+
+        for case in self.scan(self.upload_roots):
+            idle = now - case.last_modified
+            if self.settings.upload_max_age and idle >= max(self.settings.upload_max_age, self.settings.min_idle):
+                self._remove(case)
+                self.expired_uploads += 1
+                if self.logger:
+                    self.logger.info(f"| Janitor removed upload case older than the retention: {case.path}")
+
+        # Lock and result files of finished single-flight requests
+        get_single_flight().prune(self.settings.max_age or 3600)
+
+        self.sweeps += 1
+        self.last_sweep = now
+        self.last_sweep_seconds = time.perf_counter() - started
+        return self.stats(sessions, now)
+
+    def stats(self, sessions: list = None, now: float = None) -> dict:
+        """
+        Report workspace usage and janitor activity for metrics.
+
+        Args:
+            sessions (list): SessionUsage to report, scanned when None
+            now (float): Current time, defaults to time.time()
+
+        Returns:
+            dict: Sessions and bytes in total and per document type, quota, upload cases and what the janitor removed so far
+        """
+        sessions = self.scan() if sessions is None else sessions
+        now = time.time() if now is None else now
+        total = sum(session.size for session in sessions)
+        by_type = {doc_type: {"sessions": 0, "bytes": 0} for doc_type in self.roots}
+        for session in sessions:
+            by_type[session.doc_type]["sessions"] += 1
+            by_type[session.doc_type]["bytes"] += session.size
+        uploads = self.scan(self.upload_roots)
+        return {
+            "sessions": len(sessions),
+            "bytes": total,
+            "quota_bytes": self.settings.quota,
+            "quota_used": total / self.settings.quota if self.settings.quota else None,
+            "oldest_session_seconds": max((now - session.last_modified for session in sessions), default=0.0),
+            "by_type": by_type,
+            "uploads": {
+                "cases": len(uploads),
+                "bytes": sum(case.size for case in uploads),
+                "retention_seconds": self.settings.upload_max_age,
+            },
+            "sweeps": self.sweeps,
+            "expired": self.expired,
+            "expired_uploads": self.expired_uploads,
+            "evicted": self.evicted,
+            "bytes_freed": self.bytes_freed,
+            "last_sweep": self.last_sweep,
+            "last_sweep_seconds": self.last_sweep_seconds,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self.sweep)
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"| Workspace janitor sweep failed: {e}")
+            await asyncio.sleep(self.settings.interval)
+
+    def start(self) -> None:
+        # Sweeps every interval on the event loop of the HTTP worker, the file system work runs in the threadpool
+        if self.settings.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+_workspace_janitor = None
+
+def get_workspace_janitor() -> WorkspaceJanitor:
+    global _workspace_janitor
+    if _workspace_janitor is None:
+        _workspace_janitor = WorkspaceJanitor(logger=get_logger())
+    return _workspace_janitor
@@ -0,0 +1,175 @@
+# app/workspace_mgmt/docom_workspace.py
+
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from app.config_mgmt.docom_config import load_config
+
+# Configuration section for the session workspace
+WORKSPACE_SECTION = "Workspace"
+
+def _read_umask() -> int:
+    # os.umask can only be read by setting it, done once at import before any thread writes files
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+# Mode of new files, what open() would give them; mkstemp creates them readable by the owner only
+NEW_FILE_MODE = 0o666 & ~_read_umask()
+
+def copy_free_enabled(config=None) -> bool:
+    # [Workspace] copy_free = on opens sources in place and writes outputs straight to their destination
+    config = config or load_config()
+    return config.getboolean(WORKSPACE_SECTION, "copy_free", True)
+
+@contextmanager
+def atomic_write(destination: str, mode: str = "wb"):
+    """
+    Open a temporary file next to the destination and rename it into place on success.
+
+    Readers of the destination never see a partially written file.
+
+    Args:
+        destination (str): Final path of the file
+        mode (str): File mode, "wb" or "w"
+    """
+    directory = os.path.dirname(destination) or "."
+    suffix = os.path.splitext(destination)[1]
+    descriptor, temporary_path = tempfile.mkstemp(prefix=".docom-", suffix=f"{suffix}.tmp", dir=directory)
+    try:
+        with os.fdopen(descriptor, mode) as output_file:
+            yield output_file
+        # Replacing a file keeps its mode, a new file gets the default one so the web server can read it
+        try:
+            file_mode = os.stat(destination).st_mode & 0o7777
+        except FileNotFoundError:
+            file_mode = NEW_FILE_MODE
+        os.chmod(temporary_path, file_mode)
+        os.replace(temporary_path, destination)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+class SessionWorkspace:
+    def __init__(self, root: str, session_id: str, logger=None, copy_free: bool = None, request_id: str = None) -> None:
+        """
+        Scratch space of one comparison request and the way its files move.
+
+        In copy-free mode sources are read where they are and outputs are
+        written to their final destination with an atomic rename; the request
+        folder only holds scratch files. Otherwise sources are copied into the
+        request folder and outputs are copied out of it, as before. Every byte
+        copied either way is counted.
+
+        Every request of a session has its own folder below the session
+        folder, so concurrent requests of one session never see or remove
+        each other's files.
+
+        Args:
+            root (str): Workspace directory of the document type
+            session_id (str): Session the request belongs to
+            logger (DOCCOMLogging): Logger instance, or None if logging is disabled
+            copy_free (bool): Override of the [Workspace] copy_free setting
+            request_id (str): Folder of the request, a new one when None; jobs of one request pass the same id
+        """
+        self.root = root
+        self.session_id = session_id
+        self.request_id = request_id or uuid.uuid4().hex
+        self.session_path = os.path.join(root, session_id)
+        self.path = os.path.join(self.session_path, self.request_id)
+        self.logger = logger
+        self.copy_free = copy_free_enabled() if copy_free is None else copy_free
+        self.bytes_copied = 0
+        self.cleaned_up = False
+
+    def create(self) -> str:
+        # The last request of the session to finish removes the session folder, it may go away while this one starts
+        # A workspace created again after a cleanup, e.g. by the next pair of a chain, is cleaned up again
+        self.cleaned_up = False
+        for attempt in range(3):
+            try:
+                os.makedirs(self.path, exist_ok=True)
+                return self.path
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+
+    def scratch_dir(self, *parts) -> str:
+        # Directory inside the session folder, created on demand
+        path = os.path.join(self.path, *parts)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def copy(self, source: str, destination: str) -> str:
+        # shutil.copy that keeps track of the bytes moved
+        copied_path = shutil.copy(source, destination)
+        self.bytes_copied += os.path.getsize(copied_path)
+        return copied_path
+
+    def stage_source(self, source: str, *scratch_parts) -> str:
+        """
+        Make a source document available for reading.
+
+        Args:
+            source (str): Local path of the source document
+            *scratch_parts: Session sub folder the source is copied to when not copy-free
+
+        Returns:
+            str: Path to read the source from
+        """
+        if self.copy_free:
+            return source
+        return self.copy(source, self.scratch_dir(*scratch_parts))
+
+    def atomic_write(self, destination: str, mode: str = "wb"):
+        return atomic_write(destination, mode)
+
+    def write_bytes(self, destination: str, data: bytes) -> str:
+        with self.atomic_write(destination, "wb") as output_file:
+            output_file.write(data)
+        return destination
+
+    def write_text(self, destination: str, text: str) -> str:
+        with self.atomic_write(destination, "w") as output_file:
+            output_file.write(text)
+        return destination
+
+    def publish(self, source: str, destination: str) -> str:
+        """
+        Move a finished scratch file to its destination.
+
+        A rename when both are on the same file system, otherwise a copy to a
+        temporary name followed by an atomic rename.
+
+        Args:
+            source (str): The scratch file
+            destination (str): Final path of the file
+
+        Returns:
+            str: The destination path
+        """
+        try:
+            os.replace(source, destination)
+        except OSError:
+            with open(source, "rb") as input_file, self.atomic_write(destination, "wb") as output_file:
+                shutil.copyfileobj(input_file, output_file)
+            self.bytes_copied += os.path.getsize(destination)
+            os.remove(source)
+        return destination
+
+    def cleanup(self) -> None:
+        # Runs once, the report writers clean up on success and the pipelines again in their finally blocks
+        if self.cleaned_up:
+            return
+        self.cleaned_up = True
+        if self.logger:
+            self.logger.info(f"| Copied {self.bytes_copied} bytes for session: {self.session_id}")
+        shutil.rmtree(self.path, ignore_errors=True)
+        try:
+            # Kept while other requests of the session still have their folders in it
+            os.rmdir(self.session_path)
+        except OSError:
+            pass
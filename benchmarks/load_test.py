@@ -0,0 +1,468 @@
+# benchmarks/load_test.py
+
+"""
+Load-testing harness for the document comparison API.
+
+The comparison endpoints expect file-server paths that contain a ``CVWeb``
+segment and write their results next to the input files. This harness builds a
+local directory tree with the same layout, fires concurrent mixed-type requests
+at the application and records latency distributions, error rates and worker
+saturation for each concurrency level.
+
+Usage:
+    python benchmarks/load_test.py --levels 1,2,4,8,16 --requests 32
+    python benchmarks/load_test.py --workers 4 --levels 1,2,4,8,16,32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+# Repository root, the application resolves its workspace paths relative to it
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Request mix used when none is given on the command line
+DEFAULT_MIX = {"pdf": 1, "image": 1, "excel": 1}
+
+# Endpoint for every document type
+ENDPOINTS = {
+    "pdf": "/api/v1/compare_pdf",
+    "image": "/api/v1/compare_image",
+    "excel": "/api/v1/compare_excel",
+}
+
+
+class LocalFileStore:
+    """
+    Local stand-in for the production file server.
+
+    Every request gets its own case directory laid out the way the file server
+    lays it out, so results written beside the inputs never collide:
+
+        <root>/CVWeb/<doc_type>/<case_id>/<version>/<file>
+    """
+
+    def __init__(self, root: str, pdf_pages: int = 2, image_size: tuple = (1240, 1754), excel_shape: tuple = (500, 20)) -> None:
+        self.root = os.path.abspath(root)
+        self.cvweb_root = os.path.join(self.root, "CVWeb")
+        self.fixture_root = os.path.join(self.root, "fixtures")
+        self.pdf_pages = pdf_pages
+        self.image_size = image_size
+        self.excel_shape = excel_shape
+        self.fixtures = {}
+
+    def prepare(self) -> None:
+        # Generate one pair of source documents per type, cases are copies of them
+        os.makedirs(self.cvweb_root, exist_ok=True)
+        os.makedirs(self.fixture_root, exist_ok=True)
+        self.fixtures["pdf"] = self._create_pdf_fixtures()
+        self.fixtures["image"] = self._create_image_fixtures()
+        self.fixtures["excel"] = self._create_excel_fixtures()
+
+    def new_case(self, doc_type: str) -> tuple:
+        """
+        Create a fresh case directory for a document type.
+
+        Args:
+            doc_type (str): One of ``pdf``, ``image`` or ``excel``.
+
+        Returns:
+            tuple: The source paths of the first and second document.
+        """
+        case_path = os.path.join(self.cvweb_root, doc_type, uuid.uuid4().hex)
+        paths = []
+        for version, fixture in zip(("v1", "v2"), self.fixtures[doc_type]):
+            version_path = os.path.join(case_path, version)
+            os.makedirs(version_path, exist_ok=True)
+            destination = os.path.join(version_path, os.path.basename(fixture))
+            shutil.copyfile(fixture, destination)
+            paths.append(destination)
+        return tuple(paths)
+
+    def request_payload(self, doc_type: str) -> dict:
+        # Build the JSON body the endpoint expects for a fresh case
+        file1_path, file2_path = self.new_case(doc_type)
+        payload = {"file1_path": file1_path, "file2_path": file2_path, "session_id": uuid.uuid4().hex}
+        if doc_type == "excel":
+            payload.update({
+                "file1_sheet_name": "Sheet1",
+                "file2_sheet_name": "Sheet1",
+                "wm_txt_message": "",
+                "wm_img_url": "",
+                "wm_position": "",
+                "wm_txt_fontsize": "",
+                "wm_img_height": "",
+                "wm_img_width": "",
+                "wm_opacity": "",
+                "wm_rotation": "",
+            })
+        return payload
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _create_pdf_fixtures(self) -> tuple:
+        import fitz
+
+        paths = []
+        for version in ("v1", "v2"):
+            document = fitz.open()
+            for page_number in range(self.pdf_pages):
+                page = document.new_page(width=595, height=842)
+                for line in range(40):
+                    text = f"Page {page_number + 1} line {line + 1} of the load test document"
+                    if version == "v2" and line % 7 == 0:
+                        text += " (revised)"
+                    page.insert_text((56, 60 + line * 18), text, fontsize=10)
+            path = os.path.join(self.fixture_root, f"document_{version}.pdf")
+            document.save(path)
+            document.close()
+            paths.append(path)
+        return tuple(paths)
+
+    def _create_image_fixtures(self) -> tuple:
+        import cv2
+        import numpy as np
+
+        width, height = self.image_size
+        paths = []
+        for version in ("v1", "v2"):
+            image = np.full((height, width, 3), 255, dtype=np.uint8)
+            for line in range(60):
+                cv2.putText(image, f"Scanned line {line + 1}", (40, 40 + line * 28), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 1)
+            if version == "v2":
+                for block in range(0, 60, 9):
+                    cv2.rectangle(image, (600, 20 + block * 28), (760, 44 + block * 28), (0, 0, 0), cv2.FILLED)
+            path = os.path.join(self.fixture_root, f"scan_{version}.png")
+            cv2.imwrite(path, image)
+            paths.append(path)
+        return tuple(paths)
+
+    def _create_excel_fixtures(self) -> tuple:
+        import numpy as np
+        import pandas as pd
+
+        rows, columns = self.excel_shape
+        generator = np.random.default_rng(0)
+        values = generator.integers(0, 1000, size=(rows, columns))
+        paths = []
+        for version in ("v1", "v2"):
+            data = values.copy()
+            if version == "v2":
+                data[::25, ::3] += 1
+            path = os.path.join(self.fixture_root, f"workbook_{version}.xlsx")
+            pd.DataFrame(data).to_excel(path, sheet_name="Sheet1", header=False, index=False)
+            paths.append(path)
+        return tuple(paths)
+
+
+class SaturationSampler:
+    """
+    Periodically sample how busy the server side is while a level runs.
+
+    In-flight requests are always tracked. For the in-process ASGI target the
+    occupancy of the comparison process pool is sampled as well, for a
+    spawned uvicorn server the in-flight count is related to its worker count.
+    A remote server of unknown worker count reports no saturation.
+    """
+
+    def __init__(self, capacity: int = None, in_process: bool = False, interval: float = 0.05) -> None:
+        self.capacity = capacity
+        self.in_process = in_process
+        self.interval = interval
+        self.in_flight = 0
+        self.in_flight_samples = []
+        self.pool_samples = []
+        self.waiting_samples = []
+        self._task = None
+
+    async def _sample(self) -> None:
+        pool = None
+        if self.in_process:
+            from app.worker_mgmt.docom_worker_pool import get_comparison_pool
+
+            pool = get_comparison_pool()
+        while True:
+            self.in_flight_samples.append(self.in_flight)
+            if pool is not None:
+                stats = pool.stats()
+                self.pool_samples.append(stats["utilization"])
+                self.waiting_samples.append(sum(stats["waiting"].values()))
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+
+    async def stop(self) -> dict:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        samples = self.in_flight_samples or [0]
+        summary = {"in_flight_mean": statistics.fmean(samples), "in_flight_peak": max(samples)}
+        if self.capacity:
+            # More requests in flight than workers means requests are queueing
+            summary["worker_saturation"] = min(statistics.fmean(samples) / self.capacity, 1.0)
+            summary["queued_peak"] = max(max(samples) - self.capacity, 0)
+        elif self.pool_samples:
+            summary["worker_saturation"] = statistics.fmean(self.pool_samples)
+            summary["queued_peak"] = max(self.waiting_samples)
+        return summary
+
+
+class LoadTestRunner:
+    def __init__(self, store: LocalFileStore, mix: dict, base_url: str = None, capacity: int = None, timeout: float = 600.0) -> None:
+        self.store = store
+        self.mix = mix
+        self.base_url = base_url
+        self.capacity = capacity
+        self.timeout = timeout
+
+    def _client(self) -> httpx.AsyncClient:
+        # Talk to a running server when a base URL is given, otherwise to the ASGI app directly
+        if self.base_url:
+            return httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        return httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=self.timeout)
+
+    def _schedule(self, total_requests: int) -> list:
+        # Interleave document types according to their weights
+        weighted = [doc_type for doc_type, weight in self.mix.items() for _ in range(weight)]
+        return [weighted[i % len(weighted)] for i in range(total_requests)]
+
+    async def run_level(self, concurrency: int, total_requests: int) -> dict:
+        """
+        Run a fixed number of requests with a bounded number in flight.
+
+        Args:
+            concurrency (int): Maximum number of concurrent requests.
+            total_requests (int): Number of requests to send.
+
+        Returns:
+            dict: Latency, throughput, error and saturation figures for the level.
+        """
+        queue = asyncio.Queue()
+        for doc_type in self._schedule(total_requests):
+            queue.put_nowait(doc_type)
+        results = []
+        # Only the in-process app uses this process's comparison pool
+        sampler = SaturationSampler(capacity=self.capacity, in_process=self.base_url is None)
+
+        async def client_worker(client):
+            while not queue.empty():
+                doc_type = queue.get_nowait()
+                payload = self.store.request_payload(doc_type)
+                sampler.in_flight += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.post(ENDPOINTS[doc_type], json=payload)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                finally:
+                    sampler.in_flight -= 1
+                results.append({"doc_type": doc_type, "status": status, "latency": time.perf_counter() - started})
+
+        async with self._client() as client:
+            sampler.start()
+            started = time.perf_counter()
+            await asyncio.gather(*(client_worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            saturation = await sampler.stop()
+
+        return summarize_level(concurrency, results, elapsed, saturation)
+
+    async def sweep(self, levels: list, requests_per_level: int) -> list:
+        summaries = []
+        for concurrency in levels:
+            summary = await self.run_level(concurrency, max(requests_per_level, concurrency))
+            print_level(summary)
+            summaries.append(summary)
+        return summaries
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def latency_summary(latencies: list) -> dict:
+    return {
+        "p50": percentile(latencies, 0.50),
+        "p90": percentile(latencies, 0.90),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies, default=0.0),
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+    }
+
+
+def summarize_level(concurrency: int, results: list, elapsed: float, saturation: dict) -> dict:
+    latencies = [result["latency"] for result in results]
+    errors = [result for result in results if result["status"] != 200]
+    per_type = {}
+    for doc_type in sorted({result["doc_type"] for result in results}):
+        typed = [result for result in results if result["doc_type"] == doc_type]
+        per_type[doc_type] = {
+            "requests": len(typed),
+            "error_rate": sum(1 for result in typed if result["status"] != 200) / len(typed),
+            "latency": latency_summary([result["latency"] for result in typed]),
+        }
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "elapsed": elapsed,
+        "throughput": (len(results) - len(errors)) / elapsed if elapsed else 0.0,
+        "error_rate": len(errors) / len(results) if results else 0.0,
+        "errors": sorted({str(result["status"]) for result in errors}),
+        "latency": latency_summary(latencies),
+        "per_type": per_type,
+        "saturation": saturation,
+    }
+
+
+def find_knee(summaries: list, min_gain: float = 0.10, latency_factor: float = 3.0, max_error_rate: float = 0.01) -> int:
+    """
+    Find the concurrency knee of a sweep.
+
+    The knee is the last level before adding concurrency stops paying off:
+    throughput grows by less than ``min_gain``, p95 latency exceeds
+    ``latency_factor`` times the single-request p95, or errors appear.
+
+    Args:
+        summaries (list): Level summaries ordered by increasing concurrency.
+
+    Returns:
+        int: The concurrency level at the knee.
+    """
+    if not summaries:
+        return 0
+    baseline_p95 = summaries[0]["latency"]["p95"] or 1e-9
+    knee = summaries[0]["concurrency"]
+    for previous, current in zip(summaries, summaries[1:]):
+        gain = (current["throughput"] - previous["throughput"]) / (previous["throughput"] or 1e-9)
+        if gain < min_gain or current["latency"]["p95"] > latency_factor * baseline_p95 or current["error_rate"] > max_error_rate:
+            break
+        knee = current["concurrency"]
+    return knee
+
+
+def print_level(summary: dict) -> None:
+    latency = summary["latency"]
+    saturation = summary["saturation"].get("worker_saturation")
+    saturation_text = f"{saturation:6.1%}" if saturation is not None else "   n/a"
+    print(
+        f"c={summary['concurrency']:<4} n={summary['requests']:<5} "
+        f"rps={summary['throughput']:7.2f} err={summary['error_rate']:6.1%} "
+        f"p50={latency['p50']:7.2f}s p95={latency['p95']:7.2f}s p99={latency['p99']:7.2f}s "
+        f"sat={saturation_text} peak_in_flight={summary['saturation']['in_flight_peak']}"
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    # Spawn uvicorn from the repository root with the requested worker count
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=os.environ.copy())
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start within 120 seconds")
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(","):
+        doc_type, _, weight = item.partition("=")
+        if doc_type not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown document type: {doc_type}")
+        mix[doc_type] = int(weight or 1)
+    return mix
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the document comparison API against a local file store")
+    parser.add_argument("--levels", default="1,2,4,8", help="Comma separated concurrency levels to sweep")
+    parser.add_argument("--requests", type=int, default=24, help="Requests per concurrency level")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Request mix, e.g. pdf=2,image=1,excel=1")
+    parser.add_argument("--workers", type=int, default=None, help="Spawn uvicorn with this many workers instead of calling the ASGI app in-process")
+    parser.add_argument("--base-url", default=None, help="Target an already running server")
+    parser.add_argument("--root", default=None, help="Directory for the local file store (defaults to a temporary directory)")
+    parser.add_argument("--pdf-pages", type=int, default=2)
+    parser.add_argument("--keep", action="store_true", help="Keep the local file store after the run")
+    parser.add_argument("--output", default=None, help="Write the level summaries as JSON to this file")
+    parser.add_argument("--set", action="append", default=[], metavar="SECTION.OPTION=VALUE", help="Override a configuration option, e.g. Runtime.cpu_workers=4")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    levels = [int(level) for level in args.levels.split(",")]
+
+    # The application resolves workspace, log and config paths relative to the repository root
+    os.chdir(REPO_ROOT)
+
+    # Configuration overrides reach both the in-process app and a spawned server through the environment
+    for override in args.set:
+        option, _, value = override.partition("=")
+        section, _, name = option.partition(".")
+        os.environ[f"DOCCOM_{section}_{name}".upper()] = value
+    store = LocalFileStore(args.root or tempfile.mkdtemp(prefix="docom-loadtest-"), pdf_pages=args.pdf_pages)
+    store.prepare()
+    print(f"Local file store: {store.cvweb_root}")
+
+    server = None
+    base_url = args.base_url
+    if args.workers:
+        port = free_port()
+        server = start_server(args.workers, port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        runner = LoadTestRunner(store, args.mix, base_url=base_url, capacity=args.workers)
+        summaries = asyncio.run(runner.sweep(levels, args.requests))
+        knee = find_knee(summaries)
+        label = f"num_workers={args.workers}" if args.workers else base_url or "in-process"
+        print(f"Concurrency knee ({label}): {knee}")
+        if args.output:
+            with open(args.output, "w") as output_file:
+                json.dump({"workers": args.workers, "knee": knee, "levels": summaries}, output_file, indent=2)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        if not args.keep:
+            store.cleanup()
+
+
+if __name__ == '__main__':
+    main()
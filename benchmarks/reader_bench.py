@@ -0,0 +1,100 @@
+# benchmarks/reader_bench.py
+
+"""
+Spreadsheet reader benchmark.
+
+Writes one synthetic workbook (numbers, text and dates) as .xlsx and as
+.csv and times every installed engine of app/reader_mgmt/docom_reader.py
+on the same file, reporting whether each engine returns the same frame as
+the openpyxl engine pd.read_excel uses by default. Engines that are not
+installed are listed as skipped.
+
+Usage:
+    python benchmarks/reader_bench.py --rows 50000
+    python benchmarks/reader_bench.py --rows 10000,100000 --columns 30 --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Repository root, the application resolves its config path relative to it
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(REPO_ROOT)
+sys.path.insert(0, REPO_ROOT)
+
+from app.reader_mgmt.docom_reader import AUTO_ENGINES, READER_ENGINES, SpreadsheetReader
+
+# Engines benchmarked per file format, the first one is the reference
+FORMAT_ENGINES = {
+    ".xlsx": ("openpyxl", "openpyxl_stream", "calamine"),
+    ".csv": ("csv", "pyarrow"),
+}
+
+
+def synthetic_frame(rows: int, columns: int, seed: int = 7):
+    # Mostly numeric cells with a text and a date column, like a typical export
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(rng.integers(0, 100000, size=(rows, columns)))
+    frame[1] = rng.random(rows).round(4)
+    frame[2] = "item-" + frame[2].astype(str)
+    frame[3] = pd.Timestamp("2024-01-01") + pd.to_timedelta(frame[3] % 3650, unit="D")
+    return frame
+
+
+def measure(engine, runs: int, file_path: str) -> tuple:
+    timings = []
+    frame = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        frame = engine.read(file_path, engine.sheet_names(file_path)[0], None)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), frame
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time spreadsheet parsing per reader engine")
+    parser.add_argument("--rows", default="20000", help="Comma separated row counts")
+    parser.add_argument("--columns", type=int, default=20, help="Columns of the workbook")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per engine, the median is reported")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    reader = SpreadsheetReader()
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in (int(value) for value in args.rows.split(",")):
+            frame = synthetic_frame(rows, args.columns)
+            for extension, engine_names in FORMAT_ENGINES.items():
+                file_path = os.path.join(directory, f"bench_{rows}{extension}")
+                if extension == ".csv":
+                    frame.to_csv(file_path, header=False, index=False)
+                else:
+                    frame.to_excel(file_path, header=False, index=False)
+                size_mb = os.path.getsize(file_path) / (1024 * 1024)
+                print(f"rows={rows} columns={args.columns} {extension} {size_mb:.1f}MB auto={reader.select_engine(file_path).name} candidates={[name for name, _ in AUTO_ENGINES[extension]]}")
+
+                reference_time, reference = None, None
+                for name in engine_names:
+                    engine = READER_ENGINES[name]
+                    if not engine.available:
+                        print(f"  {name:<16} skipped, {engine.module} not installed")
+                        continue
+                    elapsed, parsed = measure(engine, args.runs, file_path)
+                    line = f"  {name:<16} {elapsed * 1000:9.1f}ms"
+                    if reference is None:
+                        reference_time, reference = elapsed, parsed
+                    else:
+                        line += f" speedup={reference_time / elapsed:5.2f}x same_frame={parsed.equals(reference)}"
+                    print(line)
+
+
+if __name__ == '__main__':
+    main()
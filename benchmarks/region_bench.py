@@ -0,0 +1,120 @@
+# benchmarks/region_bench.py
+
+"""
+Difference region benchmark.
+
+Builds a pair of synthetic page rasters that differ in thousands of small
+spots and times region extraction and annotation two ways: the contour loop
+the comparators used before (findContours, boundingRect and one drawing call
+per box, the image comparator blending a full copy of the page per box) and
+the connected-components extraction with batched drawing of
+app/region_mgmt/docom_regions.py.
+
+Usage:
+    python benchmarks/region_bench.py --differences 5000
+    python benchmarks/region_bench.py --differences 2000,10000 --merge-distance 4
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Repository root, the application resolves its config path relative to it
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(REPO_ROOT)
+sys.path.insert(0, REPO_ROOT)
+
+from app.region_mgmt.docom_regions import RegionClassifier, shade_boxes, underline_boxes
+
+# A4 page at 300 DPI
+PAGE_SHAPE = (3508, 2480)
+
+
+def synthetic_pages(differences: int, seed: int = 7) -> tuple:
+    # A text-like page and a copy with small changed glyph-sized spots
+    rng = np.random.default_rng(seed)
+    page = np.full(PAGE_SHAPE, 255, dtype=np.uint8)
+    for row in range(150, PAGE_SHAPE[0] - 150, 60):
+        cv2.rectangle(page, (150, row), (PAGE_SHAPE[1] - 150, row + 25), 40, cv2.FILLED)
+    changed = page.copy()
+    sizes = rng.integers(3, 12, size=(differences, 2))
+    origins = rng.integers(0, [PAGE_SHAPE[1] - 12, PAGE_SHAPE[0] - 12], size=(differences, 2))
+    for (x, y), (w, h) in zip(origins, sizes):
+        changed[y:y + h, x:x + w] = 255 - changed[y:y + h, x:x + w]
+    return page, changed
+
+
+def difference_mask(gray1, gray2):
+    _, thresh = cv2.threshold(cv2.absdiff(gray1, gray2), 30, 255, cv2.THRESH_BINARY)
+    return thresh
+
+
+def contour_loop(thresh, image, shade: bool) -> int:
+    # The comparators' loop before region extraction
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if shade:
+            overlay = image.copy()
+            cv2.rectangle(overlay, (x, y), (x + w, y + h), (51, 51, 255), cv2.FILLED)
+            cv2.addWeighted(overlay, 0.3, image, 0.7, 0, image)
+        else:
+            cv2.line(image, (x, y + h + 4), (x + w, y + h + 4), (0, 0, 255), 4)
+    return len(contours)
+
+
+def connected_components(classifier, thresh, image, shade: bool) -> int:
+    boxes = classifier.classify(thresh)
+    if shade:
+        shade_boxes(image, boxes, (51, 51, 255), 0.3)
+    else:
+        underline_boxes(image, boxes, (0, 0, 255), 4)
+    return len(boxes)
+
+
+def measure(function, runs: int, *args) -> tuple:
+    timings = []
+    regions = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        regions = function(*args)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), regions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time difference region extraction and annotation")
+    parser.add_argument("--differences", default="1000,5000", help="Comma separated numbers of changed spots")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per variant, the median is reported")
+    parser.add_argument("--merge-distance", type=int, default=None, help="Override of [Regions] merge_distance")
+    parser.add_argument("--loop-runs", type=int, default=1, help="Timed runs of the slow contour loop with shading, 0 skips it")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.merge_distance is not None:
+        os.environ["DOCCOM_REGIONS_MERGE_DISTANCE"] = str(args.merge_distance)
+    classifier = RegionClassifier()
+
+    for differences in (int(value) for value in args.differences.split(",")):
+        page, changed = synthetic_pages(differences)
+        thresh = difference_mask(page, changed)
+        color_page = cv2.cvtColor(changed, cv2.COLOR_GRAY2BGR)
+        for shade, label in ((False, "underline (pdf)"), (True, "shade (image)")):
+            regions_time, regions = measure(connected_components, args.runs, classifier, thresh, color_page.copy(), shade)
+            line = f"differences={differences:<6} {label:<16} regions={regions_time * 1000:8.1f}ms ({regions} boxes)"
+            loop_runs = args.loop_runs if shade else args.runs
+            if loop_runs:
+                loop_time, contours = measure(contour_loop, loop_runs, thresh, color_page.copy(), shade)
+                line += f" contour_loop={loop_time * 1000:9.1f}ms ({contours} boxes) speedup={loop_time / regions_time:6.1f}x"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
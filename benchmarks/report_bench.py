@@ -0,0 +1,116 @@
+# benchmarks/report_bench.py
+
+"""
+Report rendering benchmark.
+
+Renders the Excel, PDF and image report templates of
+app/report_mgmt/docom_report.py with synthetic data in three ways:
+
+    compiled  a fresh environment without caches, so the templates are
+              lexed and compiled for every report, as when each report
+              built a jinja2.Template from an inline string
+    bytecode  a fresh environment on the bytecode cache, as in a worker
+              process that was just started
+    shared    the process' shared environment, as in a warm worker
+
+and reports the median time per report. The async environment is timed on
+the shared templates too.
+
+Usage:
+    python benchmarks/report_bench.py
+    python benchmarks/report_bench.py --rows 2000 --pages 50 --runs 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import jinja2
+
+# Repository root, the application resolves its config path relative to it
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(REPO_ROOT)
+sys.path.insert(0, REPO_ROOT)
+
+from app.report_mgmt.docom_report import TEMPLATE_DIRECTORY, get_report_environment, render_report_async
+
+
+def excel_context(rows: int, columns: int) -> dict:
+    data1 = [{column: f"v{row}-{column}" for column in range(columns)} for row in range(rows)]
+    data2 = [{column: f"v{row}-{column}" if row % 10 else f"w{row}-{column}" for column in range(columns)} for row in range(rows)]
+    return {
+        "title": "Contentverse Excel Document Comparison", "file1": "book_v1.xlsx", "file2": "book_v2.xlsx",
+        "file1_sheet_name": "Sheet1", "file2_sheet_name": "Sheet1", "file_1_version": "v1", "file_2_version": "v2",
+        "data1": data1, "data2": data2,
+        "differing_indices": set(range(0, rows, 10)),
+        "different_values_df2": {(row, column, column, data2[row][column]) for row in range(0, rows, 10) for column in range(columns)},
+        "inserted_columns": set(), "removed_columns": set(),
+    }
+
+
+def pdf_context(pages: int) -> dict:
+    return {
+        "file1": "document_v1.pdf", "file2": "document_v2.pdf", "file_1_version": "v1", "file_2_version": "v2",
+        "pdf1_image_list": [f"page_{page}.jpg" for page in range(pages)], "pdf2_image_list": [f"page_{page}.jpg" for page in range(pages)],
+        "pdf1_full_list": None, "pdf2_full_list": None,
+    }
+
+
+def image_context() -> dict:
+    return {"file1": "scan_v1.png", "file2": "scan_v2.png", "file_1_version": "v1", "file_2_version": "v2",
+            "file_1_static_path": "scan_v1.png", "file_2_static_path": "scan_v2.png"}
+
+
+def fresh_environment(bytecode_directory: str = None) -> jinja2.Environment:
+    bytecode_cache = jinja2.FileSystemBytecodeCache(bytecode_directory) if bytecode_directory else None
+    return jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATE_DIRECTORY), bytecode_cache=bytecode_cache, trim_blocks=True, lstrip_blocks=True)
+
+
+def measure(render, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time report rendering per template and environment")
+    parser.add_argument("--rows", type=int, default=500, help="Rows of the Excel report")
+    parser.add_argument("--columns", type=int, default=10, help="Columns of the Excel report")
+    parser.add_argument("--pages", type=int, default=20, help="Pages of the PDF report")
+    parser.add_argument("--runs", type=int, default=10, help="Timed renders per variant, the median is reported")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    reports = {
+        "excel.html": excel_context(args.rows, args.columns),
+        "pdf.html": pdf_context(args.pages),
+        "image.html": image_context(),
+    }
+    with tempfile.TemporaryDirectory() as bytecode_directory:
+        # Fill the bytecode cache once, as the first worker process would
+        for template_name in reports:
+            fresh_environment(bytecode_directory).get_template(template_name)
+        for template_name, context in reports.items():
+            variants = {
+                "compiled": lambda: fresh_environment().get_template(template_name).render(**context),
+                "bytecode": lambda: fresh_environment(bytecode_directory).get_template(template_name).render(**context),
+                "shared": lambda: get_report_environment().get_template(template_name).render(**context),
+                "shared async": lambda: asyncio.run(render_report_async(template_name, **context)),
+            }
+            size_kb = len(variants["shared"]()) / 1024
+            timings = {name: measure(render, args.runs) for name, render in variants.items()}
+            line = " ".join(f"{name}={elapsed * 1000:8.2f}ms" for name, elapsed in timings.items())
+            print(f"{template_name:<11} {size_kb:8.1f}KB {line} speedup={timings['compiled'] / timings['shared']:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
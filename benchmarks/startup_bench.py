@@ -0,0 +1,171 @@
+# benchmarks/startup_bench.py
+
+"""
+Startup benchmark for the document comparison API.
+
+Spawns uvicorn with the requested number of workers and measures the time to
+the first HTTP response, the time to the first completed comparison and the
+resident memory of every HTTP worker and pool process, for each preload
+setting given.
+
+Usage:
+    python benchmarks/startup_bench.py --workers 2 --runs 3
+    python benchmarks/startup_bench.py --preload "" --preload pdf,image,excel --prestart
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+from load_test import ENDPOINTS, REPO_ROOT, LocalFileStore, free_port
+
+
+def _children_from_proc(pid: int) -> list:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat_file:
+                # The parent pid is the fourth field, after the parenthesised command name
+                fields = stat_file.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) == pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def children(pid: int) -> list:
+    try:
+        import psutil
+
+        return [child.pid for child in psutil.Process(pid).children()]
+    except ImportError:
+        return _children_from_proc(pid)
+
+
+def rss_bytes(pid: int) -> int:
+    try:
+        import psutil
+
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        with open(f"/proc/{pid}/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    return 0
+
+
+def http_worker_pids(server_pid: int, workers: int) -> list:
+    # With a single worker uvicorn serves from the main process, otherwise from its children
+    if workers == 1:
+        return [server_pid]
+    return [pid for pid in children(server_pid) if pid != server_pid]
+
+
+def memory_snapshot(server_pid: int, workers: int) -> dict:
+    http_workers = http_worker_pids(server_pid, workers)
+    pool_processes = [child for pid in http_workers for child in children(pid)]
+    http_rss = [rss_bytes(pid) for pid in http_workers]
+    pool_rss = [rss_bytes(pid) for pid in pool_processes]
+    return {
+        "http_workers": len(http_rss),
+        "http_worker_rss_mb": [round(rss / 2**20, 1) for rss in http_rss],
+        "pool_processes": len(pool_rss),
+        "pool_process_rss_mb": [round(rss / 2**20, 1) for rss in pool_rss],
+        "total_rss_mb": round((sum(http_rss) + sum(pool_rss)) / 2**20, 1),
+    }
+
+
+def measure_once(workers: int, preload: str, prestart: bool, store: LocalFileStore, doc_type: str) -> dict:
+    port = free_port()
+    environment = os.environ.copy()
+    environment["DOCCOM_RUNTIME_PRELOAD"] = preload
+    environment["DOCCOM_RUNTIME_PRESTART_POOL"] = "on" if prestart else "off"
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=REPO_ROOT, env=environment)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        while True:
+            try:
+                if httpx.get(f"{base_url}/openapi.json", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() - started > 180:
+                raise RuntimeError("uvicorn did not respond within 180 seconds")
+            time.sleep(0.05)
+        first_response = time.perf_counter() - started
+        # Give every worker time to finish its startup before sampling memory
+        time.sleep(1.0)
+        baseline = memory_snapshot(server.pid, workers)
+
+        comparison_started = time.perf_counter()
+        response = httpx.post(f"{base_url}{ENDPOINTS[doc_type]}", json=store.request_payload(doc_type), timeout=600.0)
+        first_comparison = time.perf_counter() - comparison_started
+        after_comparison = memory_snapshot(server.pid, workers)
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "time_to_first_response": first_response,
+        "first_comparison_latency": first_comparison,
+        "first_comparison_status": response.status_code,
+        "baseline_memory": baseline,
+        "memory_after_first_comparison": after_comparison,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure worker cold start time and resident memory")
+    parser.add_argument("--workers", type=int, default=1, help="Number of uvicorn HTTP workers")
+    parser.add_argument("--runs", type=int, default=3, help="Measurements per preload setting")
+    parser.add_argument("--preload", action="append", default=None, help="Preload setting to measure, repeatable (e.g. '' or pdf,image,excel)")
+    parser.add_argument("--prestart", action="store_true", help="Start the pool processes when the HTTP worker starts")
+    parser.add_argument("--doc-type", default="image", choices=sorted(ENDPOINTS), help="Document type of the first comparison")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    preload_settings = args.preload if args.preload is not None else [""]
+
+    store = LocalFileStore(tempfile.mkdtemp(prefix="docom-startup-"))
+    store.prepare()
+    results = {}
+    try:
+        for preload in preload_settings:
+            runs = [measure_once(args.workers, preload, args.prestart, store, args.doc_type) for _ in range(args.runs)]
+            label = preload or "none"
+            results[label] = runs
+            print(
+                f"preload={label:<18} workers={args.workers} "
+                f"first_response={statistics.fmean(run['time_to_first_response'] for run in runs):6.2f}s "
+                f"first_{args.doc_type}={statistics.fmean(run['first_comparison_latency'] for run in runs):6.2f}s "
+                f"baseline_rss={statistics.fmean(run['baseline_memory']['total_rss_mb'] for run in runs):7.1f}MB "
+                f"rss_after_first={statistics.fmean(run['memory_after_first_comparison']['total_rss_mb'] for run in runs):7.1f}MB"
+            )
+    finally:
+        store.cleanup()
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
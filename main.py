@@ -1,21 +1,45 @@
 # main.py
 
 # Import the necessary modules
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import multiprocessing
+import os
 import uvicorn
 # Import the routers for different document comparison functionalities
 from app.v1.routes.excel.properties import router as excel_properties_router
 from app.v1.routes.excel.compare_excel import router as excel_comparison_router
 from app.v1.routes.image.compare_image import router as image_comparison_router
 from app.v1.routes.pdf.compare_pdf import router as pdf_comparison_router
+from app.v1.routes.batch.compare_batch import router as batch_comparison_router
+from app.v1.routes.workspace.workspace_metrics import router as workspace_metrics_router
+from app.static_mgmt.docom_static import PrecompressedStaticFiles
+from app.worker_mgmt.docom_worker_pool import RuntimeSettings, get_comparison_pool, shutdown_comparison_pool
+from app.workspace_mgmt.docom_janitor import get_workspace_janitor
 
 
 # Define the current API version
 API_VERSION = "v1"
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Optionally start and warm up the comparison process pool after the HTTP
+    worker has started, start the workspace janitor, and stop both when the
+    HTTP worker shuts down
+
+    Args:
+        app (FastAPI): The FastAPI application instance
+    """
+    pool = get_comparison_pool()
+    if pool.settings.prestart_pool:
+        await pool.prestart()
+    janitor = get_workspace_janitor()
+    janitor.start()
+    yield
+    await janitor.stop()
+    shutdown_comparison_pool()
+
 def create_app() -> FastAPI:
     """
     Create the main FastAPI application instance
@@ -23,7 +47,7 @@ def create_app() -> FastAPI:
     Returns:
         FastAPI: The FastAPI application instance
     """
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     # Configure CORS middleware
     configure_cors(app)
@@ -54,12 +78,13 @@ def configure_cors(app: FastAPI) -> None:
 
 def configure_static_files(app: FastAPI) -> None:
     """
-    Configure static file directory to be served at the /static endpoint
+    Configure static file directory to be served at the /static endpoint,
+    with precompressed variants, content ETags and byte ranges
 
     Args:
         app (FastAPI): The FastAPI application instance
     """
-    app.mount("/static", StaticFiles(directory=r"app\v1\static"), name="static")
+    app.mount("/static", PrecompressedStaticFiles(directory=os.path.join("app", "v1", "static")), name="static")
 
 def register_routers(app: FastAPI, api_version: str):
     """
@@ -73,17 +98,18 @@ def register_routers(app: FastAPI, api_version: str):
     app.include_router(excel_properties_router, prefix=f"/api/{api_version}")
     app.include_router(image_comparison_router, prefix=f"/api/{api_version}")
     app.include_router(pdf_comparison_router, prefix=f"/api/{api_version}")
+    app.include_router(batch_comparison_router, prefix=f"/api/{api_version}")
+    app.include_router(workspace_metrics_router, prefix=f"/api/{api_version}")
     
 # Create the FastAPI application instance
 app = create_app()
 
 def main():
-    # Determine the number of worker processes based on the available CPU cores
-    num_cores = multiprocessing.cpu_count()
-    num_workers = 2 if num_cores <= 2 else num_cores * 2 + 1
+    # A few async HTTP workers, comparisons run in each worker's bounded process pool
+    settings = RuntimeSettings()
 
     # Run the FastAPI application using Uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8030, workers=num_workers)
+    uvicorn.run("main:app", host="0.0.0.0", port=8030, workers=settings.http_workers)
 
 # Entry point for running the FastAPI application
 if __name__ == '__main__':
@@ -33,6 +33,6 @@ setup(
     ],
     include_package_data=True,
     package_data={
-        '': ['licenses/*', 'app/v1/static/*', 'app/log/*', 'config/*'],
+        '': ['licenses/*', 'app/v1/static/*', 'app/log/*', 'config/*', 'report_mgmt/templates/*'],
     },
 )
\ No newline at end of file